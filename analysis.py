@@ -0,0 +1,376 @@
+"""
+Static analysis of uploaded exercise solutions.
+
+A solution is parsed once per content hash: the report (syntax errors,
+cyclomatic complexity of each function, constructs and modules used) is
+computed in a process pool off the Streamlit render path and cached in memory
+and in CACHE_DIR as <sha256>.json.  How the constructs match the topic of a
+day is worked out from the cached report when it is shown, so the same file
+uploaded for another day is not parsed again.
+
+Usage (analyze every upload of a cohort, see bulk_io.py):
+    python analysis.py --dir learners
+"""
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bulk_io
+import storage
+
+# Bump when the report format changes, older cached reports are recomputed
+ANALYZER_VERSION = 1
+
+CACHE_DIR = os.environ.get("TRACKER_ANALYSIS_DIR", "analysis_cache")
+
+# Worker processes of the background pool
+MAX_WORKERS = int(os.environ.get("TRACKER_ANALYSIS_WORKERS", 2))
+
+# Constructs a topic is expected to exercise, matched on words of the topic
+TOPIC_CONSTRUCTS = {
+    "variables": {"assignment"},
+    "operators": {"arithmetic", "comparison"},
+    "if statements": {"if"},
+    "loops": {"for loop", "while loop"},
+    "functions": {"function"},
+    "lists": {"list"},
+    "strings": {"string"},
+    "dictionaries": {"dict"},
+    "sets": {"set"},
+    "file handling": {"file I/O", "with"},
+    "error handling": {"try/except"},
+    "modules": {"import"},
+    "classes": {"class"},
+    "json": {"json"},
+    "stacks": {"list"},
+    "sorting": {"sorting"},
+    "searching": {"loop or comprehension"},
+    "pandas": {"pandas"},
+    "matplotlib": {"matplotlib"},
+}
+
+_executor = None
+_reports = {}  # sha256 -> report
+_running = {}  # sha256 -> future of a report being computed
+_lock = threading.Lock()
+
+
+# Analysis (runs in the worker processes)
+
+def analyze_source(content):
+    """Analyze the source code of a solution (bytes or str) and return a report dict."""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    report = {
+        "version": ANALYZER_VERSION,
+        "lines": len(content.splitlines()),
+        "syntax_error": None,
+        "functions": [],
+        "complexity": 0,
+        "max_complexity": 0,
+        "constructs": [],
+        "modules": [],
+    }
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        report["syntax_error"] = {"line": e.lineno, "offset": e.offset, "message": e.msg}
+        return report
+
+    constructs = set()
+    modules = set()
+    for node in ast.walk(tree):
+        constructs.update(_constructs_of(node))
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module.split(".")[0])
+    if constructs & {"for loop", "while loop", "comprehension"}:
+        constructs.add("loop or comprehension")
+
+    functions = [
+        {"name": node.name, "line": node.lineno, "complexity": _complexity(node)}
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+    report["functions"] = sorted(functions, key=lambda function: function["line"])
+    report["complexity"] = _complexity(tree)
+    report["max_complexity"] = max([report["complexity"]] + [f["complexity"] for f in functions])
+    report["constructs"] = sorted(constructs)
+    report["modules"] = sorted(modules)
+    return report
+
+
+def _constructs_of(node):
+    if isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+        yield "assignment"
+    elif isinstance(node, ast.BinOp):
+        yield "arithmetic"
+    elif isinstance(node, ast.Compare):
+        yield "comparison"
+    elif isinstance(node, (ast.If, ast.IfExp)):
+        yield "if"
+    elif isinstance(node, (ast.For, ast.AsyncFor)):
+        yield "for loop"
+    elif isinstance(node, ast.While):
+        yield "while loop"
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        yield "function"
+    elif isinstance(node, ast.Lambda):
+        yield "lambda"
+    elif isinstance(node, ast.ClassDef):
+        yield "class"
+    elif isinstance(node, ast.Try):
+        yield "try/except"
+    elif isinstance(node, (ast.With, ast.AsyncWith)):
+        yield "with"
+    elif isinstance(node, (ast.Import, ast.ImportFrom)):
+        yield "import"
+    elif isinstance(node, ast.JoinedStr):
+        yield "f-string"
+        yield "string"
+    elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+        yield "string"
+    elif isinstance(node, ast.List):
+        yield "list"
+    elif isinstance(node, ast.Dict):
+        yield "dict"
+    elif isinstance(node, ast.Set):
+        yield "set"
+    elif isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+        yield "comprehension"
+        if isinstance(node, ast.ListComp):
+            yield "list"
+        elif isinstance(node, ast.SetComp):
+            yield "set"
+        elif isinstance(node, ast.DictComp):
+            yield "dict"
+    elif isinstance(node, ast.Call):
+        name = _call_name(node)
+        if name == "open":
+            yield "file I/O"
+        elif name in ("sorted", "sort"):
+            yield "sorting"
+        elif name in ("list", "dict", "set"):
+            yield name
+
+
+def _call_name(node):
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _complexity(root):
+    """McCabe cyclomatic complexity of a function or module body.
+
+    Nested functions and classes are scored on their own and not counted here.
+    """
+    complexity = 1
+    nodes = list(ast.iter_child_nodes(root))
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(node, (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert)):
+            complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            complexity += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            complexity += 1 + len(node.ifs)
+        elif isinstance(node, ast.match_case):
+            complexity += 1
+        nodes.extend(ast.iter_child_nodes(node))
+    return complexity
+
+
+# Topic check (cheap, done when a report is shown)
+
+def expected_constructs(topic):
+    """Return the constructs a curriculum topic is expected to use."""
+    topic = topic.lower()
+    expected = set()
+    for words, constructs in TOPIC_CONSTRUCTS.items():
+        if words in topic:
+            expected |= constructs
+    return expected
+
+
+def compare_with_topic(report, topic):
+    """Split the expected constructs of a topic into used and missing ones."""
+    expected = expected_constructs(topic)
+    used = set(report["constructs"]) | set(report["modules"])
+    return {
+        "expected": sorted(expected),
+        "used": sorted(expected & used),
+        "missing": sorted(expected - used),
+    }
+
+
+# Result cache and background pool
+
+def get_report(digest):
+    """Return the cached report of a solution, or None if it was not analyzed yet."""
+    with _lock:
+        report = _reports.get(digest)
+    if report is not None:
+        return report
+
+    try:
+        with open(_cache_path(digest), 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if report.get("version") != ANALYZER_VERSION:
+        return None
+    with _lock:
+        _reports[digest] = report
+    return report
+
+
+def request_report(digest, load_content):
+    """Return the report of a solution, starting its analysis if needed.
+
+    load_content() returns the solution bytes and is only called when the
+    solution has to be analyzed.  Returns None while the analysis is running,
+    raises FileNotFoundError if the solution is not stored.
+    """
+    report = get_report(digest)
+    if report is not None:
+        return report
+
+    if is_running(digest):
+        return None
+    content = load_content()
+    if content is None:
+        raise FileNotFoundError(f"Solution {digest[:12]} is not stored")
+    with _lock:
+        if digest in _running:
+            return None
+        future = _get_executor().submit(analyze_source, content)
+        _running[digest] = future
+    future.add_done_callback(lambda done: _finish(digest, done))
+    return None
+
+
+def is_running(digest):
+    with _lock:
+        return digest in _running
+
+
+def _finish(digest, future):
+    with _lock:
+        _running.pop(digest, None)
+    try:
+        report = future.result()
+    except Exception as e:
+        print(f"Error analyzing solution {digest[:12]}: {e}")
+        return
+    _store(digest, report)
+
+
+def _store(digest, report):
+    with _lock:
+        _reports[digest] = report
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        storage.write_file_atomically(_cache_path(digest), json.dumps(report))
+    except Exception as e:
+        print(f"Error caching analysis: {e}")
+
+
+def _cache_path(digest):
+    if not storage.is_digest(digest):
+        raise ValueError(f"Invalid solution digest: {digest!r}")
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_process_context())
+    return _executor
+
+
+def _process_context():
+    """Start workers fresh instead of forking the app.
+
+    A fork of the threaded app can inherit a lock another thread holds
+    (logging, storage, the flusher) and hang on it.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# Cohort mode
+
+def analyze_cohort(learners, max_workers=None, batch_size=64):
+    """Analyze every uploaded version of every (learner_id, storage) pair.
+
+    Solutions already in the cache are skipped and identical files are
+    analyzed once.  Work is submitted in batches so only batch_size solutions
+    are held in memory.  Returns (analyzed, cached) counts.
+    """
+    seen = set()
+    analyzed = 0
+    cached = 0
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_context()) as executor:
+        batch = {}
+        for digest, learner_storage in _iter_uploads(learners):
+            if digest in seen:
+                continue
+            seen.add(digest)
+            if get_report(digest) is not None:
+                cached += 1
+                continue
+            content = learner_storage.get_blob(digest)
+            if content is None:
+                continue
+            batch[digest] = executor.submit(analyze_source, content)
+            if len(batch) >= batch_size:
+                analyzed += _collect(batch)
+                batch = {}
+        analyzed += _collect(batch)
+    return analyzed, cached
+
+
+def _iter_uploads(learners):
+    for learner_id, learner_storage in learners:
+        data = learner_storage.load() or {}
+        for upload in data.get("uploads", {}).values():
+            if not isinstance(upload, dict):
+                continue
+            for version in upload.get("versions", []):
+                if version.get("sha256"):
+                    yield version["sha256"], learner_storage
+
+
+def _collect(batch):
+    for digest, future in batch.items():
+        try:
+            _store(digest, future.result())
+        except Exception as e:
+            print(f"Error analyzing solution {digest[:12]}: {e}")
+    return len(batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze the uploaded solutions of a cohort.")
+    parser.add_argument("--dir", default=".", help="Cohort directory with one <learner>.json per learner")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    analyzed, cached = analyze_cohort(bulk_io.discover_learners(args.dir), args.workers)
+    print(f"Analyzed {analyzed} solutions, {cached} already cached, reports in {CACHE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,14 @@
 """
-Python Learning Tracker - A Streamlit app to track progress through a 21-day Python learning curriculum.
+Python Learning Tracker - A Streamlit app to track progress through a Python learning curriculum.
 """
 import streamlit as st
 import pandas as pd
 from datetime import datetime
 import calendar
 import base64
-from io import StringIO
-import os
-import json
 import time
 import gc
+from collections.abc import Mapping
 from functools import lru_cache
 
 # Import custom modules
@@ -18,6 +16,12 @@ import curriculum as curr
 import data_handler as dh
 import visualizations as viz
 import utils
+import analysis
+import grading
+import related
+import search
+import similarity
+import snapshots
 import email_notifications
 
 # Performance optimization settings
@@ -186,24 +190,8 @@ def local_css():
     </style>
     """, unsafe_allow_html=True)
 
-# Ensure data file exists
-DATA_FILE = "python_learning_progress.json"
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, 'w') as f:
-        json.dump({
-            "progress": {},
-            "notes": {},
-            "uploads": {},
-            "time_spent": {},
-            "resources_used": {},
-            "email_settings": {
-                "enabled": False,
-                "email": "",
-                "reminder_time": "09:00",
-                "missed_day_notification": True,
-                "daily_reminder": True
-            }
-        }, f, indent=4)
+# Curricula with more weeks than this show a week picker instead of tabs
+MAX_WEEK_TABS = 8
 
 # Email notification checker
 @lru_cache(maxsize=1)
@@ -276,25 +264,28 @@ def main():
     # Sidebar
     with st.sidebar:
         st.title("🐍 Python Learning")
-        st.subheader("21-Day Challenge")
+        st.subheader(curr.get_registry().title)
+        show_curriculum_selector()
         
         # Current progress stats
         completion_percentage = dh.get_completion_percentage()
         current_day = utils.get_current_day()
         current_streak = utils.calculate_learning_streak()
+        longest_streak = dh.get_longest_streak()[0]
         total_study_time = utils.get_total_study_time()
         
         # Display current stats
         st.metric("Overall Progress", f"{completion_percentage:.1f}%")
         st.metric("Current Day", f"Day {current_day}")
         st.metric("Learning Streak", f"{current_streak} days")
+        st.metric("Longest Streak", f"{longest_streak} days")
         st.metric("Total Study Time", utils.format_time_display(total_study_time))
         
         # Navigation options
         st.subheader("Navigation")
         page = st.radio(
             "Go to:",
-            ["Dashboard", "Day Tracker", "Weekly View", "Notes & Reflections", "Email Settings"]
+            ["Dashboard", "Day Tracker", "Weekly View", "Notes & Reflections", "Search", "Similar Solutions", "Email Settings"]
         )
         
         # Additional resources
@@ -322,9 +313,31 @@ def main():
         show_weekly_view()
     elif page == "Notes & Reflections":
         show_notes_page()
+    elif page == "Search":
+        show_search_page()
+    elif page == "Similar Solutions":
+        show_similarity_report()
     elif page == "Email Settings":
         show_email_settings()
 
+def show_curriculum_selector():
+    """Let the learner switch between the registered curricula."""
+    curricula = curr.get_curricula()
+    if len(curricula) < 2:
+        return
+    
+    curriculum_ids = list(curricula)
+    enrolled = dh.get_curriculum().id
+    selected = st.selectbox(
+        "Curriculum:",
+        curriculum_ids,
+        index=curriculum_ids.index(enrolled),
+        format_func=lambda curriculum_id: f"{curricula[curriculum_id].title} ({len(curricula[curriculum_id].days)} days)"
+    )
+    if selected != enrolled:
+        dh.enroll(selected)
+        st.rerun()
+
 def show_dashboard():
     """Display the main dashboard with progress visualizations."""
     st.header("Learning Dashboard")
@@ -350,7 +363,7 @@ def show_dashboard():
     
     with col2:
         weekly_progress = dh.get_weekly_progress()
-        total_by_week = [7, 7, 7]  # 7 days each week
+        total_by_week = curr.get_registry().week_lengths.tolist()
         weekly_completion = [
             f"Week {i+1}: {completed}/{total}" 
             for i, (completed, total) in enumerate(zip(weekly_progress, total_by_week))
@@ -361,7 +374,7 @@ def show_dashboard():
     
     with col3:
         current_day = utils.get_current_day()
-        if current_day <= 21:
+        if dh.get_first_incomplete_day() is not None:
             day_info = utils.get_day_info(current_day)
             if day_info:
                 st.subheader("Current Topic")
@@ -374,11 +387,11 @@ def show_dashboard():
                 st.markdown("*Topic information not available*")
         else:
             st.subheader("Congratulations!")
-            st.markdown("You've completed the 21-day Python curriculum! 🎉")
+            st.markdown(f"You've completed the {curr.get_days_count()}-day Python curriculum! 🎉")
     
     # Progress heatmap
     st.subheader("Progress Tracker")
-    progress_data = dh.get_all_progress_data()
+    progress_data = dh.get_progress_frame()
     st.plotly_chart(viz.create_progress_heatmap(progress_data), use_container_width=True)
     
     # Weekly stats
@@ -400,6 +413,13 @@ def show_dashboard():
     st.subheader("Activity Calendar")
     st.plotly_chart(viz.create_streak_calendar(progress_data), use_container_width=True)
     
+    streak_runs = dh.get_streak_runs()
+    if streak_runs:
+        with st.expander(f"Streak history ({len(streak_runs)} streaks)"):
+            st.table(pd.DataFrame(streak_runs[::-1]).rename(
+                columns={"start": "From", "end": "To", "length": "Days"}
+            ))
+    
     # Upcoming days
     st.subheader("Coming Up Next")
     upcoming = utils.get_upcoming_days(current_day)
@@ -418,10 +438,10 @@ def show_dashboard():
                     
                     resources = day['resources']
                     for resource in resources:
-                        if isinstance(resource, dict) and 'url' in resource:
+                        if isinstance(resource, Mapping) and 'url' in resource:
                             st.markdown(f"""<div class="resource-link"><a href="{resource['url']}" target="_blank">{resource['name']} 🔗</a></div>""", unsafe_allow_html=True)
                         else:
-                            resource_name = resource['name'] if isinstance(resource, dict) else resource
+                            resource_name = resource['name'] if isinstance(resource, Mapping) else resource
                             st.markdown(f"- {resource_name}")
             except (KeyError, TypeError):
                 # Skip days with missing data
@@ -434,7 +454,8 @@ def show_day_tracker():
     st.header("Day Tracker")
     
     # Day selection
-    day_number = st.number_input("Select Day:", min_value=1, max_value=21, value=utils.get_current_day())
+    day_number = st.number_input("Select Day:", min_value=1, max_value=curr.get_days_count(),
+                                 value=utils.get_current_day(), key="day_tracker_day")
     
     # Get day info
     day_info = utils.get_day_info(day_number)
@@ -450,118 +471,220 @@ def show_day_tracker():
     **Scheduled Date:** {day_info['formatted_date']}
     """)
     
-    # Display completion status
-    try:
-        progress_data = dh.get_all_progress_data()
-        day_data = progress_data[day_number-1] if day_number <= len(progress_data) else {"completed": False, "time_spent_minutes": 0}
-        is_completed = day_data.get('completed', False)
-        
-        # Columns for layout
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("### Practice Exercise")
-            st.markdown(f"{day_info['practice']}")
+    # Everything changed on this rerun is saved as one write, fetching and
+    # grading run after the block
+    fetch_urls = []
+    with dh.transaction():
+        # Display completion status
+        try:
+            progress_data = dh.get_all_progress_data()
+            day_data = progress_data[day_number-1] if day_number <= len(progress_data) else {"completed": False, "time_spent_minutes": 0}
+            is_completed = day_data.get('completed', False)
             
-            st.markdown("### Resources")
-            resources = day_info.get('resources', [])
-            resources_used = dh.get_resources_used(day_number)
+            # Columns for layout
+            col1, col2 = st.columns(2)
             
-            for resource in resources:
-                resource_name = resource['name'] if isinstance(resource, dict) else resource
-                resource_key = resource_name  # Use the name as the key for checkbox
+            with col1:
+                st.markdown("### Practice Exercise")
+                st.markdown(f"{day_info['practice']}")
                 
-                # Check if this resource was used
-                is_checked = resource_name in resources_used
+                st.markdown("### Resources")
+                resources = day_info.get('resources', [])
+                resources_used = dh.get_resources_used(day_number)
                 
-                # Create a row with checkbox and link
-                col1, col2 = st.columns([1, 3])
-                with col1:
-                    if st.checkbox("", value=is_checked, key=f"resource_{day_number}_{resource_key}"):
-                        if not is_checked:
-                            dh.mark_resource_used(day_number, resource_name)
-                    else:
-                        if is_checked:
-                            # Remove the resource from used resources
-                            data = dh.load_data()
-                            if str(day_number) in data["resources_used"]:
-                                if resource_name in data["resources_used"][str(day_number)]:
-                                    data["resources_used"][str(day_number)].remove(resource_name)
-                                    dh.save_data(data)
+                for resource in resources:
+                    resource_name = resource['name'] if isinstance(resource, Mapping) else resource
+                    resource_key = resource_name  # Use the name as the key for checkbox
+                    
+                    # Check if this resource was used
+                    is_checked = resource_name in resources_used
+                    
+                    # Create a row with checkbox and link
+                    col1, col2 = st.columns([1, 3])
+                    with col1:
+                        if st.checkbox("", value=is_checked, key=f"resource_{day_number}_{resource_key}"):
+                            if not is_checked:
+                                dh.mark_resource_used(day_number, resource_name)
+                        else:
+                            if is_checked:
+                                # Remove the resource from used resources
+                                dh.remove_resource_used(day_number, resource_name)
+                    
+                    with col2:
+                        if isinstance(resource, Mapping) and 'url' in resource:
+                            st.markdown(f"""<div class="resource-link"><a href="{resource['url']}" target="_blank">{resource_name} 🔗</a></div>""", unsafe_allow_html=True)
+                            # Read from the snapshot on disk, never fetched while rendering
+                            excerpt = snapshots.get_excerpt(resource['url'])
+                            if excerpt:
+                                with st.expander("Offline excerpt"):
+                                    st.write(excerpt)
+                        else:
+                            st.text(resource_name)
                 
-                with col2:
-                    if isinstance(resource, dict) and 'url' in resource:
-                        st.markdown(f"""<div class="resource-link"><a href="{resource['url']}" target="_blank">{resource_name} 🔗</a></div>""", unsafe_allow_html=True)
-                    else:
-                        st.text(resource_name)
-        
-        with col2:
-            # Completion tracking
-            st.markdown("### Progress Tracking")
-            completed = st.checkbox("Mark as completed", value=is_completed)
+                urls = [resource['url'] for resource in resources if isinstance(resource, Mapping) and resource.get('url')]
+                if urls and st.button("Save offline copies", key=f"snapshot_{day_number}"):
+                    fetch_urls = urls
+                    snapshot_status = st.empty()
             
-            if completed != is_completed:
-                dh.mark_day_complete(day_number, completed)
-                st.success(f"Day {day_number} marked as {'completed' if completed else 'incomplete'}!")
-                st.rerun()
+            with col2:
+                # Completion tracking
+                st.markdown("### Progress Tracking")
+                completed = st.checkbox("Mark as completed", value=is_completed, key=f"completed_{day_number}")
+                
+                if completed != is_completed:
+                    dh.mark_day_complete(day_number, completed)
+                    st.success(f"Day {day_number} marked as {'completed' if completed else 'incomplete'}!")
+                    st.rerun()
+                
+                # Time tracking
+                st.markdown("### Time Spent")
+                
+                # Get current time spent in minutes
+                time_spent_min = day_data.get('time_spent_minutes', 0)
+                hours = time_spent_min // 60
+                minutes = time_spent_min % 60
+        except Exception as e:
+            st.error(f"Error loading progress data: {e}")
+            st.info("Using default values instead.")
+            is_completed = False
+            hours = 0
+            minutes = 0
             
-            # Time tracking
-            st.markdown("### Time Spent")
+            col1, col2 = st.columns(2)
+            with col1:
+                hours_input = st.number_input("Hours:", min_value=0, value=int(hours), key=f"hours_{day_number}")
+            with col2:
+                minutes_input = st.number_input("Minutes:", min_value=0, max_value=59, value=int(minutes), key=f"minutes_{day_number}")
             
-            # Get current time spent in minutes
-            time_spent_min = day_data.get('time_spent_minutes', 0)
-            hours = time_spent_min // 60
-            minutes = time_spent_min % 60
-    except Exception as e:
-        st.error(f"Error loading progress data: {e}")
-        st.info("Using default values instead.")
-        is_completed = False
-        hours = 0
-        minutes = 0
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            hours_input = st.number_input("Hours:", min_value=0, value=int(hours), key=f"hours_{day_number}")
-        with col2:
-            minutes_input = st.number_input("Minutes:", min_value=0, max_value=59, value=int(minutes), key=f"minutes_{day_number}")
-        
-        if hours_input != hours or minutes_input != minutes:
-            dh.update_time_spent(day_number, hours_input, minutes_input)
-            st.success(f"Time updated to {hours_input} hours and {minutes_input} minutes!")
-            st.rerun()
-    
-    # Notes section
-    st.markdown("### Notes & Reflections")
-    current_note = dh.get_note(day_number)
-    note = st.text_area("Your notes for this day:", value=current_note, height=200, key=f"note_{day_number}")
-    
-    if note != current_note:
-        dh.save_note(day_number, note)
-        st.success("Notes saved successfully!")
-    
-    # Exercise Upload
-    st.markdown("### Upload Exercise Solution")
-    uploaded_file = st.file_uploader("Upload your solution (Python file):", type=["py"], key=f"upload_{day_number}")
-    
-    if uploaded_file:
-        # Read and display the content
-        stringio = StringIO(uploaded_file.getvalue().decode("utf-8"))
-        code = stringio.read()
+            if hours_input != hours or minutes_input != minutes:
+                dh.update_time_spent(day_number, hours_input, minutes_input)
+                st.success(f"Time updated to {hours_input} hours and {minutes_input} minutes!")
+                st.rerun()
         
-        st.code(code, language="python")
+        # Notes section
+        st.markdown("### Notes & Reflections")
+        current_note = dh.get_note(day_number)
+        note = st.text_area("Your notes for this day:", value=current_note, height=200, key=f"note_{day_number}")
         
-        # Save the uploaded file information
-        data = dh.load_data()
-        if "uploads" not in data:
-            data["uploads"] = {}
+        if note != current_note:
+            dh.save_note(day_number, note)
+            st.success("Notes saved successfully!")
+        show_related_notes(day_number)
         
-        data["uploads"][str(day_number)] = {
-            "filename": uploaded_file.name,
-            "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        # Exercise Upload
+        st.markdown("### Upload Exercise Solution")
+        uploaded_file = st.file_uploader("Upload your solution (Python file):", type=["py"], key=f"upload_{day_number}")
         
-        dh.save_data(data)
-        st.success(f"Solution for Day {day_number} uploaded successfully!")
+        if uploaded_file:
+            # Stored and previewed chunk by chunk, a rerun with the same file writes nothing
+            try:
+                preview, truncated, size = dh.save_upload_file(day_number, uploaded_file.name, uploaded_file)
+            except ValueError as e:
+                st.error(f"Could not upload {uploaded_file.name}: {e}")
+            else:
+                st.code(preview, language="python")
+                if truncated:
+                    st.caption(f"Showing the first {len(preview)} characters of {size} bytes.")
+                st.success(f"Solution for Day {day_number} uploaded successfully!")
+    
+    if fetch_urls:
+        with snapshot_status.container():
+            with st.spinner("Fetching resources..."):
+                outcomes = snapshots.refresh(fetch_urls)
+            if outcomes.get("failed"):
+                st.warning(f"Could not fetch {outcomes['failed']} of {len(fetch_urls)} resources.")
+            else:
+                st.success("Offline copies saved.")
+    
+    versions = dh.get_upload_versions(day_number)
+    if versions:
+        with st.expander(f"Saved solutions ({len(versions)})"):
+            for version in reversed(versions):
+                st.markdown(f"- **{version['filename']}** ({version['upload_time']}, {version['size']} bytes)")
+        if not dh.get_storage().has_blob(versions[-1]["sha256"]):
+            st.warning("The file of the latest solution is missing, upload it again to analyze and test it.")
+            return
+        show_solution_analysis(day_number, versions[-1]["sha256"], day_info["topic"])
+        show_solution_grade(day_number, versions[-1]["sha256"])
+        show_similar_solutions(day_number, versions[-1]["sha256"])
+
+def show_related_notes(day_number):
+    """List the notes most similar to the note of a day."""
+    include_cohort = False
+    if related.load_cohort() is not None:
+        include_cohort = st.checkbox("Include notes of other learners", key=f"related_cohort_{day_number}")
+    related_notes = dh.get_related_notes(day_number, include_cohort=include_cohort)
+    if not related_notes:
+        return
+    
+    with st.expander(f"Related notes ({len(related_notes)})"):
+        for related_note in related_notes:
+            day_info = utils.get_day_info(related_note["day"])
+            title = f"Day {related_note['day']}: {day_info['topic']}" if day_info else f"Day {related_note['day']}"
+            if related_note["learner"] == dh.LEARNER_ID:
+                st.markdown(f"**{title}** ({related_note['score']:.0%} similar)")
+                st.caption(search.snippet(dh.get_note(related_note["day"]), ""))
+            else:
+                st.markdown(f"**{title}**, {related_note['learner']} ({related_note['score']:.0%} similar)")
+
+def show_similar_solutions(day_number, digest):
+    """Index the latest solution of a day and list near-duplicates from other learners."""
+    curriculum_id = dh.get_curriculum().id
+    load_content = lambda: dh.get_upload_content(day_number, digest)
+    similarity.index_solution(day_number, dh.LEARNER_ID, digest, load_content, curriculum_id=curriculum_id)
+    matches = similarity.find_similar(day_number, dh.LEARNER_ID, digest, load_content, curriculum_id=curriculum_id)
+    if matches:
+        names = ", ".join(f"{learner} ({score:.0%})" for learner, _, score in matches[:5])
+        st.warning(f"Very similar to the solutions of: {names}")
+
+def show_solution_grade(day_number, digest):
+    """Display the test results of a solution, running the tests on request."""
+    # The practice tests are written for the default curriculum's days
+    curriculum_id = dh.get_curriculum().id
+    if not grading.get_suite(day_number, curriculum_id):
+        return
+
+    st.markdown("#### Practice Tests")
+    verdict = grading.get_verdict(digest, day_number, curriculum_id)
+    if verdict is None:
+        if not st.button("Run tests", key=f"grade_{day_number}"):
+            return
+        with st.spinner("Running tests..."):
+            verdict = grading.grade(digest, dh.get_upload_content(day_number, digest), day_number,
+                                    curriculum_id=curriculum_id)
+
+    if verdict["passed"] == verdict["total"]:
+        st.success(f"All {verdict['total']} tests passed!")
+    else:
+        st.warning(f"{verdict['passed']} of {verdict['total']} tests passed.")
+    for case in verdict["cases"]:
+        if not case["passed"]:
+            st.markdown(f"- ❌ **{case['name']}**: {case['reason']}")
+
+def show_solution_analysis(day_number, digest, topic):
+    """Display the static analysis report of a solution, computed in the background."""
+    st.markdown("#### Code Analysis")
+    report = analysis.request_report(digest, lambda: dh.get_upload_content(day_number, digest))
+    if report is None:
+        st.info("Your solution is being analyzed, the report will appear on the next refresh.")
+        return
+
+    if report["syntax_error"]:
+        error = report["syntax_error"]
+        st.error(f"Syntax error on line {error['line']}: {error['message']}")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Lines", report["lines"])
+    col2.metric("Functions", len(report["functions"]))
+    col3.metric("Max complexity", report["max_complexity"])
+
+    topic_check = analysis.compare_with_topic(report, topic)
+    if topic_check["used"]:
+        st.success(f"Uses {', '.join(topic_check['used'])} from today's topic.")
+    if topic_check["missing"]:
+        st.warning(f"Not used yet from today's topic: {', '.join(topic_check['missing'])}.")
+    st.caption(f"Constructs used: {', '.join(report['constructs']) or 'none'}")
 
 def show_weekly_view():
     """Display a view of each week's curriculum."""
@@ -570,11 +693,20 @@ def show_weekly_view():
     # Get curriculum data
     curriculum_data = curr.get_curriculum_data()
     
-    # Create tabs for each week
-    week_tabs = st.tabs([f"Week {week['week']}: {week['title']}" for week in curriculum_data])
+    week_labels = [f"Week {week['week']}: {week['title']}" for week in curriculum_data]
+    
+    if len(curriculum_data) > MAX_WEEK_TABS:
+        # Long curricula render only the selected week instead of a tab per week
+        current_week = int(curr.get_registry().week_index[utils.get_current_day() - 1])
+        selected = st.selectbox("Week:", range(len(curriculum_data)), index=current_week,
+                                format_func=lambda i: week_labels[i])
+        week_slots = [(selected, st.container())]
+    else:
+        # Create tabs for each week
+        week_slots = list(enumerate(st.tabs(week_labels)))
     
     # Fill each week's tab
-    for i, week_tab in enumerate(week_tabs):
+    for i, week_tab in week_slots:
         with week_tab:
             week_data = curriculum_data[i]
             st.subheader(f"Week {week_data['week']}: {week_data['title']}")
@@ -611,10 +743,10 @@ def show_weekly_view():
                     st.markdown("**Resources:**")
                     resources = day.get('resources', [])
                     for resource in resources:
-                        if isinstance(resource, dict) and 'url' in resource:
+                        if isinstance(resource, Mapping) and 'url' in resource:
                             st.markdown(f"""<div class="resource-link"><a href="{resource['url']}" target="_blank">{resource['name']} 🔗</a></div>""", unsafe_allow_html=True)
                         else:
-                            resource_name = resource['name'] if isinstance(resource, dict) else resource
+                            resource_name = resource['name'] if isinstance(resource, Mapping) else resource
                             st.markdown(f"- {resource_name}")
                     
                     # Show completion status
@@ -654,23 +786,22 @@ def show_weekly_view():
             
             # Display progress for this week
             week_progress = dh.get_weekly_progress()[i]
-            st.progress(week_progress / 7)
-            st.caption(f"Week {i+1} Progress: {week_progress}/7 days completed")
+            week_length = len(week_data['days'])
+            st.progress(week_progress / week_length if week_length else 0.0)
+            st.caption(f"Week {week_data['week']} Progress: {week_progress}/{week_length} days completed")
 
 def show_notes_page():
     """Display all notes in one place."""
     st.header("Learning Notes & Reflections")
     
-    # Get all data
-    data = dh.load_data()
-    notes = data.get("notes", {})
+    # Get all notes, ordered by day
+    notes = dh.get_all_notes()
     
     if not notes:
         st.info("You haven't added any notes yet. Go to the Day Tracker to add notes for specific days.")
         return
     
-    # Sort days by number
-    sorted_days = sorted([int(day) for day in notes.keys()])
+    sorted_days = list(notes)
     
     for day in sorted_days:
         day_info = utils.get_day_info(day)
@@ -678,7 +809,7 @@ def show_notes_page():
             continue
             
         with st.expander(f"Day {day}: {day_info['topic']}"):
-            st.markdown(notes[str(day)])
+            st.markdown(notes[day])
             st.caption(f"Week {day_info['week']}: {day_info['week_title']} | Scheduled: {day_info['formatted_date']}")
     
     # Export option
@@ -690,7 +821,7 @@ def show_notes_page():
                 notes_text += f"# Day {day}: {day_info['topic']}\n"
                 notes_text += f"Week {day_info['week']}: {day_info['week_title']}\n"
                 notes_text += f"Scheduled Date: {day_info['formatted_date']}\n\n"
-                notes_text += f"{notes[str(day)]}\n\n"
+                notes_text += f"{notes[day]}\n\n"
                 notes_text += "-" * 50 + "\n\n"
         
         # Create download link
@@ -698,6 +829,55 @@ def show_notes_page():
         href = f'<a href="data:text/plain;base64,{b64}" download="python_learning_notes.txt">Download Notes</a>'
         st.markdown(href, unsafe_allow_html=True)
 
+def show_search_page():
+    """Search the curriculum, notes and uploaded solutions."""
+    st.header("Search")
+    
+    query = st.text_input("Search for:", placeholder='e.g. dict*, "list comprehension"')
+    kind_labels = {"Topics": "topic", "Notes": "note", "Solutions": "solution"}
+    selected = st.multiselect("In:", list(kind_labels), default=list(kind_labels))
+    st.caption('Words must all match. End a word with * to match its prefix, quote words to match a phrase.')
+    
+    if not query.strip():
+        return
+    
+    start = time.perf_counter()
+    results = dh.search_documents(query, limit=20, kinds={kind_labels[label] for label in selected})
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    if not results:
+        st.info("No matches.")
+        return
+    
+    st.caption(f"{len(results)} result{'s' if len(results) != 1 else ''} in {elapsed_ms:.0f} ms")
+    for result in results:
+        st.markdown(f"**Day {result['day']}: {result['title']}** · {result['kind']}")
+        st.text(result["snippet"])
+
+def show_similarity_report():
+    """Display groups of near-duplicate solutions for each indexed day."""
+    st.header("Similar Solutions")
+
+    curriculum_id = dh.get_curriculum().id
+    days = similarity.indexed_days(curriculum_id)
+    if not days:
+        st.info("No solutions have been indexed yet. Upload a solution or run `python similarity.py reindex --dir <cohort>`.")
+        return
+
+    threshold = st.slider("Similarity threshold", min_value=0.5, max_value=1.0,
+                          value=similarity.DUPLICATE_THRESHOLD, step=0.05)
+
+    for day in days:
+        index = similarity.load_index(day, curriculum_id)
+        clusters = index.clusters(threshold)
+        day_info = utils.get_day_info(day)
+        title = f"Day {day}: {day_info['topic']}" if day_info else f"Day {day}"
+        with st.expander(f"{title} ({len(index)} solutions, {len(clusters)} groups)"):
+            if not clusters:
+                st.write("No near-duplicates.")
+            for group in clusters:
+                st.markdown(f"- {', '.join(group)}")
+
 def show_email_settings():
     """Display email notification settings."""
     st.header("Email Reminder Settings")
@@ -772,19 +952,13 @@ def show_email_settings():
             st.session_state.daily_reminder = daily_reminder
             
             # Save settings to data file
-            data = dh.load_data()
-            if "email_settings" not in data:
-                data["email_settings"] = {}
-                
-            data["email_settings"] = {
+            dh.save_settings("email_settings", {
                 "enabled": email_enabled,
                 "email": email,
                 "reminder_time": reminder_time.strftime("%H:%M"),
                 "missed_day_notification": missed_day_notification,
                 "daily_reminder": daily_reminder
-            }
-            
-            dh.save_data(data)
+            })
             st.success("Email settings saved successfully!")
     
     # Test email button outside the form
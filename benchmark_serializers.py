@@ -0,0 +1,79 @@
+"""
+Benchmark of the data file serializers.
+
+Compares encode/decode time and on-disk size of every available codec on
+tracker documents of realistic shape and growing length.
+
+Usage: python benchmark_serializers.py [repeats]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+import serializers
+
+
+def build_document(days_count):
+    """Build a tracker document with progress for days_count days."""
+    start = date(2025, 1, 1)
+    data = {
+        "progress": {},
+        "uploads": {},
+        "time_spent": {},
+        "resources_used": {},
+        "email_settings": {
+            "enabled": True,
+            "email": "learner@example.com",
+            "reminder_time": "09:00",
+            "missed_day_notification": True,
+            "daily_reminder": True
+        },
+        "version": days_count * 3
+    }
+    for day in range(1, days_count + 1):
+        key = str(day)
+        if day % 5:
+            data["progress"][key] = {
+                "completed": True,
+                "date_completed": (start + timedelta(days=day)).strftime("%Y-%m-%d")
+            }
+        data["time_spent"][key] = 30 + day % 90
+        data["resources_used"][key] = ["W3Schools", "Real Python"][: 1 + day % 2]
+        if day % 3 == 0:
+            data["uploads"][key] = {
+                "filename": f"day_{day}_solution.py",
+                "upload_time": (start + timedelta(days=day)).strftime("%Y-%m-%d 10:15:00")
+            }
+    return data
+
+
+def time_call(function, argument, repeats):
+    """Best time of repeats calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    codecs = serializers.available_codecs()
+    print(f"Available codecs: {', '.join(codecs)} (auto = {serializers.resolve_codec('auto')})")
+
+    for days_count in (21, 365, 5000):
+        data = build_document(days_count)
+        print(f"\n{days_count}-day document")
+        print(f"{'codec':<14}{'encode ms':>12}{'decode ms':>12}{'size KB':>12}")
+        for codec in codecs:
+            encode, decode, available = serializers.CODECS[codec]
+            raw = encode(data)
+            assert serializers.decode(raw) == data
+            encode_ms = time_call(encode, data, repeats)
+            decode_ms = time_call(decode, raw, repeats)
+            print(f"{codec:<14}{encode_ms:>12.3f}{decode_ms:>12.3f}{len(raw) / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
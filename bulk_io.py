@@ -0,0 +1,375 @@
+"""
+Streaming bulk export and import of learner progress.
+
+Every learner's data is flattened into rows with the columns in COLUMNS, one
+row per progress entry, time entry, used resource, note or upload.  Rows are
+produced and consumed by generators, so a cohort of any size is moved with
+memory bounded by one learner's document and one import chunk.
+
+A cohort is a directory with one data file per learner (<learner>.json), the
+layout the JSON storage backend uses.  The formats are CSV, JSONL and Parquet
+(Parquet needs pyarrow).
+
+Usage:
+    python bulk_io.py export cohort.csv --dir learners
+    python bulk_io.py import cohort.csv --dir learners
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+import storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# sha256 and size are only set on upload rows
+COLUMNS = ("learner", "record", "day", "value", "date", "sha256", "size")
+RECORD_TYPES = ("progress", "time", "resource", "note", "upload")
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Rows applied per storage commit during an import
+IMPORT_CHUNK_SIZE = 1000
+
+# Import errors kept in the report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def discover_learners(directory):
+    """Yield (learner_id, storage) for every learner data file in a directory."""
+    learner_ids = set()
+    for name in os.listdir(directory):
+        # A learner that was only written to so far has just a journal
+        for suffix in (".json", ".json.journal"):
+            if name.endswith(suffix):
+                learner_ids.add(name[:-len(suffix)])
+    for learner_id in sorted(learner_ids):
+        yield learner_id, storage.JsonStorage(os.path.join(directory, f"{learner_id}.json"))
+
+
+def open_learner(directory, learner_id):
+    """Open the storage of a learner in a cohort directory, creating it if needed."""
+    if not learner_id or os.sep in learner_id or learner_id.startswith("."):
+        raise ValueError(f"Invalid learner id: {learner_id!r}")
+    return storage.JsonStorage(os.path.join(directory, f"{learner_id}.json"))
+
+
+# Export
+
+def iter_learner_rows(learner_id, learner_storage):
+    """Yield the rows of one learner."""
+    data = learner_storage.load() or {}
+
+    for day, record in _by_day(data.get("progress", {})):
+        if isinstance(record, dict) and record.get("completed", False):
+            yield _row(learner_id, "progress", day, "completed", record.get("date_completed"))
+    for day, minutes in _by_day(data.get("time_spent", {})):
+        yield _row(learner_id, "time", day, minutes)
+    for day, resources in _by_day(data.get("resources_used", {})):
+        for resource in resources:
+            yield _row(learner_id, "resource", day, resource)
+    for day, upload in _by_day(data.get("uploads", {})):
+        if isinstance(upload, dict):
+            yield _row(learner_id, "upload", day, upload.get("filename"), upload.get("upload_time"),
+                       sha256=upload.get("sha256"), size=upload.get("size"))
+    # Notes are read one blob at a time, files from before the note store
+    # may still have them inline
+    note_days = set(learner_storage.note_days())
+    for day, note_text in _by_day(data.get("notes", {})):
+        if str(day) not in note_days and note_text:
+            yield _row(learner_id, "note", day, note_text)
+    for day in sorted(note_days, key=int):
+        note_text = learner_storage.get_note(day)
+        if note_text:
+            yield _row(learner_id, "note", int(day), note_text)
+
+
+def iter_cohort_rows(learners):
+    """Yield the rows of every (learner_id, storage) pair, one learner at a time."""
+    for learner_id, learner_storage in learners:
+        yield from iter_learner_rows(learner_id, learner_storage)
+
+
+def _by_day(section):
+    for key in sorted(section, key=lambda k: (not k.isdigit(), int(k) if k.isdigit() else 0, k)):
+        if key.isdigit():
+            yield int(key), section[key]
+
+
+def _row(learner_id, record, day, value, date=None, sha256=None, size=None):
+    return {"learner": learner_id, "record": record, "day": day, "value": value, "date": date,
+            "sha256": sha256, "size": size}
+
+
+def write_rows(rows, path, fmt):
+    """Stream rows to a file in the given format. Returns the number of rows written."""
+    if fmt == "csv":
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            return write_csv(rows, f)
+    if fmt == "jsonl":
+        with open(path, 'w', encoding='utf-8') as f:
+            return write_jsonl(rows, f)
+    if fmt == "parquet":
+        return write_parquet(rows, path)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def write_csv(rows, f):
+    writer = csv.DictWriter(f, fieldnames=COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, f):
+    count = 0
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_parquet(rows, path, chunk_size=IMPORT_CHUNK_SIZE):
+    """Write rows as Parquet, one row group per chunk."""
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow")
+
+    # Values are mixed (minutes, names, note text), store them as strings
+    schema = pa.schema([
+        ("learner", pa.string()),
+        ("record", pa.string()),
+        ("day", pa.int64()),
+        ("value", pa.string()),
+        ("date", pa.string()),
+        ("sha256", pa.string()),
+        ("size", pa.int64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            columns = {name: [row.get(name) for row in chunk] for name in COLUMNS}
+            columns["value"] = [None if value is None else str(value) for value in columns["value"]]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            count += len(chunk)
+    return count
+
+
+# Import
+
+def read_rows(path, fmt):
+    """Stream rows from a file in the given format."""
+    if fmt == "csv":
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    elif fmt == "jsonl":
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Reported by validate_row like any other bad row
+                        yield {"_error": f"line {line_number} is not valid JSON"}
+    elif fmt == "parquet":
+        if pq is None:
+            raise RuntimeError("Parquet import needs pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=IMPORT_CHUNK_SIZE):
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def validate_row(row):
+    """Check a row and convert its fields to their stored types.
+
+    Raises ValueError describing the first problem found.
+    """
+    if "_error" in row:
+        raise ValueError(row["_error"])
+
+    learner_id = str(row.get("learner") or "").strip()
+    record = row.get("record")
+    if not learner_id:
+        raise ValueError("missing learner")
+    if record not in RECORD_TYPES:
+        raise ValueError(f"unknown record type {record!r}")
+    try:
+        day = int(row.get("day"))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid day {row.get('day')!r}")
+    if day < 1:
+        raise ValueError(f"invalid day {day}")
+
+    value = row.get("value")
+    date = row.get("date") or None
+    if record == "time":
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid minutes {value!r}")
+        if value < 0:
+            raise ValueError(f"invalid minutes {value}")
+    elif record == "progress":
+        if not date:
+            raise ValueError("completed day without a date")
+    elif not value:
+        raise ValueError(f"empty {record}")
+
+    # Files exported before uploads carried their digest have no such columns
+    sha256 = row.get("sha256") or None
+    size = row.get("size")
+    size = None if size in (None, "") else size
+    if record == "upload" and sha256 is not None:
+        if not storage.is_digest(sha256):
+            raise ValueError(f"invalid sha256 {sha256!r}")
+        try:
+            size = None if size is None else int(size)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid size {size!r}")
+
+    return {"learner": learner_id, "record": record, "day": day, "value": value, "date": date,
+            "sha256": sha256, "size": size}
+
+
+def import_rows(rows, open_storage, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate rows and apply them chunk by chunk.
+
+    open_storage(learner_id) returns the storage of a learner.  Each chunk is
+    committed with one write per learner, invalid rows are skipped and
+    reported.  Returns a report dict with the row, imported and error counts.
+    """
+    report = {"rows": 0, "imported": 0, "error_count": 0, "errors": []}
+    for chunk in _chunks(rows, chunk_size):
+        by_learner = {}
+        for row in chunk:
+            report["rows"] += 1
+            try:
+                valid = validate_row(row)
+            except ValueError as e:
+                report["error_count"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append(f"row {report['rows']}: {e}")
+                continue
+            by_learner.setdefault(valid["learner"], []).append(valid)
+
+        for learner_id, learner_rows in by_learner.items():
+            _apply_learner_rows(open_storage(learner_id), learner_rows)
+            report["imported"] += len(learner_rows)
+    return report
+
+
+def _apply_learner_rows(learner_storage, rows):
+    """Commit the rows of one learner from one chunk."""
+    data = learner_storage.load() or {}
+    resources = {}
+    uploads = {}
+    changes = []
+    for row in rows:
+        day = str(row["day"])
+        if row["record"] == "progress":
+            changes.append(("progress", day, {"completed": True, "date_completed": row["date"]}))
+        elif row["record"] == "time":
+            changes.append(("time_spent", day, row["value"]))
+        elif row["record"] == "upload":
+            if row["sha256"] and not learner_storage.has_blob(row["sha256"]):
+                # Files are not exported, a digest without its content here
+                # would point the app at a solution that does not exist
+                row = dict(row, sha256=None, size=None)
+            existing = uploads.get(day) or data.get("uploads", {}).get(day) or {}
+            uploads[day] = _merge_upload(existing, row)
+        elif row["record"] == "resource":
+            if day not in resources:
+                resources[day] = list(data.get("resources_used", {}).get(day, []))
+            if row["value"] not in resources[day]:
+                resources[day].append(row["value"])
+        elif row["record"] == "note":
+            learner_storage.put_note(day, row["value"])
+
+    changes.extend(("resources_used", day, used) for day, used in resources.items())
+    changes.extend(("uploads", day, upload) for day, upload in uploads.items())
+    if changes:
+        learner_storage.put_records(changes)
+
+
+def _merge_upload(existing, row):
+    """Merge an upload row into the stored upload record of its day.
+
+    The saved versions are kept.  A row with a digest that is not the latest
+    version becomes a new version, a row without one only updates the file
+    name and time of a record without content.
+    """
+    if not row["sha256"]:
+        if existing.get("sha256"):
+            return existing
+        return dict(existing, filename=row["value"], upload_time=row["date"])
+    if existing.get("sha256") == row["sha256"]:
+        return existing
+
+    upload = {
+        "filename": row["value"],
+        "upload_time": row["date"],
+        "sha256": row["sha256"],
+        "size": row["size"],
+    }
+    versions = list(existing.get("versions", []))
+    if all(version.get("sha256") != row["sha256"] for version in versions):
+        versions.append(dict(upload))
+    upload["versions"] = versions
+    return upload
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _format_of(path, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lstrip(".").lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}, use --format")
+    return extension
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk export and import of learner progress.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="File to write or read")
+    parser.add_argument("--dir", default=".", help="Cohort directory with one <learner>.json per learner")
+    parser.add_argument("--format", choices=FORMATS, help="File format (default: from the extension)")
+    args = parser.parse_args(argv)
+    fmt = _format_of(args.path, args.format)
+
+    if args.command == "export":
+        count = write_rows(iter_cohort_rows(discover_learners(args.dir)), args.path, fmt)
+        print(f"Exported {count} rows to {args.path}")
+        return 0
+
+    os.makedirs(args.dir, exist_ok=True)
+    report = import_rows(read_rows(args.path, fmt), lambda learner_id: open_learner(args.dir, learner_id))
+    print(f"Imported {report['imported']} of {report['rows']} rows into {args.dir}")
+    for error in report["errors"]:
+        print(f"  {error}")
+    if report["error_count"] > len(report["errors"]):
+        print(f"  ... and {report['error_count'] - len(report['errors'])} more errors")
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
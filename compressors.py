@@ -0,0 +1,126 @@
+"""
+Transparent compression of stored payloads (notes and uploaded files).
+
+Payloads at or above COMPRESS_THRESHOLD bytes are compressed with zstd when
+the zstandard package is installed and with zlib otherwise.  Compressed
+payloads start with a marker (a NUL byte followed by the codec name), which
+never occurs at the start of UTF-8 text, so payloads written before
+compression existed are read back unchanged.  Payloads that do not get
+smaller are stored as they are.
+"""
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Payloads smaller than this are not worth compressing
+COMPRESS_THRESHOLD = int(os.environ.get("TRACKER_COMPRESS_THRESHOLD", 512))
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Headers of compressed payloads
+ZLIB_MARKER = b"\x00zl"
+ZSTD_MARKER = b"\x00zs"
+
+_stats = {"compressed": 0, "stored_raw": 0, "bytes_in": 0, "bytes_stored": 0}
+_stats_lock = threading.Lock()
+
+
+def compress(payload, threshold=None):
+    """Return payload (bytes) as it should be stored, compressed if it pays off."""
+    threshold = COMPRESS_THRESHOLD if threshold is None else threshold
+    stored = payload
+    if len(payload) >= threshold:
+        if zstandard is not None:
+            candidate = ZSTD_MARKER + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+        else:
+            candidate = ZLIB_MARKER + zlib.compress(payload, ZLIB_LEVEL)
+        if len(candidate) < len(payload):
+            stored = candidate
+
+    with _stats_lock:
+        _stats["compressed" if stored is not payload else "stored_raw"] += 1
+        _stats["bytes_in"] += len(payload)
+        _stats["bytes_stored"] += len(stored)
+    return stored
+
+
+def compress_chunks(chunks, threshold=None):
+    """Streaming compress(): yield the stored form of an iterable of byte chunks.
+
+    Only the first threshold bytes are buffered to decide whether to compress.
+    Unlike compress(), a compressed stream is kept even if it did not shrink.
+    """
+    threshold = COMPRESS_THRESHOLD if threshold is None else threshold
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= threshold:
+            break
+    else:
+        yield compress(head, threshold)
+        return
+
+    if zstandard is not None:
+        marker, compressor = ZSTD_MARKER, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        marker, compressor = ZLIB_MARKER, zlib.compressobj(ZLIB_LEVEL)
+    bytes_in = len(head)
+    bytes_stored = len(marker)
+    yield marker
+    out = compressor.compress(head)
+    bytes_stored += len(out)
+    yield out
+    for chunk in chunks:
+        bytes_in += len(chunk)
+        out = compressor.compress(chunk)
+        bytes_stored += len(out)
+        yield out
+    out = compressor.flush()
+    bytes_stored += len(out)
+    yield out
+
+    with _stats_lock:
+        _stats["compressed"] += 1
+        _stats["bytes_in"] += bytes_in
+        _stats["bytes_stored"] += bytes_stored
+
+
+def decompress(stored):
+    """Return the original payload of bytes written by compress().
+
+    Raises ValueError if the payload needs a codec that is not installed.
+    """
+    if stored.startswith(ZLIB_MARKER):
+        return zlib.decompress(stored[len(ZLIB_MARKER):])
+    if stored.startswith(ZSTD_MARKER):
+        if zstandard is None:
+            raise ValueError("Payload is zstd-compressed but zstandard is not installed")
+        # Streamed frames carry no content size, which ZstdDecompressor.decompress needs
+        return zstandard.ZstdDecompressor().decompressobj().decompress(stored[len(ZSTD_MARKER):])
+    return stored
+
+
+def compress_text(text, threshold=None):
+    return compress(text.encode("utf-8"), threshold)
+
+
+def decompress_text(stored):
+    """Decode a stored text payload, which may also be a plain str from older stores."""
+    if isinstance(stored, str):
+        return stored
+    return decompress(bytes(stored)).decode("utf-8")
+
+
+def get_stats():
+    """Return the compression counters of this process, including the bytes saved."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_stored"]
+    return stats
@@ -1,229 +1,434 @@
 """
 Module to handle the Python learning curriculum data.
+
+The curriculum is loaded once into a frozen registry with precomputed day
+and week records, looked up by number in O(1).  The 21-day plan below is the
+default; another plan can be loaded from a JSON or TOML file with the same
+shape (see load_curriculum), for example by setting TRACKER_CURRICULUM_FILE.
+
+Several curricula of any length can be offered side by side: every .json or
+.toml file in CURRICULA_DIR is registered under its file name, and a learner
+is enrolled in one of them (see data_handler.enroll).  The module-level
+functions below answer for the active curriculum of that enrollment.
 """
+import json
+import os
+from types import MappingProxyType
 
-def get_curriculum_data():
-    """Returns a structured representation of the 21-day Python learning curriculum."""
+import numpy as np
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11, TOML curricula need the tomli package
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Optional curriculum file used instead of the default plan
+CURRICULUM_FILE = os.environ.get("TRACKER_CURRICULUM_FILE")
+
+# Directory of additional curricula, one file per curriculum
+CURRICULA_DIR = os.environ.get("TRACKER_CURRICULA_DIR", "curricula")
+
+# Id of the built-in (or TRACKER_CURRICULUM_FILE) curriculum
+DEFAULT_CURRICULUM_ID = "default"
+DEFAULT_TITLE = "21-Day Challenge"
+
+DEFAULT_CURRICULUM = [
+    {
+        "week": 1,
+        "title": "Python Basics",
+        "days": [
+            {
+                "day": 1,
+                "topic": "Variables & Data Types",
+                "resources": [
+                    {"name": "W3Schools", "url": "https://www.w3schools.com/python/python_variables.asp"}, 
+                    {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=_uQrJ0TkZlc"}
+                ],
+                "practice": "Write a script to store and print your name, age, and favorite number."
+            },
+            {
+                "day": 2,
+                "topic": "Operators & Expressions",
+                "resources": [
+                    {"name": "Programiz", "url": "https://www.programiz.com/python-programming/operators"}, 
+                    {"name": "Corey Schafer's Video", "url": "https://www.youtube.com/watch?v=YAbOiGr83cI"}
+                ],
+                "practice": "Write a calculator that adds, subtracts, multiplies, and divides two numbers."
+            },
+            {
+                "day": 3,
+                "topic": "If Statements & Conditions",
+                "resources": [
+                    {"name": "Real Python", "url": "https://realpython.com/python-conditional-statements/"}, 
+                    {"name": "freeCodeCamp Video", "url": "https://www.youtube.com/watch?v=DZwmZ8Usvnk"}
+                ],
+                "practice": "Create a program that checks if a number is positive, negative, or zero."
+            },
+            {
+                "day": 4,
+                "topic": "Loops (for, while)",
+                "resources": [
+                    {"name": "W3Schools Loops", "url": "https://www.w3schools.com/python/python_for_loops.asp"}, 
+                    {"name": "CS Dojo Video", "url": "https://www.youtube.com/watch?v=HXNhEYqFo0o"}
+                ],
+                "practice": "Print numbers from 1-10 using a loop. Print even numbers only."
+            },
+            {
+                "day": 5,
+                "topic": "Functions",
+                "resources": [
+                    {"name": "Python Functions (Programiz)", "url": "https://www.programiz.com/python-programming/function"}, 
+                    {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=BVfCWuca9nw"}
+                ],
+                "practice": "Write a function that takes a number and returns its square."
+            },
+            {
+                "day": 6,
+                "topic": "Lists & Strings",
+                "resources": [
+                    {"name": "W3Schools Lists", "url": "https://www.w3schools.com/python/python_lists.asp"}, 
+                    {"name": "Corey Schafer's Video", "url": "https://www.youtube.com/watch?v=W8KRzm-HUcc"}
+                ],
+                "practice": "Reverse a string and find the largest number in a list."
+            },
+            {
+                "day": 7,
+                "topic": "Mini Project (Basics)",
+                "resources": [
+                    {"name": "Use Replit to code", "url": "https://replit.com/languages/python3"}
+                ],
+                "practice": "Build a basic calculator or a number guessing game."
+            }
+        ]
+    },
+    {
+        "week": 2,
+        "title": "Intermediate Python",
+        "days": [
+            {
+                "day": 8,
+                "topic": "Dictionaries & Sets",
+                "resources": [
+                    {"name": "W3Schools Dictionaries", "url": "https://www.w3schools.com/python/python_dictionaries.asp"}, 
+                    {"name": "Corey Schafer Video", "url": "https://www.youtube.com/watch?v=daefaLgNkw0"}
+                ],
+                "practice": "Count word frequency in a sentence using a dictionary."
+            },
+            {
+                "day": 9,
+                "topic": "File Handling",
+                "resources": [
+                    {"name": "Programiz", "url": "https://www.programiz.com/python-programming/file-operation"}, 
+                    {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=Uh2ebFW8OYM"}
+                ],
+                "practice": "Read a file and count how many lines it has."
+            },
+            {
+                "day": 10,
+                "topic": "Error Handling (try-except)",
+                "resources": [
+                    {"name": "Real Python", "url": "https://realpython.com/python-exceptions/"}, 
+                    {"name": "freeCodeCamp Video", "url": "https://www.youtube.com/watch?v=NIWwJbo-9_8"}
+                ],
+                "practice": "Create a program that handles division by zero errors."
+            },
+            {
+                "day": 11,
+                "topic": "Modules (math, random)",
+                "resources": [
+                    {"name": "Python Modules Guide", "url": "https://docs.python.org/3/tutorial/modules.html"}, 
+                    {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=GxCXiCVsRSM"}
+                ],
+                "practice": "Generate a random password using random module."
+            },
+            {
+                "day": 12,
+                "topic": "OOP Basics (Classes & Objects)",
+                "resources": [
+                    {"name": "Real Python", "url": "https://realpython.com/python3-object-oriented-programming/"}, 
+                    {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=pnhO8UaCgxg"}
+                ],
+                "practice": "Create a Car class with attributes like brand and speed."
+            },
+            {
+                "day": 13,
+                "topic": "APIs & JSON",
+                "resources": [
+                    {"name": "Requests Library (Real Python)", "url": "https://realpython.com/python-requests/"}, 
+                    {"name": "Corey Schafer Video", "url": "https://www.youtube.com/watch?v=tb8gHvYlCFs"}
+                ],
+                "practice": "Fetch weather data from an API and display it."
+            },
+            {
+                "day": 14,
+                "topic": "Mini Project",
+                "resources": [
+                    {"name": "Use Replit or Jupyter Notebook", "url": "https://jupyter.org/"}
+                ],
+                "practice": "Build a To-Do List App or Weather App using API."
+            }
+        ]
+    },
+    {
+        "week": 3,
+        "title": "Advanced & Final Project",
+        "days": [
+            {
+                "day": 15,
+                "topic": "Recap & Debugging",
+                "resources": [
+                    {"name": "Use Pythontutor to visualize code execution", "url": "https://pythontutor.com/"}
+                ],
+                "practice": "Debug old programs and improve efficiency."
+            },
+            {
+                "day": 16,
+                "topic": "Data Structures (Stacks, Queues)",
+                "resources": [
+                    {"name": "Real Python", "url": "https://realpython.com/python-data-structures/"}
+                ],
+                "practice": "Implement a simple stack and queue in Python."
+            },
+            {
+                "day": 17,
+                "topic": "Algorithms (Sorting & Searching)",
+                "resources": [
+                    {"name": "Khan Academy", "url": "https://www.khanacademy.org/computing/computer-science/algorithms"}
+                ],
+                "practice": "Implement Bubble Sort and Binary Search."
+            },
+            {
+                "day": 18,
+                "topic": "Python Libraries (pandas, matplotlib)",
+                "resources": [
+                    {"name": "Pandas Docs", "url": "https://pandas.pydata.org/docs/"}, 
+                    {"name": "Matplotlib Tutorial", "url": "https://matplotlib.org/stable/tutorials/index.html"}
+                ],
+                "practice": "Read a CSV file using Pandas and create a basic graph."
+            },
+            {
+                "day": 19,
+                "topic": "Final Project Brainstorming",
+                "resources": [
+                    {"name": "Use Google Colab", "url": "https://colab.research.google.com/"}
+                ],
+                "practice": "Plan a final project (Choose from ideas below)."
+            },
+            {
+                "day": 20,
+                "topic": "Final Project (Day 1)",
+                "resources": [
+                    {"name": "Use Replit or Jupyter Notebook", "url": "https://replit.com/languages/python3"}
+                ],
+                "practice": "Build a project like: Password Manager, Budget Tracker, or Simple Game."
+            },
+            {
+                "day": 21,
+                "topic": "Final Project (Day 2)",
+                "resources": [
+                    {"name": "Use Replit or Jupyter Notebook", "url": "https://replit.com/languages/python3"}
+                ],
+                "practice": "Complete your final project and showcase it."
+            }
+        ]
+    }
+]
+
+DEFAULT_TOOLS = [
+    "Online Coding Editors: Replit, Jupyter Notebook, Google Colab",
+    "Practice & Challenges: HackerRank, LeetCode",
+    "Debugging & Visualization: Python Tutor"
+]
+
+_curricula = None  # id -> Curriculum
+_active_id = DEFAULT_CURRICULUM_ID
+
+class Curriculum:
+    """Read-only curriculum with O(1) lookup of days and weeks.
+
+    Weeks and days are mapping proxies over precomputed records, a day record
+    has "day", "week", "week_title", "topic", "resources" and "practice".
+    week_index holds the position of each day's week (day 1 first) and
+    week_lengths the number of days of each week, as read-only arrays for
+    vectorized aggregation.  week_masks has the days of each week as a
+    bitmask, bit 0 being day 1.
+    """
+
+    __slots__ = ("id", "title", "weeks", "days", "tools", "week_index", "week_lengths", "week_masks",
+                 "_weeks_by_number", "_days_by_number")
+
+    def __init__(self, weeks, tools=(), curriculum_id=DEFAULT_CURRICULUM_ID, title=DEFAULT_TITLE):
+        frozen_weeks = []
+        days = []
+        for week_index, week in enumerate(weeks):
+            week_number = int(week.get("week", week_index + 1))
+            week_days = []
+            for day in week["days"]:
+                record = MappingProxyType({
+                    "day": int(day["day"]),
+                    "week": week_number,
+                    "week_title": week["title"],
+                    "topic": day["topic"],
+                    "resources": tuple(MappingProxyType(dict(resource)) for resource in day.get("resources", [])),
+                    "practice": day.get("practice", ""),
+                })
+                week_days.append(record)
+                days.append(record)
+            frozen_weeks.append(MappingProxyType({
+                "week": week_number,
+                "title": week["title"],
+                "days": tuple(week_days),
+            }))
+
+        if [day["day"] for day in days] != list(range(1, len(days) + 1)):
+            raise ValueError("Curriculum days must be numbered 1, 2, 3, ... in order")
+        if len({week["week"] for week in frozen_weeks}) != len(frozen_weeks):
+            raise ValueError("Curriculum week numbers must be unique")
+
+        week_lengths = np.array([len(week["days"]) for week in frozen_weeks], dtype=np.int64)
+        week_index = np.repeat(np.arange(len(frozen_weeks)), week_lengths)
+        week_lengths.flags.writeable = False
+        week_index.flags.writeable = False
+        week_offsets = np.concatenate(([0], np.cumsum(week_lengths)[:-1])).astype(int)
+        week_masks = tuple(((1 << int(length)) - 1) << int(offset)
+                           for offset, length in zip(week_offsets, week_lengths))
+
+        object.__setattr__(self, "id", curriculum_id)
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "weeks", tuple(frozen_weeks))
+        object.__setattr__(self, "days", tuple(days))
+        object.__setattr__(self, "tools", tuple(tools))
+        object.__setattr__(self, "week_index", week_index)
+        object.__setattr__(self, "week_lengths", week_lengths)
+        object.__setattr__(self, "week_masks", week_masks)
+        object.__setattr__(self, "_weeks_by_number", MappingProxyType({week["week"]: week for week in frozen_weeks}))
+        object.__setattr__(self, "_days_by_number", MappingProxyType({day["day"]: day for day in days}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Curriculum is read-only")
+
+    def get_day(self, day_number):
+        """Return the record of a day, or None if there is no such day."""
+        return self._days_by_number.get(day_number)
+
+    def get_week(self, week_number):
+        """Return the record of a week, or None if there is no such week."""
+        return self._weeks_by_number.get(week_number)
+
+def load_curriculum(path, curriculum_id=None):
+    """Load a curriculum from a .json or .toml file.
+
+    The file holds {"title": ..., "weeks": [{"title": ..., "days": [{"day": ...,
+    "topic": ..., "resources": [{"name": ..., "url": ...}], "practice": ...}]}],
+    "tools": [...]} (in TOML, [[weeks]] and [[weeks.days]] tables).  A JSON
+    file may also be just the list of weeks.  The id defaults to the file name
+    without extension.  Raises ValueError for malformed files.
+    """
+    if curriculum_id is None:
+        curriculum_id = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("Loading a TOML curriculum needs Python 3.11 or the tomli package")
+        with open(path, 'rb') as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"Invalid curriculum file {path}: {e}")
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    if isinstance(data, list):
+        data = {"weeks": data}
+    try:
+        return Curriculum(data["weeks"], data.get("tools", ()), curriculum_id, data.get("title", curriculum_id))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid curriculum file {path}: missing {e}")
+
+def get_curricula():
+    """Get all registered curricula by id, loading CURRICULA_DIR on first use.
     
-    curriculum = [
-        {
-            "week": 1,
-            "title": "Python Basics",
-            "days": [
-                {
-                    "day": 1,
-                    "topic": "Variables & Data Types",
-                    "resources": [
-                        {"name": "W3Schools", "url": "https://www.w3schools.com/python/python_variables.asp"}, 
-                        {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=_uQrJ0TkZlc"}
-                    ],
-                    "practice": "Write a script to store and print your name, age, and favorite number."
-                },
-                {
-                    "day": 2,
-                    "topic": "Operators & Expressions",
-                    "resources": [
-                        {"name": "Programiz", "url": "https://www.programiz.com/python-programming/operators"}, 
-                        {"name": "Corey Schafer's Video", "url": "https://www.youtube.com/watch?v=YAbOiGr83cI"}
-                    ],
-                    "practice": "Write a calculator that adds, subtracts, multiplies, and divides two numbers."
-                },
-                {
-                    "day": 3,
-                    "topic": "If Statements & Conditions",
-                    "resources": [
-                        {"name": "Real Python", "url": "https://realpython.com/python-conditional-statements/"}, 
-                        {"name": "freeCodeCamp Video", "url": "https://www.youtube.com/watch?v=DZwmZ8Usvnk"}
-                    ],
-                    "practice": "Create a program that checks if a number is positive, negative, or zero."
-                },
-                {
-                    "day": 4,
-                    "topic": "Loops (for, while)",
-                    "resources": [
-                        {"name": "W3Schools Loops", "url": "https://www.w3schools.com/python/python_for_loops.asp"}, 
-                        {"name": "CS Dojo Video", "url": "https://www.youtube.com/watch?v=HXNhEYqFo0o"}
-                    ],
-                    "practice": "Print numbers from 1-10 using a loop. Print even numbers only."
-                },
-                {
-                    "day": 5,
-                    "topic": "Functions",
-                    "resources": [
-                        {"name": "Python Functions (Programiz)", "url": "https://www.programiz.com/python-programming/function"}, 
-                        {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=BVfCWuca9nw"}
-                    ],
-                    "practice": "Write a function that takes a number and returns its square."
-                },
-                {
-                    "day": 6,
-                    "topic": "Lists & Strings",
-                    "resources": [
-                        {"name": "W3Schools Lists", "url": "https://www.w3schools.com/python/python_lists.asp"}, 
-                        {"name": "Corey Schafer's Video", "url": "https://www.youtube.com/watch?v=W8KRzm-HUcc"}
-                    ],
-                    "practice": "Reverse a string and find the largest number in a list."
-                },
-                {
-                    "day": 7,
-                    "topic": "Mini Project (Basics)",
-                    "resources": [
-                        {"name": "Use Replit to code", "url": "https://replit.com/languages/python3"}
-                    ],
-                    "practice": "Build a basic calculator or a number guessing game."
-                }
-            ]
-        },
-        {
-            "week": 2,
-            "title": "Intermediate Python",
-            "days": [
-                {
-                    "day": 8,
-                    "topic": "Dictionaries & Sets",
-                    "resources": [
-                        {"name": "W3Schools Dictionaries", "url": "https://www.w3schools.com/python/python_dictionaries.asp"}, 
-                        {"name": "Corey Schafer Video", "url": "https://www.youtube.com/watch?v=daefaLgNkw0"}
-                    ],
-                    "practice": "Count word frequency in a sentence using a dictionary."
-                },
-                {
-                    "day": 9,
-                    "topic": "File Handling",
-                    "resources": [
-                        {"name": "Programiz", "url": "https://www.programiz.com/python-programming/file-operation"}, 
-                        {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=Uh2ebFW8OYM"}
-                    ],
-                    "practice": "Read a file and count how many lines it has."
-                },
-                {
-                    "day": 10,
-                    "topic": "Error Handling (try-except)",
-                    "resources": [
-                        {"name": "Real Python", "url": "https://realpython.com/python-exceptions/"}, 
-                        {"name": "freeCodeCamp Video", "url": "https://www.youtube.com/watch?v=NIWwJbo-9_8"}
-                    ],
-                    "practice": "Create a program that handles division by zero errors."
-                },
-                {
-                    "day": 11,
-                    "topic": "Modules (math, random)",
-                    "resources": [
-                        {"name": "Python Modules Guide", "url": "https://docs.python.org/3/tutorial/modules.html"}, 
-                        {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=GxCXiCVsRSM"}
-                    ],
-                    "practice": "Generate a random password using random module."
-                },
-                {
-                    "day": 12,
-                    "topic": "OOP Basics (Classes & Objects)",
-                    "resources": [
-                        {"name": "Real Python", "url": "https://realpython.com/python3-object-oriented-programming/"}, 
-                        {"name": "Mosh's Video", "url": "https://www.youtube.com/watch?v=pnhO8UaCgxg"}
-                    ],
-                    "practice": "Create a Car class with attributes like brand and speed."
-                },
-                {
-                    "day": 13,
-                    "topic": "APIs & JSON",
-                    "resources": [
-                        {"name": "Requests Library (Real Python)", "url": "https://realpython.com/python-requests/"}, 
-                        {"name": "Corey Schafer Video", "url": "https://www.youtube.com/watch?v=tb8gHvYlCFs"}
-                    ],
-                    "practice": "Fetch weather data from an API and display it."
-                },
-                {
-                    "day": 14,
-                    "topic": "Mini Project",
-                    "resources": [
-                        {"name": "Use Replit or Jupyter Notebook", "url": "https://jupyter.org/"}
-                    ],
-                    "practice": "Build a To-Do List App or Weather App using API."
-                }
-            ]
-        },
-        {
-            "week": 3,
-            "title": "Advanced & Final Project",
-            "days": [
-                {
-                    "day": 15,
-                    "topic": "Recap & Debugging",
-                    "resources": [
-                        {"name": "Use Pythontutor to visualize code execution", "url": "https://pythontutor.com/"}
-                    ],
-                    "practice": "Debug old programs and improve efficiency."
-                },
-                {
-                    "day": 16,
-                    "topic": "Data Structures (Stacks, Queues)",
-                    "resources": [
-                        {"name": "Real Python", "url": "https://realpython.com/python-data-structures/"}
-                    ],
-                    "practice": "Implement a simple stack and queue in Python."
-                },
-                {
-                    "day": 17,
-                    "topic": "Algorithms (Sorting & Searching)",
-                    "resources": [
-                        {"name": "Khan Academy", "url": "https://www.khanacademy.org/computing/computer-science/algorithms"}
-                    ],
-                    "practice": "Implement Bubble Sort and Binary Search."
-                },
-                {
-                    "day": 18,
-                    "topic": "Python Libraries (pandas, matplotlib)",
-                    "resources": [
-                        {"name": "Pandas Docs", "url": "https://pandas.pydata.org/docs/"}, 
-                        {"name": "Matplotlib Tutorial", "url": "https://matplotlib.org/stable/tutorials/index.html"}
-                    ],
-                    "practice": "Read a CSV file using Pandas and create a basic graph."
-                },
-                {
-                    "day": 19,
-                    "topic": "Final Project Brainstorming",
-                    "resources": [
-                        {"name": "Use Google Colab", "url": "https://colab.research.google.com/"}
-                    ],
-                    "practice": "Plan a final project (Choose from ideas below)."
-                },
-                {
-                    "day": 20,
-                    "topic": "Final Project (Day 1)",
-                    "resources": [
-                        {"name": "Use Replit or Jupyter Notebook", "url": "https://replit.com/languages/python3"}
-                    ],
-                    "practice": "Build a project like: Password Manager, Budget Tracker, or Simple Game."
-                },
-                {
-                    "day": 21,
-                    "topic": "Final Project (Day 2)",
-                    "resources": [
-                        {"name": "Use Replit or Jupyter Notebook", "url": "https://replit.com/languages/python3"}
-                    ],
-                    "practice": "Complete your final project and showcase it."
-                }
-            ]
-        }
-    ]
+    Files that cannot be loaded are reported and left out.
+    """
+    global _curricula
+    if _curricula is None:
+        if CURRICULUM_FILE:
+            default = load_curriculum(CURRICULUM_FILE, DEFAULT_CURRICULUM_ID)
+        else:
+            default = Curriculum(DEFAULT_CURRICULUM, DEFAULT_TOOLS)
+        curricula = {DEFAULT_CURRICULUM_ID: default}
+        try:
+            names = sorted(os.listdir(CURRICULA_DIR))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not name.endswith((".json", ".toml")):
+                continue
+            try:
+                curriculum = load_curriculum(os.path.join(CURRICULA_DIR, name))
+            except (OSError, ValueError) as e:
+                print(f"Error loading curriculum {name}: {e}")
+                continue
+            curricula.setdefault(curriculum.id, curriculum)
+        _curricula = curricula
+    return _curricula
+
+def register_curriculum(curriculum):
+    """Register a curriculum under its id, replacing one with the same id."""
+    get_curricula()[curriculum.id] = curriculum
+
+def get_curriculum(curriculum_id):
+    """Get a registered curriculum by id, or None if there is no such curriculum."""
+    return get_curricula().get(curriculum_id)
+
+def enrolled_curriculum_id(document):
+    """Get the id of the curriculum a stored learner document is enrolled in."""
+    enrollment = document.get("enrollment")
+    curriculum_id = enrollment.get("curriculum") if isinstance(enrollment, dict) else None
+    return curriculum_id or DEFAULT_CURRICULUM_ID
+
+def set_active_curriculum(curriculum_id):
+    """Make the curriculum a learner is enrolled in the one the functions below answer for.
     
-    return curriculum
+    An unknown id (a curriculum file that was removed) falls back to the
+    default curriculum.  Returns the active curriculum.
+    """
+    global _active_id
+    if curriculum_id not in get_curricula():
+        print(f"Error selecting curriculum: unknown curriculum {curriculum_id!r}, using the default")
+        curriculum_id = DEFAULT_CURRICULUM_ID
+    _active_id = curriculum_id
+    return get_curricula()[curriculum_id]
+
+def get_registry():
+    """Get the active curriculum."""
+    curricula = get_curricula()
+    return curricula.get(_active_id) or curricula[DEFAULT_CURRICULUM_ID]
+
+def get_curriculum_data():
+    """Returns the weeks of the curriculum, each with its list of days (read-only)."""
+    return get_registry().weeks
+
+def get_day(day_number):
+    """Returns the record of a day, or None if the curriculum has no such day."""
+    return get_registry().get_day(day_number)
+
+def get_week(week_number):
+    """Returns the record of a week, or None if the curriculum has no such week."""
+    return get_registry().get_week(week_number)
 
 def get_additional_tools():
     """Returns the list of additional tools recommended for the learning journey."""
-    
-    tools = [
-        "Online Coding Editors: Replit, Jupyter Notebook, Google Colab",
-        "Practice & Challenges: HackerRank, LeetCode",
-        "Debugging & Visualization: Python Tutor"
-    ]
-    
-    return tools
+    return get_registry().tools
 
 def get_days_count():
     """Returns the total number of days in the curriculum."""
-    return 21
+    return len(get_registry().days)
 
 def get_week_count():
     """Returns the total number of weeks in the curriculum."""
-    return 3
+    return len(get_registry().weeks)
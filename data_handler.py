@@ -1,33 +1,90 @@
 """
 Module to handle the data operations for the Python learning tracker.
 """
-import json
+import atexit
+import codecs
+import copy
+import hashlib
 import os
+import signal
+import threading
 import time
-from datetime import datetime
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from functools import lru_cache
+import numpy as np
 import pandas as pd
+import compressors
+import curriculum as curr
+import related
+import search
+import serializers
+import storage
 
 # Default data file path
 DATA_FILE = "python_learning_progress.json"
+DB_FILE = "python_learning_progress.db"
 
-# Cache settings
-DATA_CACHE_TTL = 60  # Cache data for 60 seconds
+# Name of this learner in cohort-wide indexes (a cohort has one <learner>.json each)
+LEARNER_ID = os.environ.get("TRACKER_LEARNER_ID", os.path.splitext(os.path.basename(DATA_FILE))[0])
+
+# Storage backend: "json" (single file) or "sqlite" (one row per record)
+STORAGE_BACKEND = os.environ.get("TRACKER_STORAGE_BACKEND", "json")
+_storage = None
+
+# Cache settings: the cached document is revalidated against the storage
+# signature (mtime, size and inode of the files) on every read, so other
+# processes' writes are picked up immediately and unchanged data is never
+# reloaded
 _data_cache = None
-_last_load_time = 0
+_cache_signature = None
+_cache_stats = {"hits": 0, "misses": 0, "reloads": 0}
 
-def initialize_data():
-    """Initialize the data structure if it doesn't exist."""
-    if os.path.exists(DATA_FILE):
-        return load_data()
+# Bumped whenever the cached data changes, keys the derived caches below
+_data_revision = 0
+_progress_frame_cache = (None, None)  # (revision, DataFrame)
+_progress_records_cache = (None, None)  # (revision, list of dicts)
+_streak_runs_cache = (None, None)  # (revision, list of dicts)
+
+# Optimistic concurrency: the stored document as of _cache_version. Saves are
+# diffed against it, and if another process committed a newer version the
+# changes are merged field by field into that version before writing
+_base_document = {}
+_cache_version = 0
+
+# Attempts to commit before giving up when other processes keep writing
+COMMIT_ATTEMPTS = 5
+
+# Uploaded solutions are streamed in chunks of this size, up to a size cap
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get("TRACKER_MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+# Characters of an uploaded solution shown in the day tracker
+PREVIEW_CHARS = 20000
+
+def get_storage():
+    """Get the configured storage backend, creating it on first use."""
+    global _storage
     
-    # Create a default data structure
-    data = {
+    if _storage is None:
+        _storage = storage.create_storage(STORAGE_BACKEND, DATA_FILE, DB_FILE)
+    return _storage
+
+def _default_data():
+    """Create a default data structure."""
+    return {
         "progress": {},
-        "notes": {},
         "uploads": {},
         "time_spent": {},
         "resources_used": {},
+        "enrollment": {"curriculum": curr.DEFAULT_CURRICULUM_ID},
+        "email_settings": {
+            "enabled": False,
+            "email": "",
+            "reminder_time": "09:00",
+            "missed_day_notification": True,
+            "daily_reminder": True
+        },
         "sms_settings": {
             "enabled": False,
             "phone_number": "",
@@ -36,100 +93,575 @@ def initialize_data():
             "daily_reminder": True
         }
     }
-    
-    save_data(data)
-    return data
+
+def initialize_data():
+    """Initialize the data structure if it doesn't exist."""
+    return load_data()
 
 def load_data():
-    """Load the data from the JSON file with caching for performance."""
-    global _data_cache, _last_load_time
+    """Load the data from storage with caching for performance.
     
-    current_time = time.time()
+    A corrupted data file is recovered from the newest valid backup by the
+    storage backend. Default data is only created when nothing was saved yet.
+    """
+    global _data_cache, _cache_signature, _base_document, _cache_version, _data_revision
     
-    # If we have a valid cache, use it
-    if _data_cache is not None and (current_time - _last_load_time) < DATA_CACHE_TTL:
+    # Unflushed writes only exist in the cache, never reload over them
+    if _data_cache is not None and (is_dirty() or _in_transaction() and _transaction_state.changes):
+        _cache_stats["hits"] += 1
         return _data_cache
     
+    storage_backend = get_storage()
+    signature = storage_backend.signature()
+    
+    # If nothing changed on disk since the last load, use the cache
+    if _data_cache is not None and signature == _cache_signature:
+        _cache_stats["hits"] += 1
+        return _data_cache
+    
+    _cache_stats["misses" if _data_cache is None else "reloads"] += 1
     try:
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-            _data_cache = data
-            _last_load_time = current_time
-            return data
-    except (FileNotFoundError, json.JSONDecodeError):
-        # If file doesn't exist or is corrupted, initialize a new one
-        new_data = initialize_data()
-        _data_cache = new_data
-        _last_load_time = current_time
-        return new_data
+        data = storage_backend.load()
+    except Exception as e:
+        # Storage is temporarily unreadable, keep serving what we have and
+        # never save defaults over the stored progress
+        print(f"Error loading data: {e}")
+        return _data_cache if _data_cache is not None else _default_data()
+    
+    _base_document = {} if data is None else copy.deepcopy(data)
+    _cache_version = 0 if data is None else data.get("version", 0)
+    _cache_signature = signature
+    
+    if data is None:
+        data = _default_data()
+        _activate_enrollment(data)
+        data["summary"] = _compute_summary(data)
+        # Queued outside any open transaction, its whole-section defaults
+        # must not overwrite records other threads write meanwhile
+        _save_changes(data, _diff_documents(_base_document, data), deferrable=False)
+    else:
+        for section, default in _default_data().items():
+            data.setdefault(section, default)
+        _activate_enrollment(data)
+        if "notes" in data:
+            _move_inline_notes(data)
+        # The summary is only trusted if it was written with this version
+        # for the curriculum the learner is enrolled in
+        summary = data.get("summary")
+        if (not isinstance(summary, dict) or summary.get("version") != data.get("version", 0)
+                or summary.get("format") != SUMMARY_FORMAT
+                or summary.get("curriculum") != _curriculum_key()):
+            data["summary"] = _compute_summary(data)
+    
+    _data_cache = data
+    _data_revision += 1
+    return data
+
+def _move_inline_notes(data):
+    """Move notes stored inside the document to the note store (one-shot migration)."""
+    storage_backend = get_storage()
+    for day, note_text in data["notes"].items():
+        # A note already in the store is newer than the inline copy
+        if storage_backend.get_note(day) is None:
+            storage_backend.put_note(day, note_text)
+    
+    del data["notes"]
+    _save_changes(data, [("notes", None, None)])
+
+def get_cache_stats():
+    """Get hit, miss and reload counters of the data cache."""
+    return dict(_cache_stats)
+
+def get_data_version():
+    """Get the stored version the cached data is based on."""
+    return _cache_version
 
 # Save throttling
 _last_save_time = 0 
 SAVE_THROTTLE = 2  # Minimum seconds between saves
+# A failed write is retried after SAVE_THROTTLE seconds, doubling per failure up to this
+MAX_RETRY_DELAY = 60
+_flush_failures = 0
+
+# Write-behind state: changes that arrive within SAVE_THROTTLE of the last
+# write are queued here and written together by a background flusher
+_pending_changes = {}  # (section, key) -> value waiting to be written
+_flush_timer = None
+_flush_lock = threading.RLock()
+
+# Transaction state, per thread: while a thread has a transaction open its
+# changes and notes are collected here, and queued and written when it closes.
+# Attributes: depth, changes ((section, key) -> value), notes (day -> text)
+_transaction_state = threading.local()
+# Transactions open in any thread, their changes are in the cache but not committed
+_open_transactions = 0
 
 def save_data(data):
-    """Save the data to the JSON file with throttling."""
-    global _data_cache, _last_load_time, _last_save_time
+    """Save the data returned by load_data after changing it in place.
+    
+    Only the records that differ from the stored document are written. Saves
+    within SAVE_THROTTLE seconds of the last write are not dropped, they are
+    queued and written by the background flusher.
+    """
+    with _flush_lock:
+        changes = _diff_documents(_base_document, data)
+    if any(section in ("progress", "time_spent") for section, key, value in changes):
+        data["summary"] = _compute_summary(data)
+    return _save_changes(data, changes)
+
+def _diff_documents(old, new):
+    """List the (section, key, value) changes that turn old into new."""
+    changes = []
+    for section in set(old) | set(new):
+        if section in ("version", "summary"):
+            continue
+        old_value = old.get(section)
+        new_value = new.get(section)
+        if old_value == new_value:
+            continue
+        if section in storage.RECORD_SECTIONS and isinstance(old_value, dict) and isinstance(new_value, dict):
+            for key in set(old_value) | set(new_value):
+                if old_value.get(key) != new_value.get(key):
+                    changes.append((section, key, new_value.get(key)))
+        else:
+            changes.append((section, None, new_value))
+    return changes
+
+def _save_changes(data, changes, deferrable=True):
+    """Persist a list of (section, key, value) changes made to data.
+    
+    Read-only mappings and tuples in the values are copied to plain dicts and
+    lists. Raises TypeError for values that still cannot be serialized,
+    before anything is queued, so a bad change never blocks later writes.
+    Deferrable changes wait for the open transaction of this thread.
+    """
+    global _data_cache, _data_revision
     
-    current_time = time.time()
+    plain_changes = []
+    for section, key, value in changes:
+        value = _plain_value(value)
+        try:
+            serializers.dumps_line(value)
+        except (TypeError, ValueError) as e:
+            raise TypeError(f"Cannot save {section} {key}: {e}")
+        plain_changes.append((section, key, value))
+    for section, key, value in plain_changes:
+        storage.apply_change(data, section, key, value)
+    changes = plain_changes
     
-    # Update cache immediately
     _data_cache = data
-    _last_load_time = current_time
+    _data_revision += 1
     
-    # Throttle saves to prevent excessive disk I/O
-    if current_time - _last_save_time < SAVE_THROTTLE:
+    # Inside a transaction the changes wait for the block to close
+    if deferrable and _in_transaction():
+        for section, key, value in changes:
+            _transaction_state.changes.pop((section, key), None)
+            _transaction_state.changes[(section, key)] = value
         return data
     
+    with _flush_lock:
+        for section, key, value in changes:
+            # Later changes to the same record replace earlier ones
+            _pending_changes.pop((section, key), None)
+            _pending_changes[(section, key)] = value
+        _write_or_schedule()
+    
+    return data
+
+def _plain_value(value):
+    """Copy mappings and sequences in a value to plain dicts and lists."""
+    if isinstance(value, Mapping):
+        return {key: _plain_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain_value(item) for item in value]
+    return value
+
+def _write_or_schedule():
+    """Write pending data now, or schedule the flusher if writes are throttled."""
+    global _flush_timer
+    
+    wait = SAVE_THROTTLE - (time.time() - _last_save_time)
+    if wait <= 0 and _flush_timer is None:
+        flush()
+    elif _flush_timer is None:
+        _flush_timer = threading.Timer(max(wait, 0), _flush_in_background)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def _flush_in_background():
+    global _flush_timer
+    
+    with _flush_lock:
+        _flush_timer = None
+        flush()
+
+def is_dirty():
+    """Check whether there are saves that have not been written yet."""
+    return bool(_pending_changes)
+
+def flush(notes=None):
+    """Write all pending saves to storage immediately.
+    
+    The write is a compare-and-swap against the version the cached data was
+    loaded at. If another process committed in between, its document is
+    loaded and our changes are merged into it field by field before retrying,
+    so edits to different records never overwrite each other.
+    
+    Notes ({day: text}) are written with the records, in the same database
+    transaction on SQLite.
+    
+    Returns True if everything was written. On failure the pending data is kept
+    and the background flusher retries it with a growing delay.
+    """
+    global _last_save_time, _cache_signature, _cache_version, _flush_failures
+    
+    with _flush_lock:
+        if not is_dirty() and not notes:
+            return True
+        
+        storage_backend = get_storage()
+        try:
+            for attempt in range(COMMIT_ATTEMPTS):
+                # Every commit carries the summary, stamped with the version
+                # the commit will create, so readers can trust it
+                if _data_cache is not None and "summary" in _data_cache:
+                    summary = _committed_summary() if _open_transactions else _data_cache["summary"]
+                    summary["version"] = _cache_version + 1
+                    _pending_changes[("summary", None)] = summary
+                changes = [(section, key, value) for (section, key), value in _pending_changes.items()]
+                signature_before = storage_backend.signature()
+                try:
+                    version = storage_backend.put_records(changes, expected_version=_cache_version, notes=notes)
+                    break
+                except storage.VersionConflict:
+                    _merge_stored_document(changes)
+            else:
+                raise RuntimeError("data kept changing in another process")
+            
+            _pending_changes.clear()
+            for section, key, value in changes:
+                storage.apply_change(_base_document, section, key, copy.deepcopy(value))
+            _cache_version = version
+            # Our own write should not invalidate the cache, unless another
+            # process changed the files since we last loaded them
+            if signature_before == _cache_signature:
+                _cache_signature = storage_backend.signature()
+            _last_save_time = time.time()
+            _flush_failures = 0
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            _flush_failures += 1
+            _schedule_retry()
+            return False
+
+def _committed_summary():
+    """Summary of the stored document with the queued changes on top.
+    
+    Unlike the cached summary it leaves out the changes of open transactions,
+    which may still roll back.
+    """
+    committed = {section: dict(_base_document.get(section) or {}) for section in ("progress", "time_spent")}
+    for (section, key), value in _pending_changes.items():
+        if section in committed:
+            storage.apply_change(committed, section, key, value)
+    return _compute_summary(committed)
+
+def _schedule_retry():
+    """Retry a failed write in the background, so pending changes do not pin the cache forever."""
+    global _flush_timer
+    
+    if _flush_timer is not None:
+        return
+    delay = min(SAVE_THROTTLE * 2 ** (_flush_failures - 1), MAX_RETRY_DELAY)
+    _flush_timer = threading.Timer(delay, _flush_in_background)
+    _flush_timer.daemon = True
+    _flush_timer.start()
+
+def _merge_stored_document(changes):
+    """Rebase the cache on the latest stored document with our changes on top."""
+    global _data_cache, _base_document, _cache_version, _cache_signature, _data_revision
+    
+    storage_backend = get_storage()
+    signature = storage_backend.signature()
+    stored = storage_backend.load() or {}
+    
+    for section, key, value in changes:
+        stored_value = storage.get_value(stored, section, key)
+        if stored_value != storage.get_value(_base_document, section, key) and stored_value != value:
+            # Both sides changed the same record, this session's edit wins
+            print(f"Concurrent edit of {section} {key}, keeping the latest change")
+    
+    _base_document = copy.deepcopy(stored)
+    _cache_version = stored.get("version", 0)
+    _cache_signature = signature
+    
+    for section, key, value in changes:
+        storage.apply_change(stored, section, key, value)
+    for section, default in _default_data().items():
+        stored.setdefault(section, default)
+    _activate_enrollment(stored)
+    stored["summary"] = _compute_summary(stored)
+    _data_cache = stored
+    _data_revision += 1
+
+@contextmanager
+def transaction():
+    """Group several mutations into a single write.
+    
+    Usage:
+        with dh.transaction():
+            dh.mark_day_complete(day_number)
+            dh.save_note(day_number, note)
+    
+    Mutations inside the block update the cached data but are only written
+    when the block exits, as one commit regardless of SAVE_THROTTLE. If the
+    block raises an Exception nothing is written and the cached data is
+    reloaded from storage. Control-flow exceptions that are not Exceptions,
+    such as Streamlit's st.rerun(), still commit. Transactions can be nested,
+    the outermost one writes.
+    
+    The state of a transaction belongs to its thread, other threads keep
+    reading and writing while it is open. Keep slow work out of the block.
+    Raises RuntimeError if the commit fails, nothing of the block is kept.
+    """
+    if _in_transaction():
+        _transaction_state.depth += 1
+        try:
+            yield
+        finally:
+            _transaction_state.depth -= 1
+        return
+    
+    global _open_transactions
+    with _flush_lock:
+        _open_transactions += 1
+    _transaction_state.depth = 1
+    _transaction_state.changes = {}
+    _transaction_state.notes = {}
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
-        _last_save_time = current_time
-    except Exception as e:
-        print(f"Error saving data: {e}")
+        yield
+    except Exception:
+        _end_transaction()
+        with _flush_lock:
+            _reload_with_pending()
+        raise
+    except BaseException:
+        _commit_transaction(*_end_transaction())
+        raise
+    else:
+        _commit_transaction(*_end_transaction())
+    finally:
+        with _flush_lock:
+            _open_transactions -= 1
+
+def _in_transaction():
+    return getattr(_transaction_state, "depth", 0) > 0
+
+def _end_transaction():
+    """Close the transaction of this thread and return its (changes, notes)."""
+    changes, notes = _transaction_state.changes, _transaction_state.notes
+    _transaction_state.depth = 0
+    _transaction_state.changes = {}
+    _transaction_state.notes = {}
+    return changes, notes
+
+def _commit_transaction(changes, notes):
+    """Queue the changes of a transaction and write them with its notes."""
+    global _data_cache, _data_revision
+    
+    if not changes and not notes:
+        return
+    
+    with _flush_lock:
+        # The cache may have been reloaded by another thread meanwhile
+        data = load_data()
+        for (section, key), value in changes.items():
+            storage.apply_change(data, section, key, value)
+        if any(section in ("progress", "time_spent") for section, key in changes):
+            data["summary"] = _compute_summary(data)
+        _data_cache = data
+        _data_revision += 1
+        
+        for change_key, value in changes.items():
+            _pending_changes.pop(change_key, None)
+            _pending_changes[change_key] = value
         
+        notes_signature = get_storage().notes_signature()
+        if not flush(notes):
+            # Take the transaction back out, so it is not written later
+            for change_key, value in changes.items():
+                if _pending_changes.get(change_key) is value:
+                    del _pending_changes[change_key]
+            _reload_with_pending()
+            raise RuntimeError("Could not save the changes, nothing was written")
+    
+    if notes:
+        _notes_changed(notes, notes_signature)
+
+def _reload_with_pending():
+    """Reload the cache from storage with the changes still waiting to be written on top."""
+    global _data_cache, _cache_signature, _data_revision
+    
+    _data_cache = None
+    _cache_signature = None
+    data = load_data()
+    for (section, key), value in _pending_changes.items():
+        storage.apply_change(data, section, key, value)
+    # The stored summary may have been written with uncommitted changes counted
+    data["summary"] = _compute_summary(data)
+    _data_revision += 1
     return data
 
+def _flush_on_signal(signum, frame):
+    """Flush pending saves before handing the signal to the previous handler."""
+    flush()
+    previous = _previous_signal_handlers.get(signum)
+    if callable(previous):
+        previous(signum, frame)
+    else:
+        raise SystemExit(128 + signum)
+
+# Make sure queued saves reach the disk when the process exits
+_previous_signal_handlers = {}
+atexit.register(flush)
+for _signum in (signal.SIGTERM, getattr(signal, "SIGHUP", None)):
+    if _signum is None:
+        continue
+    try:
+        _previous_signal_handlers[_signum] = signal.signal(_signum, _flush_on_signal)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        pass
+
 def mark_day_complete(day_number, completed=True):
     """Mark a specific day as completed or incomplete."""
     data = load_data()
     
+    was_completed = _is_completed(data, day_number)
+    
     if completed:
         data["progress"][str(day_number)] = {
             "completed": True,
             "date_completed": datetime.now().strftime("%Y-%m-%d")
         }
+        change = ("progress", str(day_number), data["progress"][str(day_number)])
     else:
         # If marking as incomplete, remove the entry if it exists
         if str(day_number) in data["progress"]:
             del data["progress"][str(day_number)]
+        change = ("progress", str(day_number), None)
     
-    save_data(data)
-    return data
+    _update_summary_completion(data, day_number, was_completed)
+    return _save_changes(data, [change])
 
 def update_time_spent(day_number, hours, minutes):
     """Update the time spent on a specific day."""
     data = load_data()
     
     total_minutes = hours * 60 + minutes
+    _update_summary_time(data, day_number, data["time_spent"].get(str(day_number), 0), total_minutes)
     data["time_spent"][str(day_number)] = total_minutes
     
-    save_data(data)
-    return data
+    return _save_changes(data, [("time_spent", str(day_number), total_minutes)])
 
 def save_note(day_number, note_text):
-    """Save a note for a specific day."""
-    data = load_data()
+    """Save a note for a specific day.
     
-    data["notes"][str(day_number)] = note_text
+    Notes are kept in their own blob per day, so saving one never touches the
+    progress document.
+    """
+    if _in_transaction():
+        _transaction_state.notes[str(day_number)] = note_text
+        return load_data()
     
-    save_data(data)
-    return data
+    try:
+        storage_backend = get_storage()
+        notes_signature = storage_backend.notes_signature()
+        storage_backend.put_note(str(day_number), note_text)
+        _notes_changed({str(day_number): note_text}, notes_signature)
+    except Exception as e:
+        print(f"Error saving note: {e}")
+    
+    return load_data()
 
 def get_note(day_number):
     """Get the note for a specific day."""
-    data = load_data()
-    return data["notes"].get(str(day_number), "")
+    if _in_transaction() and str(day_number) in _transaction_state.notes:
+        return _transaction_state.notes[str(day_number)]
+    return get_storage().get_note(str(day_number)) or ""
+
+def _notes_changed(notes, notes_signature):
+    """Index notes this process wrote, notes_signature is the one from before the write."""
+    global _note_vectors
+    
+    for day_number, note_text in notes.items():
+        _index_note(day_number, note_text)
+    signature, vectors = _note_vectors
+    # Only update the vectors in place if no other process wrote notes in between
+    if vectors is not None and signature == notes_signature:
+        for day_number, note_text in notes.items():
+            vectors.set(int(day_number), note_text)
+        _note_vectors = (get_storage().notes_signature(), vectors)
+
+# Related notes
+#
+# The TF-IDF vectors of the learner's notes are built on first use and kept
+# up to date by save_note. They are rebuilt when the notes store changes
+# behind our back (another process saved a note). The cohort vectors are
+# built by related.py.
+_note_vectors = (None, None)  # (notes signature, NoteVectors)
+
+def get_related_notes(day_number, k=3, include_cohort=False):
+    """Get the notes most similar to the note of a day.
+    
+    Returns up to k dicts with learner, day and score (cosine similarity),
+    best first. With include_cohort, notes of other learners in the cohort
+    matrix are candidates too.
+    """
+    note_text = get_note(day_number)
+    if not note_text.strip():
+        return []
+    
+    vectors = _get_note_vectors()
+    results = [
+        {"learner": LEARNER_ID, "day": day, "score": score}
+        for day, score in vectors.most_similar(note_text, k, exclude=[int(day_number)])
+    ]
+    if include_cohort:
+        cohort = related.load_cohort()
+        if cohort is not None:
+            # This learner's notes are ranked from the live vectors above
+            own = [(LEARNER_ID, day) for day in vectors.keys]
+            results += [
+                {"learner": learner, "day": day, "score": score}
+                for (learner, day), score in cohort.most_similar(note_text, k, exclude=own)
+            ]
+            results = sorted(results, key=lambda result: -result["score"])[:k]
+    return results
+
+def _get_note_vectors():
+    global _note_vectors
+    signature = get_storage().notes_signature()
+    if _note_vectors[1] is None or _note_vectors[0] != signature:
+        # Stored notes only, notes of an open transaction may still roll back
+        vectors = related.NoteVectors()
+        for day in get_storage().note_days():
+            if str(day).isdigit():
+                vectors.set(int(day), get_storage().get_note(day) or "")
+        _note_vectors = (signature, vectors)
+    return _note_vectors[1]
+
+def get_all_notes():
+    """Get all notes as a dict of day number to note text, ordered by day."""
+    pending_days = _transaction_state.notes if _in_transaction() else {}
+    days = sorted(int(day) for day in set(get_storage().note_days()) | set(pending_days))
+    notes = {}
+    for day in days:
+        note_text = get_note(day)
+        if note_text:
+            notes[day] = note_text
+    return notes
 
 def mark_resource_used(day_number, resource):
     """Mark a resource as used for a specific day."""
@@ -141,9 +673,266 @@ def mark_resource_used(day_number, resource):
     if resource not in data["resources_used"][str(day_number)]:
         data["resources_used"][str(day_number)].append(resource)
     
-    save_data(data)
+    return _save_changes(data, [("resources_used", str(day_number), data["resources_used"][str(day_number)])])
+
+def remove_resource_used(day_number, resource):
+    """Remove a resource from the used resources of a specific day."""
+    data = load_data()
+    
+    resources = data["resources_used"].get(str(day_number), [])
+    if resource not in resources:
+        return data
+    
+    resources.remove(resource)
+    return _save_changes(data, [("resources_used", str(day_number), resources)])
+
+def save_upload_info(day_number, filename, content=None):
+    """Record that a solution file was uploaded for a specific day.
+    
+    The file content (bytes), if given, goes to the blob store and is added
+    as a new version of the day's solution.  Uploading the same content as
+    the latest version again is a no-op.
+    """
+    data = load_data()
+    if content is None:
+        return _record_upload(data, day_number, filename)
+    
+    digest = hashlib.sha256(content).hexdigest()
+    if _is_latest_upload(data, day_number, filename, digest):
+        return data
+    try:
+        get_storage().put_blob(content, digest)
+    except Exception as e:
+        print(f"Error saving upload: {e}")
+        return data
+    _record_upload(data, day_number, filename, digest, len(content))
+    _index_solution(day_number, filename, content[:search.MAX_DOCUMENT_CHARS * 4].decode("utf-8", errors="replace"))
     return data
 
+def save_upload_file(day_number, filename, fileobj):
+    """Stream an uploaded file into the blob store and record it as a new version.
+    
+    The file is read UPLOAD_CHUNK_SIZE bytes at a time, so only a chunk and the
+    preview are held in memory. A first pass hashes and decodes it; if it is
+    the latest version already nothing is written, otherwise a second pass
+    compresses it into storage. Returns (preview, truncated, size) where
+    preview is the first PREVIEW_CHARS characters of the text. Raises
+    ValueError for files over MAX_UPLOAD_BYTES or that are not UTF-8 text, in
+    which case nothing is stored.
+    """
+    size = getattr(fileobj, "size", None)
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"file is larger than {MAX_UPLOAD_BYTES // 1024} KB")
+    
+    sha = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    # The search index only keeps a prefix, the preview is a prefix of that
+    prefix = []
+    prefix_chars = 0
+    size = 0
+    chars = 0
+    for chunk in _read_chunks(fileobj):
+        size += len(chunk)
+        if size > MAX_UPLOAD_BYTES:
+            raise ValueError(f"file is larger than {MAX_UPLOAD_BYTES // 1024} KB")
+        sha.update(chunk)
+        try:
+            # Decode everything to validate it, keep only the prefix
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise ValueError("file is not UTF-8 text")
+        chars += len(text)
+        if prefix_chars < search.MAX_DOCUMENT_CHARS:
+            prefix.append(text[:search.MAX_DOCUMENT_CHARS - prefix_chars])
+            prefix_chars += len(prefix[-1])
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ValueError("file is not UTF-8 text")
+    text = "".join(prefix)
+    preview = text[:PREVIEW_CHARS]
+    truncated = chars > PREVIEW_CHARS
+    
+    data = load_data()
+    if _is_latest_upload(data, day_number, filename, sha.hexdigest()):
+        return preview, truncated, size
+    
+    digest = get_storage().put_blob_stream(_read_chunks(fileobj))
+    _record_upload(data, day_number, filename, digest, size)
+    _index_solution(day_number, filename, text)
+    return preview, truncated, size
+
+def _read_chunks(fileobj):
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+def _is_latest_upload(data, day_number, filename, digest):
+    latest = data["uploads"].get(str(day_number)) or {}
+    return latest.get("sha256") == digest and latest.get("filename") == filename
+
+def _record_upload(data, day_number, filename, digest=None, size=None):
+    """Save the upload metadata of a day, adding a version if there is content."""
+    uploads = data.setdefault("uploads", {})
+    previous = uploads.get(str(day_number)) or {}
+    
+    upload = {
+        "filename": filename,
+        "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    if digest is not None:
+        upload["sha256"] = digest
+        upload["size"] = size
+        upload["versions"] = previous.get("versions", []) + [dict(upload)]
+    uploads[str(day_number)] = upload
+    
+    return _save_changes(data, [("uploads", str(day_number), upload)])
+
+def get_upload_versions(day_number):
+    """Get the stored versions of a day's solution, oldest first."""
+    data = load_data()
+    return list((data["uploads"].get(str(day_number)) or {}).get("versions", []))
+
+def get_upload_content(day_number, digest=None):
+    """Get the content (bytes) of a day's solution, the latest version by default.
+    
+    Returns None if no content was stored.
+    """
+    if digest is None:
+        data = load_data()
+        digest = (data["uploads"].get(str(day_number)) or {}).get("sha256")
+        if digest is None:
+            return None
+    return get_storage().get_blob(digest)
+
+# Search
+#
+# Notes and solutions are added to the learner's search index as they are
+# saved.  The index is built from scratch on the first search, and the topics
+# are reindexed when the learner enrolls in another curriculum.
+
+def search_documents(query, limit=20, kinds=None):
+    """Search the curriculum, notes and solutions of the learner.
+    
+    Supports words, prefixes (dict*) and "quoted phrases", all of which must
+    match. kinds limits the results to some of "topic", "note" and
+    "solution". Returns dicts with kind, day, title, score and snippet, best
+    match first.
+    """
+    _ensure_search_index()
+    results = []
+    for doc_id, info, score in search.search(LEARNER_ID, query, limit, kinds):
+        results.append({
+            "kind": info["kind"],
+            "day": info["day"],
+            "title": info["title"],
+            "score": score,
+            "snippet": search.snippet(_search_text(info["kind"], info["day"]), query)
+        })
+    return results
+
+def rebuild_search_index():
+    """Index the curriculum, notes and solutions of the learner from scratch."""
+    documents = _topic_documents()
+    for day, note_text in get_all_notes().items():
+        documents.append((f"note:{day}", "note", day, f"Day {day} note", note_text))
+    for day, upload in load_data()["uploads"].items():
+        if day.isdigit() and isinstance(upload, dict) and upload.get("sha256"):
+            text = _search_text("solution", int(day))
+            documents.append((f"solution:{day}", "solution", int(day), upload.get("filename", ""), text))
+    return search.rebuild(LEARNER_ID, documents, {"built": True, "curriculum": _curriculum_key()})
+
+def _ensure_search_index():
+    index = search.load_index(LEARNER_ID)
+    if not index.meta.get("built"):
+        rebuild_search_index()
+    elif index.meta.get("curriculum") != _curriculum_key():
+        search.index_documents(LEARNER_ID, _topic_documents(), {"curriculum": _curriculum_key()}, replace_kind="topic")
+
+def _topic_documents():
+    return [(f"topic:{day['day']}", "topic", day["day"], day["topic"], _topic_text(day))
+            for day in curr.get_registry().days]
+
+def _topic_text(day):
+    resources = " ".join(resource.get("name", "") for resource in day["resources"])
+    return f"{day['topic']}\n{day['week_title']}\n{day['practice']}\n{resources}"
+
+def _search_text(kind, day_number):
+    """Get the text a search result was indexed from."""
+    if kind == "topic":
+        day = curr.get_day(day_number)
+        return _topic_text(day) if day else ""
+    if kind == "note":
+        return get_note(day_number)
+    content = get_upload_content(day_number)
+    if content is None:
+        return ""
+    return content[:search.MAX_DOCUMENT_CHARS * 4].decode("utf-8", errors="replace")
+
+def _index_note(day_number, note_text):
+    _index_search_document(f"note:{day_number}", "note", int(day_number), f"Day {day_number} note", note_text)
+
+def _index_solution(day_number, filename, text):
+    _index_search_document(f"solution:{day_number}", "solution", int(day_number), filename, text)
+
+def _index_search_document(doc_id, kind, day_number, title, text):
+    # Until the first search builds the index there is nothing to keep up to date
+    try:
+        if search.load_index(LEARNER_ID).meta.get("built"):
+            search.index_document(LEARNER_ID, doc_id, kind, day_number, title, text)
+    except Exception as e:
+        print(f"Error updating search index: {e}")
+
+def get_compression_stats():
+    """Get the note and upload compression counters of this process."""
+    return compressors.get_stats()
+
+def save_settings(section, settings):
+    """Replace a settings section such as "email_settings"."""
+    data = load_data()
+    
+    data[section] = settings
+    
+    return _save_changes(data, [(section, None, settings)])
+
+def get_enrollment():
+    """Get the learner's enrollment, {"curriculum": id} plus the enrollment date."""
+    return load_data()["enrollment"]
+
+def get_curriculum():
+    """Get the curriculum the learner is enrolled in."""
+    load_data()
+    return curr.get_registry()
+
+def enroll(curriculum_id):
+    """Enroll the learner in a registered curriculum.
+    
+    Progress is kept by day number, days beyond the end of the new
+    curriculum are ignored until the learner switches back. Raises
+    ValueError for an unknown curriculum.
+    """
+    if curr.get_curriculum(curriculum_id) is None:
+        raise ValueError(f"Unknown curriculum: {curriculum_id}")
+    
+    data = load_data()
+    enrollment = {"curriculum": curriculum_id, "enrolled_on": datetime.now().strftime("%Y-%m-%d")}
+    data["enrollment"] = enrollment
+    _activate_enrollment(data)
+    data["summary"] = _compute_summary(data)
+    
+    return _save_changes(data, [("enrollment", None, enrollment)])
+
+def _activate_enrollment(data):
+    curr.set_active_curriculum(curr.enrolled_curriculum_id(data))
+
+def _curriculum_key():
+    """Identify the active curriculum and its length, summaries are only valid for it."""
+    registry = curr.get_registry()
+    return f"{registry.id}/{len(registry.days)}"
+
 def get_resources_used(day_number):
     """Get the resources used for a specific day."""
     data = load_data()
@@ -151,59 +940,298 @@ def get_resources_used(day_number):
 
 def get_all_progress_data():
     """Get all progress data in a format suitable for visualizations."""
-    data = load_data()
-    progress = []
+    global _progress_records_cache
     
-    for day_num in range(1, 22):  # For all 21 days
-        day_str = str(day_num)
-        is_completed = day_str in data["progress"] and data["progress"][day_str]["completed"]
-        completion_date = data["progress"].get(day_str, {}).get("date_completed", None)
-        time_spent = data["time_spent"].get(day_str, 0)  # In minutes
-        
-        progress.append({
-            "day": day_num,
-            "completed": is_completed,
-            "completion_date": completion_date,
-            "time_spent_minutes": time_spent
-        })
+    frame = get_progress_frame()
+    if _progress_records_cache[0] == _data_revision:
+        return _progress_records_cache[1]
     
+    completion_dates = frame["completion_date"].dt.strftime("%Y-%m-%d")
+    progress = [
+        {
+            "day": int(day),
+            "completed": bool(completed),
+            "completion_date": None if pd.isna(completion_date) else completion_date,
+            "time_spent_minutes": int(minutes)
+        }
+        for day, completed, completion_date, minutes in zip(
+            frame["day"], frame["completed"], completion_dates, frame["minutes"]
+        )
+    ]
+    _progress_records_cache = (_data_revision, progress)
     return progress
 
+def get_progress_frame():
+    """Get the progress of every curriculum day as a columnar DataFrame.
+    
+    Columns are day, week, completed (bool), completion_date (datetime64, NaT
+    when not completed) and minutes. The frame is cached until the data
+    changes, so treat it as read-only.
+    """
+    global _progress_frame_cache
+    
+    data = load_data()
+    if _progress_frame_cache[0] != _data_revision:
+        _progress_frame_cache = (_data_revision, _build_progress_frame(data))
+    return _progress_frame_cache[1]
+
+def _build_progress_frame(data):
+    """Build the columnar progress snapshot of a document."""
+    registry = curr.get_registry()
+    days_count = len(registry.days)
+    days = np.arange(1, days_count + 1)
+    week_numbers = np.array([week["week"] for week in registry.weeks], dtype=np.int64)
+    completed = np.zeros(days_count, dtype=bool)
+    completion_dates = np.full(days_count, None, dtype=object)
+    minutes = np.zeros(days_count, dtype=np.int64)
+    
+    # Only the stored records are visited, days without records keep defaults
+    for day_str, record in data["progress"].items():
+        index = _day_index(day_str, days_count)
+        if index is not None and isinstance(record, dict) and record.get("completed", False):
+            completed[index] = True
+            completion_dates[index] = record.get("date_completed")
+    for day_str, day_minutes in data["time_spent"].items():
+        index = _day_index(day_str, days_count)
+        if index is not None:
+            minutes[index] = day_minutes
+    
+    return pd.DataFrame({
+        "day": days,
+        "week": week_numbers[registry.week_index],
+        "completed": completed,
+        "completion_date": pd.to_datetime(completion_dates, format="%Y-%m-%d", errors="coerce"),
+        "minutes": minutes
+    })
+
+def _day_index(day_str, days_count):
+    """Zero-based index of a day key, or None if it is not a curriculum day."""
+    try:
+        day_num = int(day_str)
+    except (TypeError, ValueError):
+        return None
+    return day_num - 1 if 1 <= day_num <= days_count else None
+
+def get_completion_mask():
+    """Get the completed curriculum days as a bitmask, bit 0 being day 1."""
+    return _completion_mask(get_summary())
+
 def get_completion_percentage():
     """Calculate the percentage of curriculum completed."""
-    data = load_data()
-    completed_days = sum(1 for day in data["progress"].values() if day.get("completed", False))
-    return (completed_days / 21) * 100  # 21 days total
+    return (get_completion_mask().bit_count() / curr.get_days_count()) * 100
 
 def get_weekly_progress():
     """Get progress data by week."""
-    data = load_data()
-    weekly_progress = [0, 0, 0]  # 3 weeks
-    
-    for day_num in range(1, 22):
-        day_str = str(day_num)
-        if day_str in data["progress"] and data["progress"][day_str]["completed"]:
-            # Determine which week this day belongs to
-            week_idx = (day_num - 1) // 7
-            if week_idx < 3:  # Just to be safe
-                weekly_progress[week_idx] += 1
-    
-    return weekly_progress
+    mask = get_completion_mask()
+    return [(mask & week_mask).bit_count() for week_mask in curr.get_registry().week_masks]
 
 def get_time_spent_by_week():
     """Get time spent data by week in hours."""
+    # Convert minutes to hours
+    return [minutes / 60 for minutes in get_summary()["weekly_minutes"]]
+
+def get_total_minutes():
+    """Get the total time spent across all days in minutes."""
+    return get_summary()["total_minutes"]
+
+def get_first_incomplete_day():
+    """Get the first day that is not completed yet, or None if all are."""
+    return get_summary()["first_incomplete_day"]
+
+def get_current_streak():
+    """Get the number of consecutive days with a completion up to today.
+    
+    A streak that ended yesterday still counts, it is only broken once a
+    whole day passes without a completion.
+    """
+    summary = get_summary()
+    if not summary["streak_end"]:
+        return 0
+    
+    streak_end = datetime.strptime(summary["streak_end"], "%Y-%m-%d").date()
+    today = datetime.now().date()
+    if streak_end == today or streak_end == today - timedelta(days=1):
+        return summary["streak_length"]
+    return 0
+
+# Aggregate summary
+#
+# The statistics shown on every rerun are kept in data["summary"] and updated
+# in place by the mutation functions, so reading them never rescans the
+# progress. The summary is persisted with each commit together with the
+# version it belongs to, and recomputed on load if that version does not match.
+#
+# Completion is summarized as a bitmask of the curriculum days (bit 0 is day
+# 1, stored as a hex string) next to the lowest unset bit, the first
+# incomplete day.  The progress records stay the stored form, with the
+# completion dates, so concurrent sessions still merge day by day.
+
+# Bump when the summary fields change, stored summaries of another format are recomputed
+SUMMARY_FORMAT = 3
+
+def get_summary():
+    """Get the aggregate summary of the progress data."""
+    return _summary_of(load_data())
+
+def _summary_of(data):
+    if "summary" not in data:
+        data["summary"] = _compute_summary(data)
+    return data["summary"]
+
+def _is_completed(data, day_number):
+    return bool(data["progress"].get(str(day_number), {}).get("completed", False))
+
+def _week_index(day_number):
+    """Week index of a curriculum day, or None if the day is outside the curriculum."""
+    week_index = curr.get_registry().week_index
+    if day_number < 1 or day_number > len(week_index):
+        return None
+    return int(week_index[day_number - 1])
+
+def _compute_summary(data):
+    """Build the summary from scratch with vectorized operations."""
+    frame = _build_progress_frame(data)
+    registry = curr.get_registry()
+    week_count = len(registry.weeks)
+    week_idx = registry.week_index
+    completed = frame["completed"].to_numpy()
+    minutes = frame["minutes"].to_numpy()
+    
+    mask = int.from_bytes(np.packbits(completed, bitorder="little").tobytes(), "little")
+    summary = {
+        "format": SUMMARY_FORMAT,
+        "curriculum": _curriculum_key(),
+        "completed_mask": format(mask, "x"),
+        "weekly_minutes": np.bincount(week_idx, weights=minutes, minlength=week_count)[:week_count].astype(int).tolist(),
+        "total_minutes": int(minutes.sum()),
+        "first_incomplete_day": _first_unset_day(mask, len(completed))
+    }
+    _compute_streak(data, summary)
+    return summary
+
+def _completion_ordinals(data):
+    """Sorted unique day ordinals (days since 1970-01-01) with a completion."""
+    dates = pd.to_datetime(
+        [day.get("date_completed") for day in data["progress"].values()
+         if isinstance(day, dict) and day.get("completed", False)],
+        format="%Y-%m-%d", errors="coerce"
+    ).dropna()
+    return np.unique(dates.to_numpy().astype("datetime64[D]").astype(np.int64))
+
+def _streak_runs(ordinals):
+    """Split sorted unique day ordinals into runs of consecutive days.
+    
+    Returns the first ordinal and the length of every run, oldest first.
+    """
+    if not len(ordinals):
+        return ordinals, ordinals
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(ordinals) != 1) + 1))
+    lengths = np.diff(np.append(run_starts, len(ordinals)))
+    return ordinals[run_starts], lengths
+
+def _ordinal_date(ordinal):
+    return str(np.datetime64(int(ordinal), "D"))
+
+def _completion_mask(summary):
+    return int(summary["completed_mask"], 16)
+
+def _first_unset_day(mask, days_count):
+    """Day of the lowest unset bit of a completion mask, or None if every day is set."""
+    day_number = (~mask & (mask + 1)).bit_length()
+    return day_number if day_number <= days_count else None
+
+def _compute_streak(data, summary):
+    """Find the latest and the longest run of consecutive completion dates."""
+    starts, lengths = _streak_runs(_completion_ordinals(data))
+    
+    summary["streak_end"] = None
+    summary["streak_length"] = 0
+    summary["longest_streak_start"] = None
+    summary["longest_streak_length"] = 0
+    if not len(starts):
+        return
+    
+    summary["streak_end"] = _ordinal_date(starts[-1] + lengths[-1] - 1)
+    summary["streak_length"] = int(lengths[-1])
+    # The most recent of equally long runs
+    longest = len(lengths) - 1 - int(np.argmax(lengths[::-1]))
+    summary["longest_streak_start"] = _ordinal_date(starts[longest])
+    summary["longest_streak_length"] = int(lengths[longest])
+
+def get_longest_streak():
+    """Get the longest run of consecutive completion dates as (length, first date, last date).
+    
+    The dates are "YYYY-MM-DD" strings, or None if nothing was completed.
+    """
+    summary = get_summary()
+    length = summary["longest_streak_length"]
+    if not length:
+        return 0, None, None
+    start = datetime.strptime(summary["longest_streak_start"], "%Y-%m-%d").date()
+    return length, summary["longest_streak_start"], str(start + timedelta(days=length - 1))
+
+def get_streak_runs():
+    """Get every run of consecutive completion dates, oldest first.
+    
+    Each run is a dict with start, end ("YYYY-MM-DD") and length. Computed in
+    one vectorized pass and cached until the data changes.
+    """
+    global _streak_runs_cache
+    
     data = load_data()
-    weekly_time = [0, 0, 0]  # 3 weeks
+    if _streak_runs_cache[0] != _data_revision:
+        starts, lengths = _streak_runs(_completion_ordinals(data))
+        ends = (starts + lengths - 1).astype("datetime64[D]").astype(str)
+        runs = [
+            {"start": str(start), "end": str(end), "length": int(length)}
+            for start, end, length in zip(starts.astype("datetime64[D]").astype(str), ends, lengths)
+        ]
+        _streak_runs_cache = (_data_revision, runs)
+    return _streak_runs_cache[1]
+
+def _update_summary_completion(data, day_number, was_completed):
+    """Update the summary after a day was marked complete or incomplete."""
+    summary = _summary_of(data)
+    is_completed = _is_completed(data, day_number)
+    week_idx = _week_index(day_number)
     
-    for day_num in range(1, 22):
-        day_str = str(day_num)
-        time_spent = data["time_spent"].get(day_str, 0)  # In minutes
+    if week_idx is not None and is_completed != was_completed:
+        mask = _completion_mask(summary) ^ (1 << (day_number - 1))
+        summary["completed_mask"] = format(mask, "x")
         
-        # Determine which week this day belongs to
-        week_idx = (day_num - 1) // 7
-        if week_idx < 3:  # Just to be safe
-            weekly_time[week_idx] += time_spent
+        if is_completed and summary["first_incomplete_day"] == day_number:
+            # Move the pointer past the run of completed days
+            summary["first_incomplete_day"] = _first_unset_day(mask, curr.get_days_count())
+        elif not is_completed:
+            first = summary["first_incomplete_day"]
+            summary["first_incomplete_day"] = day_number if first is None else min(first, day_number)
     
-    # Convert minutes to hours
-    weekly_time = [time / 60 for time in weekly_time]
-    return weekly_time
+    if is_completed and not was_completed:
+        # Completions are dated today, which extends or restarts the latest run
+        today = datetime.now().date()
+        streak_end = summary["streak_end"]
+        if streak_end == today.strftime("%Y-%m-%d"):
+            pass
+        elif streak_end == (today - timedelta(days=1)).strftime("%Y-%m-%d"):
+            summary["streak_end"] = today.strftime("%Y-%m-%d")
+            summary["streak_length"] += 1
+        else:
+            summary["streak_end"] = today.strftime("%Y-%m-%d")
+            summary["streak_length"] = 1
+        # The latest run is the longest once it catches up with it
+        if summary["streak_length"] >= summary["longest_streak_length"]:
+            summary["longest_streak_length"] = summary["streak_length"]
+            summary["longest_streak_start"] = str(today - timedelta(days=summary["streak_length"] - 1))
+    elif was_completed:
+        # Removing or replacing a date can split a run, rare enough to recount
+        _compute_streak(data, summary)
+
+def _update_summary_time(data, day_number, old_minutes, new_minutes):
+    """Update the summary after the time spent on a day changed."""
+    summary = _summary_of(data)
+    week_idx = _week_index(day_number)
+    if week_idx is None:
+        return
+    
+    summary["weekly_minutes"][week_idx] += new_minutes - old_minutes
+    summary["total_minutes"] += new_minutes - old_minutes
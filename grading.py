@@ -0,0 +1,277 @@
+"""
+Auto-grading of uploaded practice solutions.
+
+Solutions are run against the day's cases in practice_tests.py by a pool of
+long-lived worker processes (grading_worker.py) that are started once and
+reused.  For every case a worker forks a child that runs the solution in a
+sandbox: no environment, no network, an empty scratch directory, resource
+limits and an unprivileged user (GRADING_USER).  A case costs a fork instead
+of an interpreter start-up.  See grading_worker.py for what the sandbox does
+and does not cover.
+
+Verdicts are cached in memory and in CACHE_DIR by (solution sha256, suite
+hash).  The suite hash covers the cases and the limits, so changing a day's
+cases regrades that day's solutions and nothing else.
+
+The cases are written for the days of the default curriculum; solutions of
+learners enrolled in another curriculum are not graded.
+
+Usage (grade the latest upload of every day of a cohort, see bulk_io.py):
+    python grading.py --dir learners
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import curriculum
+import grading_worker
+import practice_tests
+import storage
+
+# Bump when verdicts change meaning, older cached verdicts are regraded
+GRADER_VERSION = 1
+
+CACHE_DIR = os.environ.get("TRACKER_GRADING_DIR", "grading_cache")
+
+# Worker processes of the pool used by the app
+WORKERS = int(os.environ.get("TRACKER_GRADING_WORKERS", 2))
+
+# Unprivileged user the solutions run as
+GRADING_USER = os.environ.get("TRACKER_GRADING_USER", "nobody")
+
+GRADER_ERROR = grading_worker.GRADER_ERROR
+
+_pool = None
+_pool_lock = threading.Lock()
+_verdicts = {}  # (solution sha256, suite hash) -> verdict
+
+
+# Test suites and the verdict cache
+
+def get_suite(day_number, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Return the test cases of a day of a curriculum, or None if the day has none."""
+    if curriculum_id != curriculum.DEFAULT_CURRICULUM_ID:
+        return None
+    return practice_tests.TEST_SUITES.get(int(day_number))
+
+
+def suite_hash(suite):
+    """Hash of a test suite and the limits it runs under."""
+    spec = {
+        "grader": GRADER_VERSION,
+        "limits": [grading_worker.CPU_SECONDS, grading_worker.WALL_SECONDS, grading_worker.MEMORY_BYTES,
+                   grading_worker.FILE_BYTES, grading_worker.MAX_OUTPUT_BYTES],
+        "cases": suite,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_verdict(digest, day_number, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Return the cached verdict of a solution for a day, or None if it was not graded."""
+    suite = get_suite(day_number, curriculum_id)
+    if not suite:
+        return None
+    key = (digest, suite_hash(suite))
+    verdict = _verdicts.get(key)
+    if verdict is not None:
+        return verdict
+
+    try:
+        with open(_cache_path(*key), 'r', encoding='utf-8') as f:
+            verdict = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    _verdicts[key] = verdict
+    return verdict
+
+
+def grade(digest, content, day_number, pool=None, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Grade a solution (bytes) against the cases of a day and return the verdict.
+
+    Cached verdicts are returned without running anything.  Verdicts with a
+    grader error are not cached, the next call grades again.  Returns None
+    if the day has no test cases, raises FileNotFoundError if content is None
+    (the solution is not stored).
+    """
+    suite = get_suite(day_number, curriculum_id)
+    if not suite:
+        return None
+    verdict = get_verdict(digest, day_number, curriculum_id)
+    if verdict is not None:
+        return verdict
+
+    if content is None:
+        raise FileNotFoundError(f"Solution {digest[:12]} is not stored")
+    source = content.decode("utf-8", errors="replace")
+    results = (pool or get_pool()).run(source, suite)
+    verdict = {
+        "version": GRADER_VERSION,
+        "day": int(day_number),
+        "suite": suite_hash(suite),
+        "passed": sum(1 for result in results if result["passed"]),
+        "total": len(results),
+        "cases": results,
+    }
+    if not any(_is_grader_error(result) for result in results):
+        _store(digest, verdict)
+    return verdict
+
+
+def _store(digest, verdict):
+    _verdicts[(digest, verdict["suite"])] = verdict
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        storage.write_file_atomically(_cache_path(digest, verdict["suite"]), json.dumps(verdict))
+    except Exception as e:
+        print(f"Error caching verdict: {e}")
+
+
+def _cache_path(digest, suite):
+    if not storage.is_digest(digest):
+        raise ValueError(f"Invalid solution digest: {digest!r}")
+    return os.path.join(CACHE_DIR, f"{digest}-{suite[:16]}.json")
+
+
+# Worker pool (app side)
+
+class WorkerPool:
+    """Pre-started grading workers, each used by one job at a time."""
+
+    def __init__(self, size=WORKERS):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Grading needs os.fork, which this platform does not have")
+        self.size = size
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._start())
+
+    def _start(self):
+        # Isolated interpreter, nothing of the app's environment, and the
+        # app directory (with the progress data) hidden from the solutions
+        return subprocess.Popen(
+            [sys.executable, "-I", "-S", os.path.abspath(grading_worker.__file__),
+             "--user", GRADING_USER, "--hide", os.getcwd(), "--hide", os.path.dirname(os.path.abspath(__file__))],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+            env={}, close_fds=True
+        )
+
+    def run(self, source, cases):
+        """Run the cases on an idle worker and return one result per case."""
+        worker = self._idle.get()
+        try:
+            worker.stdin.write(json.dumps({"source": source, "cases": cases}) + "\n")
+            worker.stdin.flush()
+            line = worker.stdout.readline()
+            if not line:
+                raise OSError("worker exited")
+            return json.loads(line)
+        except (OSError, ValueError) as e:
+            # Replace the broken worker, the job is reported as failed
+            worker.kill()
+            worker.wait()
+            worker = self._start()
+            return [_result(case, f"{GRADER_ERROR}: {e}") for case in cases]
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for _ in range(self.size):
+            worker = self._idle.get()
+            worker.stdin.close()
+            worker.wait()
+
+
+def get_pool():
+    """Get the worker pool of the app, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(WORKERS)
+        return _pool
+
+
+def _result(case, reason):
+    return {"name": case.get("name", ""), "passed": reason is None, "reason": reason}
+
+
+def _is_grader_error(result):
+    return (result.get("reason") or "").startswith(GRADER_ERROR)
+
+
+# Cohort mode
+
+def grade_cohort(learners, workers=None, batch_size=256):
+    """Grade the latest upload of every day of every (learner_id, storage) pair.
+
+    Identical (solution, day) pairs are graded once and cached verdicts are
+    reused.  Returns (graded, cached) counts.
+    """
+    pool = WorkerPool(workers or os.cpu_count() or 1)
+    seen = set()
+    graded = 0
+    cached = 0
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            batch = []
+            for digest, day, curriculum_id, learner_storage in _iter_latest_uploads(learners):
+                if (digest, day) in seen or not get_suite(day, curriculum_id):
+                    continue
+                seen.add((digest, day))
+                if get_verdict(digest, day, curriculum_id) is not None:
+                    cached += 1
+                    continue
+                content = learner_storage.get_blob(digest)
+                if content is None:
+                    continue
+                batch.append(executor.submit(grade, digest, content, day, pool, curriculum_id))
+                if len(batch) >= batch_size:
+                    graded += _wait(batch)
+                    batch = []
+            graded += _wait(batch)
+    finally:
+        pool.close()
+    return graded, cached
+
+
+def _iter_latest_uploads(learners):
+    for learner_id, learner_storage in learners:
+        data = learner_storage.load() or {}
+        curriculum_id = curriculum.enrolled_curriculum_id(data)
+        for day, upload in data.get("uploads", {}).items():
+            if day.isdigit() and isinstance(upload, dict) and upload.get("sha256"):
+                yield upload["sha256"], int(day), curriculum_id, learner_storage
+
+
+def _wait(futures):
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error grading solution: {e}")
+    return len(futures)
+
+
+def main(argv=None):
+    # Imported here so the worker processes stay small
+    import bulk_io
+
+    parser = argparse.ArgumentParser(description="Grade the uploaded solutions of a cohort.")
+    parser.add_argument("--dir", default=".", help="Cohort directory with one <learner>.json per learner")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    graded, cached = grade_cohort(bulk_io.discover_learners(args.dir), args.workers)
+    print(f"Graded {graded} solutions in {time.perf_counter() - start:.1f} s, {cached} already cached")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Sandboxed grading worker, started by grading.WorkerPool as
+
+    python -I -S grading_worker.py --user nobody --hide <app directory>
+
+The interpreter runs isolated (no site-packages, no user paths, an empty
+environment), so this module only uses the standard library.  It reads one
+job per line from stdin, {"source": ..., "cases": [...]}, and writes one
+JSON list of results per job to stdout.
+
+Every case runs in a forked child that, before running the solution:
+
+- closes every file descriptor but stdin, stdout/stderr and its result pipe,
+- enters new mount and network namespaces: there is no network, an empty
+  tmpfs is mounted on /tmp, /var/tmp, /dev/shm and the hidden directories
+  (the app directory with the progress data), and /tmp is the scratch
+  directory,
+- limits CPU time, memory, file size, open files, and forbids new processes,
+- drops to the unprivileged grading user and its group.
+
+Setting this up needs root (CAP_SYS_ADMIN and CAP_SETUID).  If any step
+fails the solution is not run and the case is reported as a grader error.
+Files the grading user can read elsewhere stay readable, so anything
+sensitive outside the hidden directories needs file permissions that keep
+it out of reach, or the app runs in a container.
+"""
+import builtins
+import copy
+import ctypes
+import json
+import os
+import pwd
+import re
+import select
+import signal
+import sys
+import time
+import types
+
+try:
+    import resource
+except ImportError:
+    # No resource limits on platforms without the resource module (Windows)
+    resource = None
+
+# Reason of the results of a job the grader itself failed to run
+GRADER_ERROR = "grader error"
+
+# Limits of one test case run
+CPU_SECONDS = 2
+WALL_SECONDS = 5
+MEMORY_BYTES = 256 * 1024 * 1024
+FILE_BYTES = 1024 * 1024
+MAX_OUTPUT_BYTES = 64 * 1024
+OPEN_FILES = 32
+SCRATCH_BYTES = 8 * 1024 * 1024
+
+# World-writable directories, replaced by an empty tmpfs in every child
+TEMP_DIRS = ("/tmp", "/var/tmp", "/dev/shm")
+
+# Imported before the children drop privileges, so solutions can use them
+# even where the grading user cannot read the Python installation
+PRELOADED_MODULES = (
+    "abc", "bisect", "collections", "csv", "dataclasses", "datetime", "decimal", "enum",
+    "fractions", "functools", "heapq", "io", "itertools", "json", "math", "operator",
+    "pathlib", "random", "re", "statistics", "string", "textwrap", "time", "typing",
+)
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWNET = 0x40000000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+def main(argv):
+    """Serve grading jobs read from stdin, one JSON line per job."""
+    user = "nobody"
+    hidden = []
+    args = list(argv)
+    while args:
+        option = args.pop(0)
+        if option == "--user" and args:
+            user = args.pop(0)
+        elif option == "--hide" and args:
+            hidden.append(args.pop(0))
+        else:
+            sys.stderr.write(f"Unknown option: {option}\n")
+            return 2
+
+    try:
+        account = pwd.getpwnam(user)
+        sandbox = {"uid": account.pw_uid, "gid": account.pw_gid, "hidden": _hideable(hidden)}
+    except KeyError:
+        sandbox = {"error": f"unknown grading user {user!r}"}
+    for name in PRELOADED_MODULES:
+        __import__(name)
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        results = [run_case(job["source"], case, sandbox) for case in job["cases"]]
+        sys.stdout.write(json.dumps(results) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+def _hideable(paths):
+    """Keep the directories that can be hidden without hiding Python itself."""
+    python_dirs = [os.path.realpath(path) for path in (sys.base_prefix, sys.prefix, os.path.dirname(sys.executable))]
+    hideable = []
+    for path in paths:
+        path = os.path.realpath(path)
+        if path == "/" or any(python_dir == path or python_dir.startswith(path + os.sep) for python_dir in python_dirs):
+            continue
+        hideable.append(path)
+    return hideable
+
+
+def run_case(source, case, sandbox):
+    """Run one case of a solution in a forked, sandboxed child."""
+    stdin_data = case.get("stdin", "").encode("utf-8")
+    in_r, in_w = os.pipe()
+    out_r, out_w = os.pipe()
+    result_r, result_w = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(in_w)
+            os.close(out_r)
+            os.close(result_r)
+            _run_child(source, case, sandbox, in_r, out_w, result_w)
+        finally:
+            os._exit(1)
+
+    os.close(in_r)
+    os.close(out_w)
+    os.close(result_w)
+    output, result, timed_out = _collect_child(pid, stdin_data, in_w, out_r, result_r)
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return _result(case, f"timed out after {WALL_SECONDS} s")
+    if os.WIFSIGNALED(status):
+        if os.WTERMSIG(status) == getattr(signal, "SIGXCPU", None):
+            return _result(case, f"exceeded {CPU_SECONDS} s of CPU time")
+        return _result(case, f"killed by signal {os.WTERMSIG(status)}")
+    try:
+        outcome = json.loads(result)
+    except ValueError:
+        return _result(case, "crashed before finishing")
+    if outcome["error"]:
+        return _result(case, outcome["error"])
+    if outcome["failures"]:
+        return _result(case, outcome["failures"][0])
+
+    text = output.decode("utf-8", errors="replace")
+    for pattern in case.get("expect", []):
+        if not re.search(pattern, text, re.IGNORECASE):
+            return _result(case, f"output does not match {pattern}")
+    return _result(case, None)
+
+
+def _collect_child(pid, stdin_data, in_w, out_r, result_r):
+    """Feed stdin and read the output and result pipes until the child is done.
+
+    Returns (output, result, timed_out).  Output beyond MAX_OUTPUT_BYTES is
+    read and dropped so the child never blocks on a full pipe.
+    """
+    deadline = time.monotonic() + WALL_SECONDS
+    buffers = {out_r: b"", result_r: b""}
+    readers = [out_r, result_r]
+    writers = [in_w] if stdin_data else []
+    if not stdin_data:
+        os.close(in_w)
+
+    while readers:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            os.kill(pid, signal.SIGKILL)
+            for fd in readers + writers:
+                os.close(fd)
+            return buffers[out_r], buffers[result_r], True
+
+        readable, writable, _ = select.select(readers, writers, [], remaining)
+        for fd in writable:
+            try:
+                written = os.write(fd, stdin_data)
+            except BrokenPipeError:
+                written = len(stdin_data)
+            stdin_data = stdin_data[written:]
+            if not stdin_data:
+                os.close(fd)
+                writers = []
+        for fd in readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                readers.remove(fd)
+                os.close(fd)
+            elif len(buffers[fd]) < MAX_OUTPUT_BYTES:
+                buffers[fd] += chunk
+
+    for fd in writers:
+        os.close(fd)
+    return buffers[out_r], buffers[result_r], False
+
+
+
+
+def _run_child(source, case, sandbox, in_r, out_w, result_w):
+    """Sandbox the forked child, run the solution and write the outcome to fd 3."""
+    os.dup2(in_r, 0)
+    os.dup2(out_w, 1)
+    os.dup2(out_w, 2)
+    os.dup2(result_w, 3)
+    _close_fds_from(4)
+    try:
+        _enter_sandbox(sandbox)
+    except OSError as e:
+        os.write(3, json.dumps({"error": f"{GRADER_ERROR}: sandbox unavailable: {e}", "failures": []}).encode("utf-8"))
+        os._exit(0)
+    sys.stdin = open(0, 'r', closefd=False)
+    sys.stdout = sys.stderr = open(1, 'w', closefd=False)
+
+    namespace = {"__name__": "__main__", "__builtins__": builtins}
+    error = None
+    failures = []
+    try:
+        exec(compile(source, "solution.py", "exec"), namespace)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"exited with status {e.code}"
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+
+    if error is None:
+        for name in case.get("defines", []):
+            if name not in namespace:
+                failures.append(f"{name} is not defined")
+        if case.get("check"):
+            namespace["returns_any"] = _returns_any(namespace)
+            try:
+                if not eval(case["check"], namespace):
+                    failures.append("check failed")
+            except BaseException as e:
+                failures.append(f"check raised {type(e).__name__}: {e}")
+
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    os.write(3, json.dumps({"error": error, "failures": failures}).encode("utf-8"))
+    os._exit(0)
+
+
+def _close_fds_from(first):
+    try:
+        fds = [int(name) for name in os.listdir("/proc/self/fd")]
+    except OSError:
+        fds = range(first, 1024)
+    for fd in fds:
+        if fd >= first:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _enter_sandbox(sandbox):
+    """Isolate the current process, raises OSError if any step fails."""
+    if "error" in sandbox:
+        raise OSError(sandbox["error"])
+    if resource is None:
+        raise OSError("no resource limits on this platform")
+
+    _check(_libc.unshare(CLONE_NEWNS | CLONE_NEWNET), "unshare")
+    # Mounts below stay in this namespace
+    _check(_libc.mount(None, b"/", None, MS_REC | MS_PRIVATE, None), "mount /")
+    options = f"size={SCRATCH_BYTES},mode=1777".encode()
+    for path in list(TEMP_DIRS) + sandbox["hidden"]:
+        if os.path.isdir(path):
+            _check(_libc.mount(b"tmpfs", path.encode(), b"tmpfs", MS_NOSUID | MS_NODEV, options), f"mount {path}")
+    os.chdir("/tmp")
+
+    resource.setrlimit(resource.RLIMIT_CPU, (CPU_SECONDS, CPU_SECONDS + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (MEMORY_BYTES, MEMORY_BYTES))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (FILE_BYTES, FILE_BYTES))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (OPEN_FILES, OPEN_FILES))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    os.setgroups([])
+    os.setgid(sandbox["gid"])
+    os.setuid(sandbox["uid"])
+    if os.getuid() == 0 or os.geteuid() == 0:
+        raise OSError("the grading user must not be root")
+
+
+def _check(status, step):
+    if status != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{step}: {os.strerror(errno)}")
+
+
+def _returns_any(namespace):
+    def returns_any(expected, *args):
+        for value in list(namespace.values()):
+            if not isinstance(value, types.FunctionType) or value.__globals__ is not namespace:
+                continue
+            call_args = copy.deepcopy(args)
+            try:
+                returned = value(*call_args)
+            except Exception:
+                continue
+            if returned == expected or (returned is None and call_args and call_args[0] == expected):
+                return True
+        return False
+    return returns_any
+
+
+
+def _result(case, reason):
+    return {"name": case.get("name", ""), "passed": reason is None, "reason": reason}
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,61 @@
+"""
+Test cases for the practice exercises of the curriculum, used by grading.py.
+
+Each day maps to a list of cases.  A case runs the whole solution as a
+script and passes if every check holds:
+
+- "stdin": text fed to input() (default: nothing)
+- "expect": regular expressions that must all be found in the output
+  (case-insensitive)
+- "defines": names the solution must define
+- "check": an expression evaluated in the solution's namespace after it ran,
+  which must be true.  returns_any(expected, *args) is available there: it is
+  true if any function the solution defines returns expected for args, or
+  changes its first argument into expected (for in-place sorts).
+
+Days whose practice task is open-ended (projects, planning) have no cases.
+"""
+
+TEST_SUITES = {
+    1: [
+        {"name": "prints name, age and number", "expect": [r"\w+", r"\d+"]},
+    ],
+    2: [
+        {"name": "adds 6 and 3", "stdin": "6\n3\n", "expect": [r"\b9(\.0)?\b"]},
+        {"name": "divides 6 by 3", "stdin": "6\n3\n", "expect": [r"\b2(\.0)?\b"]},
+    ],
+    3: [
+        {"name": "positive number", "stdin": "5\n", "expect": [r"positive"]},
+        {"name": "negative number", "stdin": "-5\n", "expect": [r"negative"]},
+        {"name": "zero", "stdin": "0\n", "expect": [r"zero"]},
+    ],
+    4: [
+        {"name": "prints 1 to 10", "expect": [r"\b1\b", r"\b5\b", r"\b10\b"]},
+        {"name": "prints even numbers", "expect": [r"\b2\b", r"\b4\b", r"\b8\b"]},
+    ],
+    5: [
+        {"name": "function returns the square", "check": "returns_any(16, 4) and returns_any(9, -3)"},
+    ],
+    6: [
+        {"name": "reverses a string", "expect": [r"\S"]},
+    ],
+    8: [
+        {"name": "counts words in a dictionary", "stdin": "the cat and the hat\n",
+         "check": "any(isinstance(v, dict) and v for v in dict(globals()).values())"},
+    ],
+    10: [
+        {"name": "survives division by zero", "stdin": "1\n0\n", "expect": [r"\S"]},
+    ],
+    11: [
+        {"name": "prints a password", "expect": [r"\S{6,}"]},
+    ],
+    12: [
+        {"name": "defines a Car class", "defines": ["Car"]},
+    ],
+    16: [
+        {"name": "defines a stack or queue", "check": "any(isinstance(v, type) for v in dict(globals()).values())"},
+    ],
+    17: [
+        {"name": "sorts a list", "check": "returns_any([1, 2, 3, 5], [5, 3, 1, 2])"},
+    ],
+}
@@ -0,0 +1,246 @@
+"""
+"Related notes": notes similar to the one a learner is looking at.
+
+Every note is a TF-IDF vector (sublinear term frequency times inverse
+document frequency, normalized to unit length).  The vectors are the rows of
+a sparse matrix, so the cosine similarity of a note to all others is one
+sparse matrix-vector product followed by a top-k selection.  SciPy is used
+for the matrix when it is installed, otherwise the same product is done on
+the CSR arrays with NumPy.
+
+Rows are added and replaced one note at a time; the weighted matrix is
+rebuilt from them (vectorized) on the next query after a change, because a
+changed note shifts the IDF of its terms in every row.
+
+A cohort-wide matrix over every learner's notes can be built with
+    python related.py --dir learners
+and is stored in COHORT_FILE.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+import search
+import serializers
+import storage
+
+COHORT_FILE = os.environ.get("TRACKER_RELATED_COHORT", os.path.join("related_index", "cohort.bin"))
+
+# Words too common in notes to say anything about their topic
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does
+for from had has have how i if in into is it its just learned like me more my not of on or
+so than that the their them then there these this to today too up use used very was we were
+what when which while will with would you your
+""".split())
+
+_cohort = (None, None)  # (file signature, NoteVectors)
+
+
+def note_terms(text):
+    """Return the terms of a note that count for similarity."""
+    return [term for term in search.tokenize(text) if term not in STOP_WORDS and not term.isdigit()]
+
+
+class NoteVectors:
+    """Sparse TF-IDF vectors of notes, keyed by any hashable note key."""
+
+    def __init__(self):
+        self.vocabulary = {}  # term -> column
+        self.keys = []  # row -> note key
+        self._rows = {}  # note key -> row
+        self._columns = []  # row -> int32 array of columns, None for a removed note
+        self._counts = []  # row -> float32 array of term counts
+        self._document_frequency = np.zeros(0, dtype=np.int64)
+        self._matrix = None  # CSR (indptr, indices, data), or a SciPy matrix
+
+    def __len__(self):
+        return len(self._rows)
+
+    def set(self, key, text):
+        """Add, replace or (with an empty text) remove the note of a key."""
+        self.remove(key)
+        terms = note_terms(text)
+        if not terms:
+            return
+        for term in terms:
+            if term not in self.vocabulary:
+                self.vocabulary[term] = len(self.vocabulary)
+        columns, counts = np.unique([self.vocabulary[term] for term in terms], return_counts=True)
+        self._add_row(key, columns.astype(np.int32), counts.astype(np.float32))
+
+    def _add_row(self, key, columns, counts):
+        if len(self.vocabulary) > len(self._document_frequency):
+            grown = np.zeros(max(len(self.vocabulary), 2 * len(self._document_frequency)), dtype=np.int64)
+            grown[:len(self._document_frequency)] = self._document_frequency
+            self._document_frequency = grown
+        self._rows[key] = len(self.keys)
+        self.keys.append(key)
+        self._columns.append(columns)
+        self._counts.append(counts)
+        self._document_frequency[columns] += 1
+        self._matrix = None
+
+    def remove(self, key):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        self._document_frequency[self._columns[row]] -= 1
+        self._columns[row] = None
+        self._counts[row] = None
+        self._matrix = None
+        # Compact once half of the rows are removed notes
+        if len(self._rows) * 2 < len(self.keys):
+            self._compact()
+
+    def _compact(self):
+        live = [row for row in range(len(self.keys)) if self._columns[row] is not None]
+        self.keys = [self.keys[row] for row in live]
+        self._columns = [self._columns[row] for row in live]
+        self._counts = [self._counts[row] for row in live]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    def _idf(self):
+        frequency = self._document_frequency[:len(self.vocabulary)]
+        return (np.log((1 + len(self._rows)) / (1 + frequency)) + 1).astype(np.float32)
+
+    def _weights(self, columns, counts, idf):
+        weights = (1 + np.log(counts)) * idf[columns]
+        norm = np.linalg.norm(weights)
+        return weights / norm if norm else weights
+
+    def _get_matrix(self, idf):
+        """Build the row-normalized TF-IDF matrix in CSR form."""
+        if self._matrix is not None:
+            return self._matrix
+        empty = np.zeros(0, dtype=np.int32)
+        columns = [self._columns[row] if self._columns[row] is not None else empty for row in range(len(self.keys))]
+        counts = [self._counts[row] if self._counts[row] is not None else empty.astype(np.float32)
+                  for row in range(len(self.keys))]
+        lengths = np.array([len(row_columns) for row_columns in columns], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.concatenate(columns) if columns else empty
+        row_of = np.repeat(np.arange(len(self.keys)), lengths)
+
+        data = (1 + np.log(np.concatenate(counts))) * idf[indices] if columns else np.zeros(0, dtype=np.float32)
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(self.keys)))
+        data = (data / np.where(norms > 0, norms, 1)[row_of]).astype(np.float32)
+
+        if sparse is not None:
+            self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self.keys), len(self.vocabulary)))
+        else:
+            self._matrix = (row_of, indices, data)
+        return self._matrix
+
+    def similarities(self, text):
+        """Return the cosine similarity of a text to every row (0 for removed notes)."""
+        if not self._rows:
+            return np.zeros(len(self.keys), dtype=np.float32)
+        idf = self._idf()
+        terms = [self.vocabulary[term] for term in note_terms(text) if term in self.vocabulary]
+        if not terms:
+            return np.zeros(len(self.keys), dtype=np.float32)
+        columns, counts = np.unique(terms, return_counts=True)
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        query[columns] = self._weights(columns, counts.astype(np.float32), idf)
+
+        matrix = self._get_matrix(idf)
+        if sparse is not None:
+            return np.asarray(matrix @ query).ravel()
+        row_of, indices, data = matrix
+        return np.bincount(row_of, weights=data * query[indices], minlength=len(self.keys))
+
+    def most_similar(self, text, k=5, exclude=(), min_score=0.05):
+        """Return [(key, score)] of the k notes most similar to a text, best first."""
+        scores = self.similarities(text)
+        for key in exclude:
+            row = self._rows.get(key)
+            if row is not None:
+                scores[row] = 0
+        count = min(k, int(np.count_nonzero(scores >= min_score)))
+        if count == 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.keys[row], float(scores[row])) for row in best]
+
+    def to_json(self):
+        live = [row for row in range(len(self.keys)) if self._columns[row] is not None]
+        return {
+            "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get),
+            "keys": [list(self.keys[row]) if isinstance(self.keys[row], tuple) else self.keys[row] for row in live],
+            "columns": [self._columns[row].tolist() for row in live],
+            "counts": [self._counts[row].astype(int).tolist() for row in live],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        vectors = cls()
+        vectors.vocabulary = {term: column for column, term in enumerate(data.get("vocabulary", []))}
+        for key, columns, counts in zip(data.get("keys", []), data.get("columns", []), data.get("counts", [])):
+            key = tuple(key) if isinstance(key, list) else key
+            vectors._add_row(key, np.array(columns, dtype=np.int32), np.array(counts, dtype=np.float32))
+        return vectors
+
+
+# Cohort matrix
+
+def build_cohort(learners):
+    """Build the vectors of every note of (learner_id, storage) pairs, keyed by (learner_id, day)."""
+    vectors = NoteVectors()
+    for learner_id, learner_storage in learners:
+        for day in learner_storage.note_days():
+            text = learner_storage.get_note(day)
+            if text and str(day).isdigit():
+                vectors.set((learner_id, int(day)), text)
+    return vectors
+
+
+def save_cohort(vectors):
+    directory = os.path.dirname(COHORT_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    storage.write_file_atomically(COHORT_FILE, serializers.encode(vectors.to_json()))
+
+
+def load_cohort():
+    """Return the stored cohort vectors, or None if none were built."""
+    global _cohort
+    file_sig = storage.file_signature(COHORT_FILE)
+    if _cohort[0] == file_sig and _cohort[1] is not None:
+        return _cohort[1]
+    try:
+        with open(COHORT_FILE, 'rb') as f:
+            vectors = NoteVectors.from_json(serializers.decode(f.read()))
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Error loading cohort notes: {e}")
+        return None
+    _cohort = (file_sig, vectors)
+    return vectors
+
+
+def main(argv=None):
+    # Imported here, the app only needs the vectors
+    import bulk_io
+
+    parser = argparse.ArgumentParser(description="Build the cohort-wide related notes matrix.")
+    parser.add_argument("--dir", default=".", help="Cohort directory with one <learner>.json per learner")
+    args = parser.parse_args(argv)
+
+    vectors = build_cohort(bulk_io.discover_learners(args.dir))
+    save_cohort(vectors)
+    print(f"Indexed {len(vectors)} notes with {len(vectors.vocabulary)} terms in {COHORT_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
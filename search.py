@@ -0,0 +1,375 @@
+"""
+Full-text search over the curriculum, a learner's notes and their solutions.
+
+Documents are split into lowercase word terms and kept in an inverted index:
+each term maps to the documents containing it and the positions it occurs
+at, so a query only looks at the postings of its own terms.  The sorted term
+list answers prefix queries (dict*) with a binary search, positions answer
+phrase queries ("list comprehension"), and results are ranked with BM25.
+
+Every learner has one index in INDEX_DIR, stored as a snapshot (<name>.json)
+plus a journal of changes (<name>.json.journal) so saving a note appends one
+line instead of rewriting the index.  The journal is folded into the
+snapshot once it has JOURNAL_COMPACT_ENTRIES entries.  Snapshots use the
+fastest installed serializer (see serializers.py), and a loaded index stays
+in memory until its files change.
+"""
+import bisect
+import heapq
+import math
+import os
+import re
+import zlib
+
+import serializers
+import storage
+
+INDEX_DIR = os.environ.get("TRACKER_SEARCH_DIR", "search_index")
+
+# Bump when tokenization or the stored format changes, older indexes are rebuilt
+INDEX_VERSION = 1
+
+JOURNAL_COMPACT_ENTRIES = 1000
+
+# Only the beginning of very large documents is indexed
+MAX_DOCUMENT_CHARS = 200000
+
+# Terms a prefix is expanded to at most, the most frequent ones are kept
+MAX_PREFIX_TERMS = 64
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_WORD = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+_indexes = {}  # name -> (file signature, SearchIndex)
+
+
+def tokenize(text):
+    """Return the lowercase word terms of a text, in order."""
+    return _WORD.findall(text[:MAX_DOCUMENT_CHARS].lower())
+
+
+def checksum(text):
+    return zlib.crc32(text.encode("utf-8", errors="replace"))
+
+
+class SearchIndex:
+    """Positional inverted index with BM25 ranking."""
+
+    def __init__(self):
+        self.docs = {}  # doc id -> {"kind", "day", "title", "length", "checksum"}
+        self.postings = {}  # term -> {doc id: [positions]}
+        self.meta = {}
+        self._terms = []  # sorted terms, for prefix queries
+        self._doc_terms = {}  # doc id -> terms of the document
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, kind, day, title, text):
+        """Add or replace a document."""
+        terms = tokenize(text)
+        positions = {}
+        for position, term in enumerate(terms):
+            positions.setdefault(term, []).append(position)
+        info = {"kind": kind, "day": day, "title": title, "length": len(terms), "checksum": checksum(text)}
+        self._put(doc_id, info, positions)
+        return info, positions
+
+    def _put(self, doc_id, info, positions):
+        self.remove(doc_id)
+        self.docs[doc_id] = info
+        self._doc_terms[doc_id] = list(positions)
+        self._total_length += info["length"]
+        for term, term_positions in positions.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[doc_id] = term_positions
+
+    def remove(self, doc_id):
+        if doc_id not in self.docs:
+            return
+        self._total_length -= self.docs.pop(doc_id)["length"]
+        for term in self._doc_terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def is_current(self, doc_id, text):
+        """Check whether a document is indexed with exactly this text."""
+        info = self.docs.get(doc_id)
+        return info is not None and info["checksum"] == checksum(text)
+
+    def expand_prefix(self, prefix):
+        """Return the indexed terms starting with prefix, the most frequent first."""
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + "\U0010ffff")
+        terms = self._terms[start:end]
+        if len(terms) > MAX_PREFIX_TERMS:
+            terms = heapq.nlargest(MAX_PREFIX_TERMS, terms, key=lambda term: len(self.postings[term]))
+        return terms
+
+    def search(self, query, limit=20, kinds=None):
+        """Return the best matching documents as [(doc id, score)], best first.
+
+        Every word, prefix (word*) and "quoted phrase" of the query must match.
+        kinds restricts the results to documents of those kinds.
+        """
+        clauses = parse_query(query)
+        if not clauses or not self.docs:
+            return []
+
+        matches = []  # per clause: {doc id: {term: frequency}}
+        for clause_type, terms in clauses:
+            if clause_type == "prefix":
+                terms = self.expand_prefix(terms[0])
+                found = {}
+                for term in terms:
+                    for doc_id, positions in self.postings[term].items():
+                        found.setdefault(doc_id, {})[term] = len(positions)
+            elif clause_type == "phrase":
+                found = self._match_phrase(terms)
+            else:
+                found = {doc_id: {terms[0]: len(positions)}
+                         for doc_id, positions in self.postings.get(terms[0], {}).items()}
+            if not found:
+                return []
+            matches.append(found)
+
+        # Intersect starting from the rarest clause
+        matches.sort(key=len)
+        candidates = set(matches[0])
+        for found in matches[1:]:
+            candidates.intersection_update(found)
+            if not candidates:
+                return []
+        if kinds is not None:
+            candidates = {doc_id for doc_id in candidates if self.docs[doc_id]["kind"] in kinds}
+
+        scored = ((doc_id, self._score(doc_id, matches)) for doc_id in candidates)
+        return heapq.nlargest(limit, scored, key=lambda result: (result[1], result[0]))
+
+    def _match_phrase(self, terms):
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return {}
+        found = {}
+        for doc_id in set.intersection(*(set(term_postings) for term_postings in postings)):
+            # Positions where term i is the i-th word of an occurrence of the phrase
+            starts = set(postings[0][doc_id])
+            for offset, term_postings in enumerate(postings[1:], 1):
+                starts &= {position - offset for position in term_postings[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                found[doc_id] = {term: len(starts) for term in terms}
+        return found
+
+    def _score(self, doc_id, matches):
+        count = len(self.docs)
+        average_length = self._total_length / count or 1
+        length_norm = K1 * (1 - B + B * self.docs[doc_id]["length"] / average_length)
+        score = 0.0
+        for found in matches:
+            for term, frequency in found[doc_id].items():
+                df = len(self.postings[term])
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                score += idf * frequency * (K1 + 1) / (frequency + length_norm)
+        return score
+
+    def to_json(self):
+        return {"version": INDEX_VERSION, "meta": self.meta, "docs": self.docs, "postings": self.postings}
+
+    @classmethod
+    def from_json(cls, data):
+        index = cls()
+        if data.get("version") != INDEX_VERSION:
+            return index
+        index.meta = data.get("meta", {})
+        index.docs = data.get("docs", {})
+        index.postings = data.get("postings", {})
+        index._terms = sorted(index.postings)
+        index._doc_terms = {doc_id: [] for doc_id in index.docs}
+        for term, postings in index.postings.items():
+            for doc_id in postings:
+                index._doc_terms[doc_id].append(term)
+        index._total_length = sum(info["length"] for info in index.docs.values())
+        return index
+
+    def apply(self, entry):
+        """Apply a journal entry."""
+        if "delete" in entry:
+            self.remove(entry["delete"])
+        elif "meta" in entry:
+            self.meta.update(entry["meta"])
+        else:
+            self._put(entry["put"], entry["info"], entry["positions"])
+
+
+def parse_query(query):
+    """Split a query into ("term" | "prefix" | "phrase", terms) clauses."""
+    clauses = []
+    for phrase, word in _QUERY_PART.findall(query):
+        if phrase:
+            terms = tokenize(phrase)
+        else:
+            terms = tokenize(word)
+            if word.endswith("*") and len(terms) == 1:
+                clauses.append(("prefix", terms))
+                continue
+        if len(terms) == 1:
+            clauses.append(("term", terms))
+        elif terms:
+            clauses.append(("phrase", terms))
+    return clauses
+
+
+def snippet(text, query, width=200):
+    """Return the part of text around the first match of a query term."""
+    terms = [term for clause_type, terms in parse_query(query) for term in terms]
+    text = " ".join(text[:MAX_DOCUMENT_CHARS].split())
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    excerpt = text[start:start + width]
+    return ("..." if start else "") + excerpt + ("..." if start + width < len(text) else "")
+
+
+# Stored indexes
+
+def load_index(name):
+    """Return the index of a learner, reloading it only when its files changed."""
+    path = _index_path(name)
+    file_sig = storage.file_signature(path, path + ".journal")
+    cached = _indexes.get(name)
+    if cached is not None and cached[0] == file_sig:
+        return cached[1]
+
+    try:
+        with open(path, 'rb') as f:
+            index = SearchIndex.from_json(serializers.decode(f.read()))
+    except FileNotFoundError:
+        index = SearchIndex()
+    except ValueError as e:
+        print(f"Error loading search index: {e}")
+        index = SearchIndex()
+    replayed = 0
+    try:
+        with open(path + ".journal", 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    index.apply(serializers.loads_line(line))
+                except (ValueError, KeyError):
+                    # A torn last line from a crash, the entries before it count
+                    break
+                replayed += 1
+    except FileNotFoundError:
+        pass
+    index.meta["journal_entries"] = replayed
+    _indexes[name] = (file_sig, index)
+    return index
+
+
+def save_index(name, index):
+    """Write the whole index as a new snapshot and clear the journal."""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = _index_path(name)
+    storage.write_file_atomically(path, serializers.encode(index.to_json()))
+    try:
+        os.remove(path + ".journal")
+    except FileNotFoundError:
+        pass
+    _indexes[name] = (storage.file_signature(path, path + ".journal"), index)
+
+
+def _append(name, index, entries):
+    path = _index_path(name)
+    with open(path + ".journal", 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(serializers.dumps_line(entry) + "\n")
+    index.meta["journal_entries"] = index.meta.get("journal_entries", 0) + len(entries)
+    if index.meta["journal_entries"] >= JOURNAL_COMPACT_ENTRIES:
+        index.meta["journal_entries"] = 0
+        save_index(name, index)
+    else:
+        _indexes[name] = (storage.file_signature(path, path + ".journal"), index)
+
+
+def index_document(name, doc_id, kind, day, title, text):
+    """Add or replace a document in a learner's stored index.
+
+    An empty text removes the document.  Unchanged documents are not written.
+    """
+    with _index_lock(name):
+        index = load_index(name)
+        if not text:
+            if doc_id in index.docs:
+                index.remove(doc_id)
+                _append(name, index, [{"delete": doc_id}])
+            return
+        if index.is_current(doc_id, text):
+            return
+        info, positions = index.add(doc_id, kind, day, title, text)
+        _append(name, index, [{"put": doc_id, "info": info, "positions": positions}])
+
+
+def index_documents(name, documents, meta=None, replace_kind=None):
+    """Add (doc id, kind, day, title, text) documents in one journal write.
+
+    If replace_kind is given, indexed documents of that kind that are not in
+    documents are removed.  meta is merged into the index metadata.
+    """
+    with _index_lock(name):
+        index = load_index(name)
+        entries = []
+        keep = set()
+        for doc_id, kind, day, title, text in documents:
+            keep.add(doc_id)
+            if text and not index.is_current(doc_id, text):
+                info, positions = index.add(doc_id, kind, day, title, text)
+                entries.append({"put": doc_id, "info": info, "positions": positions})
+        if replace_kind is not None:
+            for doc_id in [doc_id for doc_id, info in index.docs.items()
+                           if info["kind"] == replace_kind and doc_id not in keep]:
+                index.remove(doc_id)
+                entries.append({"delete": doc_id})
+        if meta:
+            index.meta.update(meta)
+            entries.append({"meta": meta})
+        if entries:
+            _append(name, index, entries)
+
+
+def rebuild(name, documents, meta=None):
+    """Replace a learner's index with (doc id, kind, day, title, text) documents."""
+    index = SearchIndex()
+    for doc_id, kind, day, title, text in documents:
+        if text:
+            index.add(doc_id, kind, day, title, text)
+    index.meta.update(meta or {})
+    with _index_lock(name):
+        save_index(name, index)
+    return index
+
+
+def search(name, query, limit=20, kinds=None):
+    """Search a learner's index, returning [(doc id, info, score)] best first."""
+    index = load_index(name)
+    return [(doc_id, index.docs[doc_id], score) for doc_id, score in index.search(query, limit, kinds)]
+
+
+def _index_path(name):
+    return os.path.join(INDEX_DIR, f"{name}.json")
+
+
+def _index_lock(name):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    return storage.FileLock(_index_path(name) + ".lock")
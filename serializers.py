@@ -0,0 +1,114 @@
+"""
+Serializers for the Python learning tracker data files.
+
+Every codec turns a document into bytes and back.  Binary codecs prefix their
+output with a one-byte tag so decode() can detect the format of a file; JSON
+output is never tagged (it starts with "{" or whitespace), which keeps existing
+data files readable.
+
+orjson and msgpack are optional.  When they are installed, "auto" picks the
+fastest available codec.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Header bytes of tagged (binary) formats
+MSGPACK_TAG = b"\x01"
+
+
+def _encode_json_pretty(obj):
+    return json.dumps(obj, indent=4).encode("utf-8")
+
+
+def _encode_json_compact(obj):
+    return json.dumps(obj, separators=(',', ':')).encode("utf-8")
+
+
+def _decode_json(raw):
+    return json.loads(raw)
+
+
+def _encode_orjson(obj):
+    return orjson.dumps(obj)
+
+
+def _decode_orjson(raw):
+    return orjson.loads(raw)
+
+
+def _encode_msgpack(obj):
+    return MSGPACK_TAG + msgpack.packb(obj, use_bin_type=True)
+
+
+def _decode_msgpack(raw):
+    return msgpack.unpackb(raw[len(MSGPACK_TAG):], raw=False, strict_map_key=False)
+
+
+# name -> (encode, decode, available)
+CODECS = {
+    "json": (_encode_json_pretty, _decode_json, True),
+    "json-compact": (_encode_json_compact, _decode_json, True),
+    "orjson": (_encode_orjson, _decode_orjson, orjson is not None),
+    "msgpack": (_encode_msgpack, _decode_msgpack, msgpack is not None),
+}
+
+# Preference order for "auto"
+AUTO_ORDER = ("orjson", "msgpack", "json-compact")
+
+
+def available_codecs():
+    """Return the names of the codecs that can be used in this environment."""
+    return [name for name, (encode, decode, available) in CODECS.items() if available]
+
+
+def resolve_codec(name):
+    """Resolve "auto" to a concrete codec name and check that it is available."""
+    if name == "auto":
+        return next(codec for codec in AUTO_ORDER if CODECS[codec][2])
+    if name not in CODECS:
+        raise ValueError(f"Unknown serializer: {name}")
+    if not CODECS[name][2]:
+        raise ValueError(f"Serializer {name} is not installed")
+    return name
+
+
+def encode(obj, codec="auto"):
+    """Serialize obj to bytes with the given codec."""
+    return CODECS[resolve_codec(codec)][0](obj)
+
+
+def decode(raw):
+    """Deserialize bytes written by any codec, detecting the format from the first byte.
+
+    Raises ValueError for data that cannot be decoded.
+    """
+    if raw.startswith(MSGPACK_TAG):
+        if msgpack is None:
+            raise ValueError("Data is in msgpack format but msgpack is not installed")
+        return _decode_msgpack(raw)
+    if orjson is not None:
+        return _decode_orjson(raw)
+    return _decode_json(raw)
+
+
+def dumps_line(obj):
+    """Serialize obj to one line of compact JSON (for journals and database values)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def loads_line(text):
+    """Parse a line written by dumps_line."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
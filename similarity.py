@@ -0,0 +1,353 @@
+"""
+Near-duplicate detection of uploaded solutions with MinHash and LSH.
+
+Each solution is reduced to the set of its token shingles (runs of SHINGLE_SIZE
+tokens, with identifiers, strings and numbers normalized so renaming a
+variable does not hide a copy) and summarized by a MinHash signature of
+NUM_PERM values.  The fraction of equal signature values estimates the
+Jaccard similarity of two solutions.
+
+Signatures are kept in one LSH index per curriculum day, holding the latest
+solution of each learner.  The index splits a signature into BANDS bands of
+ROWS values; solutions sharing any band land in the same bucket, so similar
+solutions are found by looking at a few buckets instead of comparing every
+pair.  Indexes are stored in INDEX_DIR as <curriculum id>/day_<N>.json, so
+day N of one curriculum is never compared with day N of another.
+
+Usage:
+    python similarity.py reindex --dir learners
+    python similarity.py report --day 3 [--curriculum default] [--threshold 0.8]
+"""
+import argparse
+import builtins
+import io
+import json
+import keyword
+import os
+import sys
+import tokenize
+import zlib
+
+import numpy as np
+
+import curriculum
+import storage
+
+INDEX_DIR = os.environ.get("TRACKER_SIMILARITY_DIR", "similarity_index")
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity from which two solutions count as near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+# Multiply-shift hash functions, fixed so signatures are comparable across runs
+_rng = np.random.default_rng(20240521)
+_HASH_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+
+_KEEP_NAMES = set(keyword.kwlist) | set(dir(builtins))
+
+_indexes = {}  # (curriculum id, day) -> (file signature, LSHIndex)
+
+
+# Signatures
+
+def tokens_of(source):
+    """Return the normalized tokens of a solution's source text."""
+    tokens = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.NAME:
+                tokens.append(token.string if token.string in _KEEP_NAMES else "_")
+            elif token.type == tokenize.STRING:
+                tokens.append("S")
+            elif token.type == tokenize.NUMBER:
+                tokens.append("N")
+            elif token.type == tokenize.OP:
+                tokens.append(token.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Broken code is still compared on the tokens read so far
+        pass
+    return tokens
+
+
+def shingle_hashes(tokens):
+    """Return the 32-bit hashes of the token shingles as a uint64 array."""
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    count = max(1, len(tokens) - SHINGLE_SIZE + 1)
+    hashes = {zlib.crc32(" ".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8")) for i in range(count)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def signature(content):
+    """Return the MinHash signature (uint32 array of NUM_PERM values) of a solution."""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    hashes = shingle_hashes(tokens_of(content))
+    if not len(hashes):
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    # One row per hash function, uint64 arithmetic wraps around as intended
+    values = (_HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.uint32)
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+
+# Index
+
+class LSHIndex:
+    """Banded LSH index of MinHash signatures, keyed by learner."""
+
+    def __init__(self):
+        self.entries = {}  # learner -> (digest, signature)
+        self._buckets = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, learner, digest, sig):
+        """Add or replace the solution of a learner."""
+        self.remove(learner)
+        self.entries[learner] = (digest, sig)
+        for band, key in enumerate(_band_keys(sig)):
+            self._buckets[band].setdefault(key, set()).add(learner)
+
+    def remove(self, learner):
+        if learner not in self.entries:
+            return
+        digest, sig = self.entries.pop(learner)
+        for band, key in enumerate(_band_keys(sig)):
+            bucket = self._buckets[band][key]
+            bucket.discard(learner)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def query(self, sig, threshold=DUPLICATE_THRESHOLD, exclude=None):
+        """Return [(learner, digest, similarity)] of solutions similar to sig, most similar first."""
+        candidates = set()
+        for band, key in enumerate(_band_keys(sig)):
+            candidates |= self._buckets[band].get(key, set())
+        candidates.discard(exclude)
+
+        matches = []
+        for learner in candidates:
+            digest, other = self.entries[learner]
+            score = similarity(sig, other)
+            if score >= threshold:
+                matches.append((learner, digest, score))
+        return sorted(matches, key=lambda match: (-match[2], match[0]))
+
+    def pairs(self, threshold=DUPLICATE_THRESHOLD):
+        """Return [(learner_a, learner_b, similarity)] of all near-duplicate pairs."""
+        checked = set()
+        found = []
+        for buckets in self._buckets:
+            for bucket in buckets.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, learner_a in enumerate(members):
+                    for learner_b in members[i + 1:]:
+                        if (learner_a, learner_b) in checked:
+                            continue
+                        checked.add((learner_a, learner_b))
+                        score = similarity(self.entries[learner_a][1], self.entries[learner_b][1])
+                        if score >= threshold:
+                            found.append((learner_a, learner_b, score))
+        return sorted(found, key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+    def clusters(self, threshold=DUPLICATE_THRESHOLD):
+        """Group learners connected by near-duplicate pairs, largest group first."""
+        parent = {}
+
+        def find(learner):
+            while parent[learner] != learner:
+                learner = parent[learner]
+            return learner
+
+        for learner_a, learner_b, score in self.pairs(threshold):
+            parent.setdefault(learner_a, learner_a)
+            parent.setdefault(learner_b, learner_b)
+            parent[find(learner_a)] = find(learner_b)
+        groups = {}
+        for learner in parent:
+            groups.setdefault(find(learner), []).append(learner)
+        return sorted((sorted(group) for group in groups.values()), key=lambda group: (-len(group), group))
+
+    def to_json(self):
+        return {
+            "num_perm": NUM_PERM,
+            "entries": {learner: {"digest": digest, "signature": sig.tolist()}
+                        for learner, (digest, sig) in self.entries.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        index = cls()
+        if data.get("num_perm") != NUM_PERM:
+            # Signatures of another size cannot be compared, start over
+            return index
+        for learner, entry in data.get("entries", {}).items():
+            index.add(learner, entry["digest"], np.array(entry["signature"], dtype=np.uint32))
+        return index
+
+
+def _band_keys(sig):
+    return [band.tobytes() for band in sig.reshape(BANDS, ROWS)]
+
+
+# Stored indexes
+
+def load_index(day_number, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Return the index of a day, reloading it only when its file changed."""
+    path = _index_path(day_number, curriculum_id)
+    file_sig = storage.file_signature(path)
+    cached = _indexes.get((curriculum_id, int(day_number)))
+    if cached is not None and cached[0] == file_sig:
+        return cached[1]
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = LSHIndex.from_json(json.load(f))
+    except FileNotFoundError:
+        index = LSHIndex()
+    except ValueError as e:
+        print(f"Error loading similarity index: {e}")
+        index = LSHIndex()
+    _indexes[(curriculum_id, int(day_number))] = (file_sig, index)
+    return index
+
+
+def save_index(day_number, index, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    path = _index_path(day_number, curriculum_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    storage.write_file_atomically(path, json.dumps(index.to_json()))
+    _indexes[(curriculum_id, int(day_number))] = (storage.file_signature(path), index)
+
+
+def index_solution(day_number, learner, digest, load_content, curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Add a learner's latest solution for a day to the stored index.
+
+    load_content() returns the solution bytes and is only called if the
+    solution is not indexed yet.  A solution that is not stored (None) is
+    not indexed.
+    """
+    with _index_lock(day_number, curriculum_id):
+        index = load_index(day_number, curriculum_id)
+        current = index.entries.get(learner)
+        if current is not None and current[0] == digest:
+            return
+        content = load_content()
+        if content is None:
+            return
+        index.add(learner, digest, signature(content))
+        save_index(day_number, index, curriculum_id)
+
+
+def find_similar(day_number, learner, digest, load_content, threshold=DUPLICATE_THRESHOLD,
+                 curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Return [(learner, digest, similarity)] of other learners' solutions similar to a solution."""
+    index = load_index(day_number, curriculum_id)
+    current = index.entries.get(learner)
+    if current is not None and current[0] == digest:
+        sig = current[1]
+    else:
+        content = load_content()
+        if content is None:
+            return []
+        sig = signature(content)
+    return index.query(sig, threshold, exclude=learner)
+
+
+def indexed_days(curriculum_id=curriculum.DEFAULT_CURRICULUM_ID):
+    """Return the days of a curriculum that have a stored index."""
+    try:
+        names = os.listdir(_index_dir(curriculum_id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[len("day_"):-len(".json")]) for name in names
+                  if name.startswith("day_") and name.endswith(".json"))
+
+
+def _index_dir(curriculum_id):
+    if not curriculum_id or os.sep in curriculum_id or curriculum_id.startswith("."):
+        raise ValueError(f"Invalid curriculum id: {curriculum_id!r}")
+    return os.path.join(INDEX_DIR, curriculum_id)
+
+
+def _index_path(day_number, curriculum_id):
+    return os.path.join(_index_dir(curriculum_id), f"day_{int(day_number)}.json")
+
+
+def _index_lock(day_number, curriculum_id):
+    os.makedirs(_index_dir(curriculum_id), exist_ok=True)
+    return storage.FileLock(_index_path(day_number, curriculum_id) + ".lock")
+
+
+def reindex_cohort(learners):
+    """Rebuild the index of every curriculum day from the latest uploads of (learner_id, storage) pairs.
+
+    Solutions shared by several learners are hashed once.  Returns the number
+    of solutions indexed.
+    """
+    indexes = {}
+    signatures = {}
+    count = 0
+    for learner_id, learner_storage in learners:
+        data = learner_storage.load() or {}
+        curriculum_id = curriculum.enrolled_curriculum_id(data)
+        for day, upload in data.get("uploads", {}).items():
+            if not day.isdigit() or not isinstance(upload, dict) or not upload.get("sha256"):
+                continue
+            digest = upload["sha256"]
+            if digest not in signatures:
+                content = learner_storage.get_blob(digest)
+                if content is None:
+                    continue
+                signatures[digest] = signature(content)
+            indexes.setdefault((curriculum_id, int(day)), LSHIndex()).add(learner_id, digest, signatures[digest])
+            count += 1
+
+    for (curriculum_id, day), index in indexes.items():
+        with _index_lock(day, curriculum_id):
+            save_index(day, index, curriculum_id)
+    return count
+
+
+def main(argv=None):
+    # Imported here, the app only needs the index functions
+    import bulk_io
+
+    parser = argparse.ArgumentParser(description="Near-duplicate detection of uploaded solutions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    reindex = subparsers.add_parser("reindex", help="Rebuild the indexes from a cohort directory")
+    reindex.add_argument("--dir", default=".", help="Cohort directory with one <learner>.json per learner")
+    report = subparsers.add_parser("report", help="List groups of near-duplicate solutions")
+    report.add_argument("--day", type=int, help="Day to report on (default: every indexed day)")
+    report.add_argument("--curriculum", default=curriculum.DEFAULT_CURRICULUM_ID, help="Curriculum id of the days")
+    report.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        count = reindex_cohort(bulk_io.discover_learners(args.dir))
+        print(f"Indexed {count} solutions in {INDEX_DIR}")
+        return 0
+
+    for day in [args.day] if args.day else indexed_days(args.curriculum):
+        index = load_index(day, args.curriculum)
+        clusters = index.clusters(args.threshold)
+        print(f"Day {day}: {len(index)} solutions, {len(clusters)} groups of near-duplicates")
+        for group in clusters:
+            print(f"  {', '.join(group)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Offline snapshots of the curriculum resources.
+
+The pages linked from the curriculum are fetched with a bounded pool of
+threads, their main text is extracted with trafilatura, and the result is
+stored in CACHE_DIR as one <sha256 of the URL>.json file per page.  A stored
+snapshot keeps the ETag and Last-Modified headers of its response, so a
+refresh sends a conditional request and a page that did not change costs a
+304 instead of a download and another extraction.
+
+The app only reads the stored snapshots, it never waits on the network.
+
+Usage (snapshot every resource of every registered curriculum):
+    python snapshots.py [--workers 8] [--max-age 86400]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+try:
+    import trafilatura
+except ImportError:
+    # Also raised when trafilatura's own dependencies are broken
+    trafilatura = None
+
+import curriculum as curr
+import storage
+
+CACHE_DIR = os.environ.get("TRACKER_RESOURCE_DIR", "resource_cache")
+
+# Concurrent fetches of a refresh
+MAX_WORKERS = int(os.environ.get("TRACKER_RESOURCE_WORKERS", 8))
+
+FETCH_TIMEOUT = 15
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+USER_AGENT = "python-learning-tracker/1.0 (resource snapshots)"
+
+# Characters of a snapshot shown in the day tracker
+EXCERPT_CHARS = 600
+
+_snapshots = {}  # url -> (file signature, snapshot)
+_lock = threading.Lock()
+
+
+# Fetching and extraction
+
+def http_fetch(url, headers):
+    """Fetch a URL, returning (status, response headers, body bytes).
+
+    A 304 Not Modified is returned like any other status.  Network errors
+    raise OSError.
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **headers})
+    try:
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            return response.status, dict(response.headers), response.read(MAX_PAGE_BYTES)
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers or {}), b""
+
+
+class _TextExtractor(HTMLParser):
+    """Visible text of a page without trafilatura: skips scripts, styles and page chrome."""
+
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg"}
+    BLOCKS = {"p", "div", "li", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "br", "tr", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.title = ""
+        self._skipping = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skipping:
+            self.parts.append(data)
+
+
+def extract(html):
+    """Extract (title, main text) from an HTML page."""
+    if trafilatura is not None:
+        text = trafilatura.extract(html, include_comments=False, include_tables=False) or ""
+        metadata = trafilatura.extract_metadata(html)
+        title = metadata.title if metadata is not None and metadata.title else ""
+        return title, text
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return " ".join(parser.title.split()), "\n".join(line for line in lines if line)
+
+
+def _decode(body, headers):
+    match = re.search(r"charset=([\w-]+)", _header(headers, "Content-Type") or "")
+    try:
+        return body.decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _header(headers, name):
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+# Snapshots
+
+def get_snapshot(url):
+    """Return the stored snapshot of a URL, or None if it was never fetched.
+
+    A snapshot has url, title, text, etag, last_modified, fetched_at (time of
+    the last download) and checked_at (time of the last revalidation).
+    """
+    path = _snapshot_path(url)
+    file_sig = storage.file_signature(path)
+    with _lock:
+        cached = _snapshots.get(url)
+    if cached is not None and cached[0] == file_sig:
+        return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Error reading resource snapshot: {e}")
+        return None
+    with _lock:
+        _snapshots[url] = (file_sig, snapshot)
+    return snapshot
+
+
+def get_excerpt(url, chars=EXCERPT_CHARS):
+    """Return the beginning of a page's stored text, cut at a word, or None."""
+    snapshot = get_snapshot(url)
+    if snapshot is None or not snapshot.get("text"):
+        return None
+    text = snapshot["text"]
+    if len(text) <= chars:
+        return text
+    return text[:chars].rsplit(" ", 1)[0] + " ..."
+
+
+def snapshot_url(url, fetch=http_fetch, max_age=0):
+    """Fetch a URL into its snapshot, revalidating an existing one.
+
+    fetch(url, headers) returns (status, headers, body) and defaults to
+    http_fetch.  A snapshot checked less than max_age seconds ago is not
+    fetched at all.  Returns "fetched", "not modified", "fresh" or "failed".
+    """
+    previous = get_snapshot(url)
+    now = time.time()
+    if previous is not None and now - previous.get("checked_at", 0) < max_age:
+        return "fresh"
+
+    headers = {}
+    if previous is not None:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    try:
+        status, response_headers, body = fetch(url, headers)
+    except OSError as e:
+        print(f"Error fetching {url}: {e}")
+        return "failed"
+
+    if status == 304 and previous is not None:
+        _write_snapshot(url, dict(previous, checked_at=now))
+        return "not modified"
+    if status != 200:
+        print(f"Error fetching {url}: HTTP {status}")
+        return "failed"
+
+    try:
+        title, text = extract(_decode(body, response_headers))
+    except Exception as e:
+        print(f"Error extracting {url}: {e}")
+        return "failed"
+    _write_snapshot(url, {
+        "url": url,
+        "title": title,
+        "text": text,
+        "etag": _header(response_headers, "ETag"),
+        "last_modified": _header(response_headers, "Last-Modified"),
+        "fetched_at": now,
+        "checked_at": now,
+    })
+    return "fetched"
+
+
+def refresh(urls, fetch=http_fetch, max_workers=MAX_WORKERS, max_age=0):
+    """Snapshot many URLs concurrently, at most max_workers at a time.
+
+    Returns the number of URLs per outcome of snapshot_url.
+    """
+    urls = list(dict.fromkeys(urls))
+    outcomes = {}
+    if not urls:
+        return outcomes
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for outcome in executor.map(lambda url: snapshot_url(url, fetch, max_age), urls):
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return outcomes
+
+
+def curriculum_urls(curricula=None):
+    """Return the resource URLs of curricula (default: every registered one)."""
+    if curricula is None:
+        curricula = curr.get_curricula().values()
+    return [resource["url"] for curriculum in curricula for day in curriculum.days
+            for resource in day["resources"] if resource.get("url")]
+
+
+def _write_snapshot(url, snapshot):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _snapshot_path(url)
+    storage.write_file_atomically(path, json.dumps(snapshot))
+    with _lock:
+        _snapshots[url] = (storage.file_signature(path), snapshot)
+
+
+def _snapshot_path(url):
+    return os.path.join(CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot the curriculum resources for offline reading.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent fetches")
+    parser.add_argument("--max-age", type=float, default=0,
+                        help="Skip snapshots checked less than this many seconds ago")
+    args = parser.parse_args(argv)
+
+    urls = curriculum_urls()
+    outcomes = refresh(urls, max_workers=args.workers, max_age=args.max_age)
+    summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+    print(f"{len(set(urls))} resources: {summary or 'nothing to do'}, snapshots in {CACHE_DIR}")
+    return 0 if not outcomes.get("failed") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
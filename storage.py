@@ -0,0 +1,821 @@
+"""
+Storage backends for the Python learning tracker data.
+
+The tracker document is a dict of sections ("progress", "time_spent", "uploads",
+...).  Record sections map a day number (as a string) to a value, settings
+sections such as "email_settings" are stored as a single value.  A change to
+the document is described as a ``(section, key, value)`` tuple, where ``key``
+is ``None`` for a whole-section value and ``value`` is ``None`` for a delete.
+
+Notes are large and rarely read, so they are not part of the document.  Each
+backend keeps them in a separate store with one blob per day, reached through
+get_note/put_note/note_days.  Uploaded solution files go to a content-addressed
+store keyed by their SHA-256 (put_blob/get_blob), so identical files are kept
+once.  Blobs are compressed above a size threshold, see compressors.py.
+
+Every committed write bumps the integer ``"version"`` of the document.  Writes
+can pass the version they were based on and fail with VersionConflict if
+another process committed in the meantime (compare-and-swap).
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import compressors
+import serializers
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on platforms without fcntl (Windows)
+    fcntl = None
+
+# Sections whose values are keyed by day number
+RECORD_SECTIONS = ("progress", "notes", "uploads", "time_spent", "resources_used")
+
+# Fold the JSON journal into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 64 * 1024
+
+# Number of previous snapshots kept as <path>.bak.1 (newest) to <path>.bak.N
+BACKUP_GENERATIONS = 3
+
+# Codec for JSON backend snapshots, see serializers.CODECS.  Any format is
+# detected on load, so this can be changed without converting existing files.
+SNAPSHOT_FORMAT = os.environ.get("TRACKER_SNAPSHOT_FORMAT", "auto")
+
+
+def is_valid_document(data):
+    """Quick structural check of a loaded document."""
+    if not isinstance(data, dict):
+        return False
+    return all(isinstance(data[section], dict) for section in RECORD_SECTIONS if section in data)
+
+
+def file_signature(*paths):
+    """Cheap change token for a set of files: (mtime_ns, size, inode) of each.
+
+    Missing files contribute None, so creating or removing a file also changes
+    the signature.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(signature)
+
+
+def write_file_atomically(path, content):
+    """Write text or bytes to path so readers see either the old or the new file, never a mix."""
+    # Unique per writer so concurrent processes never share a temp file
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if isinstance(content, bytes):
+        f = open(temp_path, 'wb')
+    else:
+        f = open(temp_path, 'w', encoding='utf-8')
+    with f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    _fsync_directory(path)
+
+
+def _fsync_directory(path):
+    """Make a rename durable by syncing the containing directory."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_blob(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _hash_chunks(chunks, sha):
+    """Pass chunks through, feeding them to a hashlib object on the way."""
+    for chunk in chunks:
+        sha.update(chunk)
+        yield chunk
+
+
+def is_digest(digest):
+    """Check that digest is a lowercase SHA-256 hex digest."""
+    return isinstance(digest, str) and len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+def _write_blob(path, stored):
+    """Write a blob file atomically, None removes it."""
+    if stored is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_file_atomically(path, stored)
+
+
+class VersionConflict(Exception):
+    """Raised when a write was based on an older version than the stored one."""
+
+    def __init__(self, current_version):
+        super().__init__(f"Stored data is at version {current_version}")
+        self.current_version = current_version
+
+
+class FileLock:
+    """Reentrant lock shared by the threads of this process and other processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except Exception:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+def get_value(data, section, key):
+    """Read the value a (section, key) change refers to, or None if missing."""
+    if key is None:
+        return data.get(section)
+    return data.get(section, {}).get(str(key))
+
+
+def apply_change(data, section, key, value):
+    """Apply a single (section, key, value) change to a document in place."""
+    if key is None:
+        if value is None:
+            data.pop(section, None)
+        else:
+            data[section] = value
+    elif value is None:
+        data.get(section, {}).pop(str(key), None)
+    else:
+        data.setdefault(section, {})[str(key)] = value
+
+
+class JsonStorage:
+    """Keeps the document as a snapshot file plus an append-only JSON journal.
+
+    The snapshot is written with the SNAPSHOT_FORMAT codec; JSON snapshots
+    from earlier versions are still read.
+
+    Record changes are appended to ``<path>.journal`` as one small JSON line
+    each, so the cost of a write depends on the size of the change rather than
+    the size of the document.  Once the journal grows past
+    ``JOURNAL_COMPACT_BYTES`` a background thread folds it into the snapshot.
+
+    Journal entries are absolute assignments, so replaying an entry twice is
+    harmless.  That keeps compaction crash-safe: the journal is rotated to
+    ``<path>.journal.old``, folded into a new snapshot, and only then removed.
+
+    Snapshots are written to a temporary file, fsynced and renamed into place,
+    and the previous ``BACKUP_GENERATIONS`` snapshots are kept as ``.bak.N``
+    files.  If the snapshot fails validation on load, the newest valid backup
+    is used instead.
+
+    Appends and compaction hold an exclusive lock on ``<path>.lock`` so several
+    processes can share the files.  Every journal line carries the version it
+    committed, which makes reading the current version a read of the last line.
+    """
+
+    name = "json"
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.old_journal_path = path + ".journal.old"
+        self.notes_dir = os.path.splitext(path)[0] + "_notes"
+        self.blobs_dir = os.path.splitext(path)[0] + "_blobs"
+        self._lock = FileLock(path + ".lock")
+        self._compacting = False
+        self._snapshot_version = (None, 0)
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def signature(self):
+        """Change token covering the snapshot and both journals."""
+        return file_signature(self.path, self.old_journal_path, self.journal_path)
+
+    def load(self):
+        """Return the snapshot with the journal replayed on top of it.
+
+        Returns None if nothing has been saved yet.  Holds the lock so a
+        compaction cannot move the journal between the reads.
+        """
+        with self._lock:
+            data = self._read_snapshot()
+            found = data is not None
+            data = data or {}
+            for journal in (self.old_journal_path, self.journal_path):
+                found = self._replay(journal, data) or found
+        return data if found else None
+
+    def current_version(self):
+        """Return the version of the last committed write."""
+        with self._lock:
+            for journal in (self.journal_path, self.old_journal_path):
+                try:
+                    entry = _read_last_entry(journal)
+                except ValueError:
+                    # Torn or legacy last line, fall back to a full replay
+                    return (self.load() or {}).get("version", 0)
+                if entry is not None:
+                    return entry.get("n", 0)
+
+            # No journal: the version is the one stored in the snapshot
+            signature = file_signature(self.path)
+            if self._snapshot_version[0] != signature:
+                self._snapshot_version = (signature, (self._read_snapshot() or {}).get("version", 0))
+            return self._snapshot_version[1]
+
+    def save(self, data, expected_version=None):
+        """Record a whole-document write as a single journal entry.
+
+        Returns the new version.
+        """
+        return self._append([{"doc": data}], expected_version)
+
+    def put_records(self, changes, expected_version=None, notes=None):
+        """Append a list of (section, key, value) changes to the journal.
+
+        Raises VersionConflict if expected_version is given and another write
+        was committed since.  Returns the new version.  Notes ({day: text})
+        are files of their own, they are written once the journal entry is.
+        """
+        entries = [{"s": section, "k": key, "v": value} for section, key, value in changes]
+        version = self._append(entries, expected_version)
+        for day, text in (notes or {}).items():
+            self.put_note(day, text)
+        return version
+
+    def compact(self):
+        """Fold the journal into the snapshot file."""
+        with self._lock:
+            # A leftover rotated journal means an earlier compaction was
+            # interrupted, fold that one first
+            if not os.path.exists(self.old_journal_path):
+                if not os.path.exists(self.journal_path):
+                    return
+                os.replace(self.journal_path, self.old_journal_path)
+
+            data = self._read_snapshot() or {}
+            self._replay(self.old_journal_path, data)
+            self._write_snapshot(data)
+            os.remove(self.old_journal_path)
+
+    def get_note(self, day):
+        """Return the note stored for a day, or None."""
+        stored = _read_blob(self._note_path(day))
+        return None if stored is None else compressors.decompress_text(stored)
+
+    def put_note(self, day, text):
+        """Store the note for a day, an empty note removes it."""
+        _write_blob(self._note_path(day), compressors.compress_text(text) if text else None)
+
+    def notes_signature(self):
+        """Change token of the notes, notes are written by renaming into their directory."""
+        return file_signature(self.notes_dir)
+
+    def note_days(self):
+        """Return the days that have a note, as strings."""
+        try:
+            names = os.listdir(self.notes_dir)
+        except FileNotFoundError:
+            return []
+        return [name[len("day_"):-len(".txt")] for name in names
+                if name.startswith("day_") and name.endswith(".txt")]
+
+    def get_blob(self, digest):
+        """Return the content (bytes) stored under a SHA-256 hex digest, or None."""
+        stored = _read_blob(self._blob_path(digest))
+        return None if stored is None else compressors.decompress(stored)
+
+    def has_blob(self, digest):
+        """Check whether content is stored under a SHA-256 hex digest."""
+        return os.path.exists(self._blob_path(digest))
+
+    def put_blob(self, content, digest=None):
+        """Store content (bytes) by its SHA-256 and return the hex digest.
+
+        Content that is already stored is not written again.
+        """
+        digest = digest or hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            _write_blob(path, compressors.compress(content))
+        return digest
+
+    def put_blob_stream(self, chunks):
+        """Store an iterable of byte chunks by SHA-256 and return the hex digest.
+
+        The content is hashed and compressed chunk by chunk into a temporary
+        file, which is renamed into place once the digest is known.  If the
+        iterable raises, nothing is stored.
+        """
+        sha = hashlib.sha256()
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        temp_path = os.path.join(self.blobs_dir, f"incoming.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                for stored in compressors.compress_chunks(_hash_chunks(chunks, sha)):
+                    f.write(stored)
+                f.flush()
+                os.fsync(f.fileno())
+            digest = sha.hexdigest()
+            path = self._blob_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                _fsync_directory(path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return digest
+
+    def _note_path(self, day):
+        return os.path.join(self.notes_dir, f"day_{int(day)}.txt")
+
+    def blob_digests(self):
+        """Return the digests of all stored blobs."""
+        digests = []
+        try:
+            prefixes = os.listdir(self.blobs_dir)
+        except FileNotFoundError:
+            return digests
+        for prefix in prefixes:
+            prefix_dir = os.path.join(self.blobs_dir, prefix)
+            if os.path.isdir(prefix_dir):
+                digests.extend(name for name in os.listdir(prefix_dir) if is_digest(name))
+        return digests
+
+    def _blob_path(self, digest):
+        if not is_digest(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        # Fan out by the first byte to keep directories small
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def close(self):
+        pass
+
+    def _append(self, entries, expected_version=None):
+        with self._lock:
+            version = self.current_version()
+            if expected_version is not None and expected_version != version:
+                raise VersionConflict(version)
+            version += 1
+            for entry in entries:
+                entry["n"] = version
+            lines = "".join(serializers.dumps_line(entry) + "\n" for entry in entries)
+
+            with open(self.journal_path, 'ab+') as f:
+                # Start on a fresh line if the last append was torn
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        lines = "\n" + lines
+                f.write(lines.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                journal_size = f.tell()
+            start_compaction = journal_size >= JOURNAL_COMPACT_BYTES and not self._compacting
+            if start_compaction:
+                self._compacting = True
+
+        if start_compaction:
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+        return version
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+        finally:
+            self._compacting = False
+
+    def backup_path(self, generation):
+        return f"{self.path}.bak.{generation}"
+
+    def _read_snapshot(self):
+        """Return the newest snapshot generation that passes validation."""
+        candidates = [self.path] + [self.backup_path(n) for n in range(1, BACKUP_GENERATIONS + 1)]
+        for candidate in candidates:
+            try:
+                with open(candidate, 'rb') as f:
+                    data = serializers.decode(f.read())
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable data file {candidate}: {e}")
+                continue
+            if not is_valid_document(data):
+                print(f"Skipping invalid data file {candidate}")
+                continue
+            if candidate != self.path:
+                print(f"Recovered data from backup {candidate}")
+            return data
+
+        if os.path.exists(self.path):
+            # Nothing usable: keep the damaged file for inspection rather than
+            # overwriting it with fresh data
+            corrupt_path = f"{self.path}.corrupt-{int(time.time())}"
+            os.replace(self.path, corrupt_path)
+            print(f"Data file is corrupted, moved it to {corrupt_path}")
+        return None
+
+    def _write_snapshot(self, data):
+        self._rotate_backups()
+        write_file_atomically(self.path, serializers.encode(data, SNAPSHOT_FORMAT))
+
+    def _rotate_backups(self):
+        """Shift .bak.N generations up by one and copy the current snapshot to .bak.1."""
+        if BACKUP_GENERATIONS < 1 or not os.path.exists(self.path):
+            return
+        for generation in range(BACKUP_GENERATIONS - 1, 0, -1):
+            if os.path.exists(self.backup_path(generation)):
+                os.replace(self.backup_path(generation), self.backup_path(generation + 1))
+        # A hard link keeps the current snapshot in place until the new one replaces it
+        try:
+            os.link(self.path, self.backup_path(1))
+        except OSError:
+            shutil.copyfile(self.path, self.backup_path(1))
+
+    def _replay(self, journal_path, data):
+        """Apply the entries of a journal file to data in place."""
+        try:
+            with open(journal_path, 'r') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return False
+
+        for line in lines:
+            try:
+                entry = serializers.loads_line(line)
+            except ValueError:
+                # A torn final line from an interrupted append
+                continue
+            if "doc" in entry:
+                data.clear()
+                data.update(entry["doc"])
+            else:
+                apply_change(data, entry["s"], entry["k"], entry["v"])
+            if "n" in entry:
+                data["version"] = entry["n"]
+        return True
+
+
+def _read_last_entry(path):
+    """Parse the last line of a journal without reading the whole file.
+
+    Returns None for a missing or empty journal.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or position == 0:
+                return serializers.loads_line(lines[-1]) if lines[-1] else None
+    return None
+
+
+class SQLiteStorage:
+    """Keeps one row per record in a SQLite database in WAL mode.
+
+    Each change is a single-row upsert, so marking a day complete costs one
+    small write no matter how large the notes are.  The document version is
+    kept in the meta table and checked inside the write transaction, which
+    SQLite already locks across processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def signature(self):
+        """Change token covering the database and its write-ahead log."""
+        return file_signature(self.path, self.path + "-wal")
+
+    def _connect(self):
+        if self._conn is None:
+            # Streamlit runs scripts on several threads, access is serialized by _lock
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " section TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (section, key))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # Bodies are stored as written by compressors (older rows may be TEXT)
+            conn.execute("CREATE TABLE IF NOT EXISTS notes (day TEXT PRIMARY KEY, body TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, body BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def load(self):
+        """Return the stored document, or None if the database is empty."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                rows = conn.execute("SELECT section, key, value FROM records").fetchall()
+                version = self._version(conn)
+            finally:
+                conn.execute("COMMIT")
+        if not rows:
+            return None
+
+        data = {}
+        for section, key, value in rows:
+            if key == "":
+                data.setdefault(section, serializers.loads_line(value))
+            else:
+                data.setdefault(section, {})[key] = serializers.loads_line(value)
+        data["version"] = version
+        return data
+
+    def current_version(self):
+        """Return the version of the last committed write."""
+        with self._lock:
+            return self._version(self._connect())
+
+    def save(self, data, expected_version=None):
+        """Replace the whole document in a single transaction.
+
+        Returns the new version.
+        """
+        changes = [(section, None, value) for section, value in data.items() if section != "version"]
+        return self._commit(changes, expected_version, replace=True)
+
+    def put_records(self, changes, expected_version=None, notes=None):
+        """Apply a list of (section, key, value) changes in one transaction.
+
+        Raises VersionConflict if expected_version is given and another write
+        was committed since.  Returns the new version.  Notes ({day: text})
+        are written in the same transaction.
+        """
+        return self._commit(changes, expected_version, notes=notes)
+
+    def _commit(self, changes, expected_version, replace=False, notes=None):
+        with self._lock:
+            conn = self._connect()
+            # IMMEDIATE takes the database write lock before the version check
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._version(conn)
+                if expected_version is not None and expected_version != version:
+                    raise VersionConflict(version)
+                if replace:
+                    conn.execute("DELETE FROM records")
+                self._write(conn, changes)
+                for day, text in (notes or {}).items():
+                    self._write_note(conn, day, text)
+                conn.execute(
+                    "INSERT INTO meta (name, value) VALUES ('version', ?) "
+                    "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    (version + 1,)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version + 1
+
+    def _version(self, conn):
+        row = conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def _write(self, conn, changes):
+        for section, key, value in changes:
+            if key is None and section in RECORD_SECTIONS:
+                # A whole record section is stored as one row per record, with
+                # an empty-key placeholder so an empty section survives a reload
+                conn.execute("DELETE FROM records WHERE section = ?", (section,))
+                if value:
+                    for record_key, record in value.items():
+                        self._upsert(conn, section, str(record_key), record)
+                elif value is not None:
+                    self._upsert(conn, section, "", {})
+                continue
+
+            key = "" if key is None else str(key)
+            if value is None:
+                conn.execute("DELETE FROM records WHERE section = ? AND key = ?", (section, key))
+                continue
+            if key:
+                # A record replaces the empty-section placeholder
+                conn.execute("DELETE FROM records WHERE section = ? AND key = ''", (section,))
+            self._upsert(conn, section, key, value)
+
+    def _upsert(self, conn, section, key, value):
+        conn.execute(
+            "INSERT INTO records (section, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (section, key) DO UPDATE SET value = excluded.value",
+            (section, key, serializers.dumps_line(value))
+        )
+
+    def get_note(self, day):
+        """Return the note stored for a day, or None."""
+        with self._lock:
+            row = self._connect().execute("SELECT body FROM notes WHERE day = ?", (str(day),)).fetchone()
+        return compressors.decompress_text(row[0]) if row else None
+
+    def put_note(self, day, text):
+        """Store the note for a day, an empty note removes it."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_note(conn, day, text)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write_note(self, conn, day, text):
+        conn.execute(
+            "INSERT INTO meta (name, value) VALUES ('notes_version', 1) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + 1"
+        )
+        if text:
+            conn.execute(
+                "INSERT INTO notes (day, body) VALUES (?, ?) "
+                "ON CONFLICT (day) DO UPDATE SET body = excluded.body",
+                (str(day), compressors.compress_text(text))
+            )
+        else:
+            conn.execute("DELETE FROM notes WHERE day = ?", (str(day),))
+
+    def notes_signature(self):
+        """Change token of the notes, a counter bumped by every note write."""
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE name = 'notes_version'").fetchone()
+        return row[0] if row else 0
+
+    def note_days(self):
+        """Return the days that have a note, as strings."""
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT day FROM notes")]
+
+    def get_blob(self, digest):
+        """Return the content (bytes) stored under a SHA-256 hex digest, or None."""
+        with self._lock:
+            row = self._connect().execute("SELECT body FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return compressors.decompress(row[0]) if row else None
+
+    def has_blob(self, digest):
+        """Check whether content is stored under a SHA-256 hex digest."""
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def blob_digests(self):
+        """Return the digests of all stored blobs."""
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT digest FROM blobs")]
+
+    def put_blob(self, content, digest=None):
+        """Store content (bytes) by its SHA-256 and return the hex digest.
+
+        Content that is already stored is not written again.
+        """
+        digest = digest or hashlib.sha256(content).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            if conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO blobs (digest, body) VALUES (?, ?)",
+                    (digest, compressors.compress(content))
+                )
+        return digest
+
+    def put_blob_stream(self, chunks):
+        """Store an iterable of byte chunks by SHA-256 and return the hex digest.
+
+        Chunks are hashed and compressed as they arrive, only the compressed
+        body is held for the insert.
+        """
+        sha = hashlib.sha256()
+        stored = b"".join(compressors.compress_chunks(_hash_chunks(chunks, sha)))
+        digest = sha.hexdigest()
+        with self._lock:
+            self._connect().execute("INSERT OR IGNORE INTO blobs (digest, body) VALUES (?, ?)", (digest, stored))
+        return digest
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_storage(backend, json_path, db_path):
+    """Create the storage backend with the given name ("json" or "sqlite")."""
+    if backend == "json":
+        return JsonStorage(json_path)
+    if backend == "sqlite":
+        storage = SQLiteStorage(db_path)
+        if not storage.exists() and os.path.exists(json_path):
+            migrate_json_to_sqlite(json_path, db_path)
+        return storage
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """Copy an existing JSON progress file into a SQLite database.
+
+    Notes and uploaded files are copied along.  Returns the number of record
+    rows written.  The JSON files are left untouched so the migration can be
+    re-run or rolled back.
+    """
+    source = JsonStorage(json_path)
+    data = source.load()
+    if data is None:
+        return 0
+
+    storage = SQLiteStorage(db_path)
+    try:
+        for day in source.note_days():
+            storage.put_note(day, source.get_note(day))
+        for digest in source.blob_digests():
+            storage.put_blob(source.get_blob(digest), digest)
+        storage.save(data)
+        with storage._lock:
+            conn = storage._connect()
+            count = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            # Carry the JSON version over so versions stay monotonic
+            conn.execute("UPDATE meta SET value = ? WHERE name = 'version'", (data.get("version", 0) + 1,))
+    finally:
+        storage.close()
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "python_learning_progress.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "python_learning_progress.db"
+    rows = migrate_json_to_sqlite(source, target)
+    print(f"Migrated {rows} records from {source} to {target}")
@@ -0,0 +1,93 @@
+"""
+Tests of the grading sandbox with solutions that try to leave it.
+
+    python -m unittest test_grading
+
+The sandbox needs root on Linux, elsewhere only the refusal is tested.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import grading
+
+CAN_SANDBOX = sys.platform.startswith("linux") and hasattr(os, "geteuid") and os.geteuid() == 0
+
+
+class SandboxTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.previous_environ = dict(os.environ)
+        os.environ["SECRET_TOKEN"] = "s3cret"
+        cls.pool = grading.WorkerPool(1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        os.environ.clear()
+        os.environ.update(cls.previous_environ)
+
+    def run_solution(self, source, check="True"):
+        return self.pool.run(source, [{"name": "case", "check": check}])[0]
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_runs_a_solution(self):
+        result = self.run_solution("import math\ndef area(r):\n    return math.pi * r * r", "round(area(1), 2) == 3.14")
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_environment_is_empty(self):
+        result = self.run_solution("import os\ntoken = os.environ.get('SECRET_TOKEN')", "token is None")
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_writes_stay_in_scratch(self):
+        outside = tempfile.mkdtemp()
+        try:
+            os.chmod(outside, 0o777)
+            path = os.path.join(outside, "escaped.txt")
+            result = self.run_solution(f"open({path!r}, 'w').write('x')\nopen('scratch.txt', 'w').write('x')")
+            self.assertFalse(os.path.exists(path))
+            self.assertFalse(result["passed"])
+        finally:
+            shutil.rmtree(outside)
+        result = self.run_solution("open('scratch.txt', 'w').write('x')")
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_runs_unprivileged(self):
+        result = self.run_solution("import os\nuid = os.getuid()", "uid != 0")
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_cannot_fork(self):
+        result = self.run_solution("import os\nos.fork()")
+        self.assertFalse(result["passed"])
+        self.assertIn("BlockingIOError", result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_has_no_network(self):
+        # Only the loopback interface exists in the network namespace
+        result = self.run_solution(
+            "interfaces = [line.split(':')[0].strip() for line in open('/proc/self/net/dev').readlines()[2:]]",
+            "interfaces == ['lo']"
+        )
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipUnless(CAN_SANDBOX, "the sandbox needs root on Linux")
+    def test_only_stdio_is_open(self):
+        result = self.run_solution("import os\nfds = sorted(int(fd) for fd in os.listdir('/proc/self/fd'))", "max(fds) <= 4")
+        self.assertTrue(result["passed"], result["reason"])
+
+    @unittest.skipIf(CAN_SANDBOX, "the sandbox is available")
+    def test_refuses_without_sandbox(self):
+        result = self.run_solution("x = 1")
+        self.assertFalse(result["passed"])
+        self.assertTrue(result["reason"].startswith(grading.GRADER_ERROR))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests of snapshots.py against pages served by http.server on localhost.
+
+    python -m unittest test_snapshots
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import snapshots
+
+PAGE = (b"<html><head><title>For loops</title><script>var menu = 1;</script></head>"
+        b"<body><nav>Home</nav><article><h1>For loops</h1>"
+        b"<p>A for loop runs its body once per item of a sequence &amp; stops at the end.</p>"
+        b"</article><footer>About</footer></body></html>")
+ETAG = '"v1"'
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves PAGE with an ETag, 304 when it matches, 404 for /missing."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get("If-None-Match")))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            # Long enough for requests of a refresh to overlap
+            time.sleep(0.05)
+            if self.path == "/missing":
+                self.send_response(404)
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", str(len(PAGE)))
+                self.end_headers()
+                self.wfile.write(PAGE)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.previous_cache_dir = snapshots.CACHE_DIR
+        snapshots.CACHE_DIR = self.cache_dir
+        snapshots._snapshots.clear()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = 0
+        self.server.max_active = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        snapshots.CACHE_DIR = self.previous_cache_dir
+        snapshots._snapshots.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_revalidates_with_etag(self):
+        url = f"{self.base_url}/loops"
+        self.assertEqual(snapshots.snapshot_url(url), "fetched")
+        snapshot = snapshots.get_snapshot(url)
+        self.assertEqual(snapshot["title"], "For loops")
+        self.assertEqual(snapshot["etag"], ETAG)
+        self.assertIn("runs its body", snapshots.get_excerpt(url))
+        self.assertNotIn("menu", snapshot["text"])
+
+        self.assertEqual(snapshots.snapshot_url(url), "not modified")
+        self.assertEqual(self.server.requests, [("/loops", None), ("/loops", ETAG)])
+        self.assertEqual(snapshots.get_snapshot(url)["text"], snapshot["text"])
+
+    def test_fresh_snapshot_is_not_fetched(self):
+        url = f"{self.base_url}/loops"
+        snapshots.snapshot_url(url)
+        self.assertEqual(snapshots.snapshot_url(url, max_age=3600), "fresh")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_missing_page_fails(self):
+        url = f"{self.base_url}/missing"
+        self.assertEqual(snapshots.snapshot_url(url), "failed")
+        self.assertIsNone(snapshots.get_snapshot(url))
+
+    def test_refresh_caps_concurrent_requests(self):
+        urls = [f"{self.base_url}/page{i}" for i in range(12)] + [f"{self.base_url}/missing"]
+        outcomes = snapshots.refresh(urls, max_workers=3)
+        self.assertEqual(outcomes, {"fetched": 12, "failed": 1})
+        self.assertLessEqual(self.server.max_active, 3)
+        self.assertGreater(self.server.max_active, 1)
+
+        outcomes = snapshots.refresh(urls, max_workers=3)
+        self.assertEqual(outcomes, {"not modified": 12, "failed": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
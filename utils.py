@@ -11,15 +11,12 @@ START_DATE = (datetime.now() + timedelta(days=1)).date()
 
 def get_current_day():
     """Get the current day in the curriculum based on progress."""
-    progress_data = dh.get_all_progress_data()
-    
-    # Find the first incomplete day
-    for day_data in progress_data:
-        if not day_data['completed']:
-            return day_data['day']
+    first_incomplete_day = dh.get_first_incomplete_day()
     
     # If all are complete, return the last day
-    return 21
+    if first_incomplete_day is None:
+        return curr.get_days_count()
+    return first_incomplete_day
 
 def format_time_display(minutes):
     """Format minutes into hours and minutes for display."""
@@ -35,38 +32,25 @@ def format_time_display(minutes):
 
 def get_day_info(day_number):
     """Get all information about a specific day."""
-    curriculum = curr.get_curriculum_data()
+    day_data = curr.get_day(day_number)
+    if day_data is None:
+        return None
     
-    # Find the day in the curriculum
-    week_index = (day_number - 1) // 7
-    day_in_week_index = (day_number - 1) % 7
+    # Get the scheduled date for this day
+    scheduled_date = get_scheduled_date(day_number)
     
-    try:
-        week_data = curriculum[week_index]
-        day_data = week_data["days"][day_in_week_index]
-        
-        # Get the scheduled date for this day
-        scheduled_date = get_scheduled_date(day_number)
-        formatted_date = format_date(scheduled_date)
-        
-        return {
-            "day": day_number,
-            "week": week_index + 1,
-            "week_title": week_data["title"],
-            "topic": day_data["topic"],
-            "resources": day_data["resources"],
-            "practice": day_data["practice"],
-            "scheduled_date": scheduled_date,
-            "formatted_date": formatted_date
-        }
-    except (IndexError, KeyError):
-        return None
+    # Plain dicts, the frozen records must not end up in the saved data
+    day_info = dict(day_data)
+    day_info["resources"] = [dict(resource) for resource in day_data["resources"]]
+    day_info["scheduled_date"] = scheduled_date
+    day_info["formatted_date"] = format_date(scheduled_date)
+    return day_info
 
 def get_upcoming_days(current_day, num_days=3):
     """Get information about upcoming days in the curriculum."""
     upcoming = []
     
-    for day_num in range(current_day, min(current_day + num_days, 22)):
+    for day_num in range(current_day, min(current_day + num_days, curr.get_days_count() + 1)):
         day_info = get_day_info(day_num)
         if day_info:
             upcoming.append(day_info)
@@ -76,37 +60,7 @@ def get_upcoming_days(current_day, num_days=3):
 def calculate_learning_streak():
     """Calculate the current learning streak."""
     try:
-        progress_data = dh.get_all_progress_data()
-        
-        # Get completed days with dates
-        completed_days = []
-        for d in progress_data:
-            try:
-                if d.get('completed', False) and d.get('completion_date'):
-                    date = datetime.strptime(d['completion_date'], "%Y-%m-%d").date()
-                    completed_days.append(date)
-            except (ValueError, TypeError):
-                # Skip dates that can't be parsed
-                continue
-        
-        if not completed_days:
-            return 0
-        
-        # Sort the dates
-        completed_days.sort()
-        
-        # Check if there's an entry for today
-        today = datetime.now().date()
-        streak = 1 if today in completed_days else 0
-        
-        # Count consecutive days backward from the most recent
-        check_date = today - timedelta(days=1)
-        
-        while check_date in completed_days:
-            streak += 1
-            check_date = check_date - timedelta(days=1)
-        
-        return streak
+        return dh.get_current_streak()
     except Exception as e:
         # Return 0 in case of any error
         return 0
@@ -114,9 +68,7 @@ def calculate_learning_streak():
 def get_total_study_time():
     """Calculate the total study time across all days."""
     try:
-        progress_data = dh.get_all_progress_data()
-        total_minutes = sum(d.get('time_spent_minutes', 0) for d in progress_data)
-        return total_minutes
+        return dh.get_total_minutes()
     except Exception:
         return 0
         
@@ -124,7 +76,7 @@ def get_scheduled_date(day_number):
     """Calculate the scheduled date for a specific day in the curriculum.
     
     Args:
-        day_number: The day number in the curriculum (1-21)
+        day_number: The day number in the curriculum (1 to the number of days)
         
     Returns:
         A date object representing the scheduled date
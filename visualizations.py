@@ -4,14 +4,30 @@ Visualization functions for the Python Learning Tracker
 """
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
 import pandas as pd
 import logging
+import curriculum as curr
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _as_progress_frame(progress_data):
+    """Accept either the columnar progress frame or the list of day dicts."""
+    if isinstance(progress_data, pd.DataFrame):
+        return progress_data
+    if not isinstance(progress_data, list):
+        raise ValueError("Progress data must be a DataFrame or a list")
+    
+    return pd.DataFrame({
+        "day": [d.get('day', i + 1) for i, d in enumerate(progress_data)],
+        "completed": [bool(d.get('completed', False)) for d in progress_data],
+        "completion_date": pd.to_datetime(
+            [d.get('completion_date') for d in progress_data], format="%Y-%m-%d", errors="coerce"
+        ),
+        "minutes": [d.get('time_spent_minutes', 0) for d in progress_data]
+    })
+
 def create_completion_gauge(percentage):
     """Create a gauge chart showing completion percentage."""
     try:
@@ -73,16 +89,16 @@ def create_weekly_progress_chart(weekly_progress):
 def create_progress_heatmap(progress_data):
     """Create a heatmap showing daily progress."""
     try:
-        if not isinstance(progress_data, list):
-            raise ValueError("Progress data must be a list")
-
-        # Ensure we have data for all 21 days
-        progress_data = progress_data[:21]  # Truncate if too long
-        while len(progress_data) < 21:
-            progress_data.append({'completed': False})
+        frame = _as_progress_frame(progress_data)
 
-        days = list(range(1, 22))
-        completion = [1 if d.get('completed', False) else 0 for d in progress_data]
+        # The frame has a row for every curriculum day, lists may be shorter
+        days = list(range(1, max(curr.get_days_count(), len(frame)) + 1))
+        completion = (
+            frame.set_index("day")["completed"]
+            .reindex(days, fill_value=False)
+            .astype(int)
+            .tolist()
+        )
         
         fig = px.imshow(
             [completion],
@@ -104,18 +120,14 @@ def create_progress_heatmap(progress_data):
 def create_time_spent_chart(progress_data):
     """Create a line chart showing time spent per day."""
     try:
-        if not isinstance(progress_data, list):
-            raise ValueError("Progress data must be a list")
+        frame = _as_progress_frame(progress_data)
 
-        if not progress_data:
+        if frame.empty:
             raise ValueError("Progress data is empty")
-
-        days = list(range(1, len(progress_data) + 1))
-        times = [d.get('time_spent_minutes', 0) for d in progress_data]
         
         fig = go.Figure(data=go.Scatter(
-            x=days,
-            y=times,
+            x=frame["day"],
+            y=frame["minutes"],
             mode='lines+markers',
             line=dict(color='#4B89DC')
         ))
@@ -133,31 +145,18 @@ def create_time_spent_chart(progress_data):
 def create_streak_calendar(progress_data):
     """Create a calendar heatmap showing activity streaks."""
     try:
-        if not isinstance(progress_data, list):
-            raise ValueError("Progress data must be a list")
+        frame = _as_progress_frame(progress_data)
 
-        if not progress_data:
+        if frame.empty:
             raise ValueError("Progress data is empty")
 
-        dates = []
-        values = []
-        
-        for day in progress_data:
-            try:
-                completion_date = day.get('completion_date')
-                if completion_date:
-                    # Validate date format
-                    datetime.strptime(completion_date, "%Y-%m-%d")
-                    dates.append(completion_date)
-                    values.append(1)
-            except ValueError as e:
-                logger.warning(f"Invalid date format: {completion_date}")
-                continue
+        # Invalid dates were coerced to NaT and are dropped here
+        dates = frame["completion_date"].dropna()
         
-        if dates:
+        if not dates.empty:
             df = pd.DataFrame({
-                'date': dates,
-                'value': values
+                'date': dates.dt.strftime("%Y-%m-%d"),
+                'value': 1
             })
             fig = px.scatter(df, x='date', y='value', color='value')
             fig.update_layout(
@@ -177,10 +176,10 @@ def create_weekly_time_chart(weekly_time):
         if not isinstance(weekly_time, (list, tuple)):
             raise ValueError("Weekly time must be a list or tuple")
         
-        # Ensure we have exactly 3 weeks of data
-        weekly_time = list(weekly_time)[:3]  # Take first 3 weeks
-        while len(weekly_time) < 3:
-            weekly_time.append(0)
+        # Ensure we have one value per curriculum week
+        week_count = curr.get_week_count()
+        weekly_time = list(weekly_time)[:week_count]
+        weekly_time += [0] * (week_count - len(weekly_time))
             
         weeks = [f"Week {i+1}" for i in range(len(weekly_time))]
         